@@ -0,0 +1,193 @@
+"""
+ゲームエンジンのホットパスのマイクロベンチマーク。
+Game.handle_action / get_state / save_checkpoint / is_game_over、logic.distribute_items、Shotgun.fire を
+プレイヤー数・ゲームの長さ（それまでの操作数＝ログの量）・アイテム数を変えながら1回ずつ計測し、
+1呼び出しあたりの時間 (中央値・p95) と tracemalloc によるメモリ確保量を報告する。
+ゲームが長くなるほど遅くなる処理（ログ全体のコピーなど）は growth 列に表れる。
+
+--json で結果を保存し、--compare で前回の結果との差を表示できる（回帰の確認用）。
+
+実行: python -m benchmarks.bench_core [--calls 2000] [--lengths 0 1000 5000] [--players 2 4 8]
+                                      [--only handle_action get_state] [--json out.json] [--compare base.json]
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from core import logic
+from core.game import Game
+from core.player import Player
+from core.profiles import profiles
+from core.shotgun import Shotgun
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+def measure(call, calls: int, prepare=None) -> dict:
+    """
+    call() を calls 回計測する。prepare があれば各呼び出しの前に（計測外で）呼ぶ。
+    時間の計測とメモリ確保量の計測は、tracemalloc のオーバーヘッドが時間に乗らないよう別々に行う。
+    """
+    timings = []
+    for _ in range(calls):
+        if prepare:
+            prepare()
+        start = time.perf_counter_ns()
+        call()
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+
+    samples = max(1, calls // 10)
+    tracemalloc.start()
+    retained = peak = 0
+    for _ in range(samples):
+        if prepare:
+            prepare()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call()
+        current, top = tracemalloc.get_traced_memory()
+        retained += current - before
+        peak += top - before
+    tracemalloc.stop()
+
+    return {
+        'median_us': timings[len(timings) // 2] / 1000,
+        'p95_us': timings[min(len(timings) - 1, int(len(timings) * 0.95))] / 1000,
+        'alloc_peak_bytes': peak / samples,
+        'retained_bytes': retained / samples,
+    }
+
+def long_game(players: int, length: int, items_per_round: int = 2) -> Game:
+    """空砲だけを装填し、誰も倒れないまま length 回の操作を進めたゲーム"""
+    game = Game(list(range(1, players + 1)),
+                {'shell_counts': {'live': 0, 'blank': 8}, 'items_per_round': items_per_round},
+                game_id="", seed=1)
+    game.start_new_round()
+    for _ in range(length):
+        shoot_next(game)
+    return game
+
+def shoot_next(game: Game):
+    target = game.players[(game.current_player_index + 1) % len(game.players)].id
+    game.handle_action({'action': 'shoot', 'target_id': target})
+
+def bench_handle_action(args, players: int, length: int) -> dict:
+    game = long_game(players, length)
+    return measure(lambda: shoot_next(game), args.calls)
+
+def bench_get_state(args, players: int, length: int) -> dict:
+    game = long_game(players, length)
+    return measure(game.get_state, args.calls)
+
+def bench_save_checkpoint(args, players: int, length: int) -> dict:
+    game = long_game(players, length)
+
+    def checkpoint():
+        game.save_checkpoint()
+        game.journal.commit()
+    return measure(checkpoint, args.calls)
+
+def bench_is_game_over(args, players: int, length: int) -> dict:
+    game = long_game(players, length)
+    return measure(game.is_game_over, args.calls)
+
+def bench_distribute_items(args, players: int, items: int) -> dict:
+    rng = random.Random(1)
+    roster = [Player(pid) for pid in range(1, players + 1)]
+    ruleset = profiles.rules_for({'items_per_round': items})
+    return measure(lambda: logic.distribute_items(1, roster, rng, ruleset), args.calls)
+
+def bench_fire(args, shells: int) -> dict:
+    shotgun = Shotgun(random.Random(1))
+
+    def reload():
+        if not shotgun.remaining:
+            shotgun.load_shells(shells // 2, shells - shells // 2)
+    return measure(shotgun.fire, args.calls, prepare=reload)
+
+def run(args) -> dict:
+    results = {}
+
+    def record(name: str, params: dict, stats: dict):
+        key = name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+        results[key] = {'name': name, 'params': params, **stats}
+
+    game_benches = {
+        'handle_action': bench_handle_action,
+        'get_state': bench_get_state,
+        'save_checkpoint': bench_save_checkpoint,
+        'is_game_over': bench_is_game_over,
+    }
+    for name, bench in game_benches.items():
+        if args.only and name not in args.only:
+            continue
+        for players in args.players:
+            for length in args.lengths:
+                record(name, {'players': players, 'length': length}, bench(args, players, length))
+
+    if not args.only or 'distribute_items' in args.only:
+        for players in args.players:
+            for items in args.items:
+                record('distribute_items', {'players': players, 'items': items}, bench_distribute_items(args, players, items))
+
+    if not args.only or 'fire' in args.only:
+        for shells in (8, 64):
+            record('fire', {'shells': shells}, bench_fire(args, shells))
+    return results
+
+def growth(results: dict) -> dict:
+    """同じプレイヤー数で、最長のゲームと最短のゲームの中央値の比（1.0 付近ならゲームの長さに依存しない）"""
+    ratios = {}
+    for key, result in results.items():
+        params = result['params']
+        if 'length' not in params:
+            continue
+        shortest = min((r for r in results.values() if r['name'] == result['name']
+                        and r['params'].get('players') == params['players']), key=lambda r: r['params']['length'])
+        ratios[key] = result['median_us'] / shortest['median_us'] if shortest['median_us'] else 1.0
+    return ratios
+
+def report(results: dict, baseline: dict | None):
+    ratios = growth(results)
+    print(f"{'benchmark':<48} {'median us':>10} {'p95 us':>10} {'peak B':>9} {'kept B':>8} {'growth':>7}")
+    for key, result in results.items():
+        line = (f"{key:<48} {result['median_us']:>10.2f} {result['p95_us']:>10.2f} "
+                f"{result['alloc_peak_bytes']:>9.0f} {result['retained_bytes']:>8.0f} "
+                f"{ratios[key] if key in ratios else 1.0:>6.2f}x")
+        base = (baseline or {}).get(key)
+        if base and base['median_us']:
+            line += f"  ({(result['median_us'] / base['median_us'] - 1) * 100:+.0f}% vs baseline)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[0, 1000, 5000], help="計測前に進めておく操作数")
+    parser.add_argument('--items', type=int, nargs='+', default=[2, 4, 8], help="1ラウンドに配るアイテム数")
+    parser.add_argument('--only', nargs='+', help="指定したベンチマークだけを実行する")
+    parser.add_argument('--json', help="結果をJSONで保存するパス")
+    parser.add_argument('--compare', help="比較対象となる以前の --json 出力")
+    args = parser.parse_args()
+
+    # 実機への送信はベンチマーク対象外（テーブル端末向けのエンコードまでは計測に含める）
+    Game.send_trigger = lambda self, shell: None
+    hardware_interface.set_transport(LoopbackTransport(keep=False))
+    configure_logging({'enabled': False})
+    results = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
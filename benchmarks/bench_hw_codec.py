@@ -0,0 +1,89 @@
+"""
+テーブル端末向けバイナリ・フレームのベンチマーク。
+JSON と比べたメッセージサイズ・エンコード/デコード速度と、
+ループバック経路で handle_action ごとのバッチ送信がどれだけフレーム数を減らすかを測る。
+
+実行: python -m benchmarks.bench_hw_codec [--iterations 100000] [--turns 2000]
+"""
+import argparse
+import json
+import time
+
+from core.game import Game
+from hardware.codec import encode_message, encode_frame, decode_frame
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+def sample_payloads() -> dict:
+    game = Game([1, 2, 3, 4], game_id="bench", headless=True)
+    game.start_new_round()
+    return {
+        'shot_fired': {"type": "shot_fired", "game_id": "bench", "player_id": 2, "shell_type": "live"},
+        'item_result': {"type": "item_result", "game_id": "bench", "player_id": 1, "item_name": "MagnifyingGlass",
+                        "success": True, "message": "The current shell is LIVE."},
+        'game_state': {"type": "game_state", "game_id": "bench", "state": game.get_state()},
+    }
+
+def bench_codec(iterations: int):
+    print(f"{'message':<12} {'json bytes':>10} {'binary':>8} {'json enc us':>12} {'bin enc us':>11} {'bin dec us':>11}")
+    for name, payload in sample_payloads().items():
+        json_size = len(json.dumps(payload).encode())
+        frame = encode_frame([encode_message(payload)])
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            json.dumps(payload)
+        json_enc = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encode_frame([encode_message(payload)])
+        bin_enc = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decode_frame(frame)
+        bin_dec = (time.perf_counter() - start) / iterations
+
+        print(f"{name:<12} {json_size:>10} {len(frame):>8} {json_enc * 1e6:>12.2f} {bin_enc * 1e6:>11.2f} {bin_dec * 1e6:>11.2f}")
+
+def bench_batching(turns: int):
+    # 実機への発射トリガーはベンチマーク対象外
+    Game.send_trigger = lambda self, shell: None
+    transport = LoopbackTransport(keep=False)
+    hardware_interface.set_transport(transport)
+
+    game = Game([1, 2], game_id="bench")
+    configure_logging({'enabled': False})
+    game.start_new_round()
+    before = dict(hardware_interface.stats)
+    start = time.perf_counter()
+    for turn in range(turns):
+        if game.is_game_over():
+            game.reset()
+        player = game.current_player
+        if player.items:
+            game.handle_action({'action': 'use', 'item_name': player.items[0].name,
+                                'target_id': game.players[(game.current_player_index + 1) % 2].id})
+        else:
+            game.handle_action({'action': 'shoot', 'target_id': player.id})
+    elapsed = time.perf_counter() - start
+
+    frames = hardware_interface.stats['frames'] - before['frames']
+    messages = hardware_interface.stats['messages'] - before['messages']
+    sent = hardware_interface.stats['bytes'] - before['bytes']
+    print(f"\n{turns} actions in {elapsed:.2f}s ({turns / elapsed:,.0f} actions/s)")
+    print(f"  messages: {messages}  frames: {frames}  ({messages / max(frames, 1):.2f} messages/frame)")
+    print(f"  bytes sent: {sent} ({sent / max(frames, 1):.1f} bytes/frame)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--turns', type=int, default=2000)
+    args = parser.parse_args()
+    bench_codec(args.iterations)
+    bench_batching(args.turns)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+ゲーム1つあたりのメモリ使用量のベンチマーク。
+数十ラウンド進めたゲームを大量にメモリ上に作り、tracemalloc で Game 全体・Player・Shotgun それぞれの
+1つあたりの確保量を測る。headless（シミュレーション用）と通常のゲーム（差分履歴・ログを持つ）の両方を報告する。
+
+実行: python -m benchmarks.bench_memory [--games 5000] [--players 2 4] [--actions 20]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from core.game import Game
+from core.player import Player
+from core.shotgun import Shotgun
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+def allocated(build, count: int) -> float:
+    """build() を count 回呼んで結果を保持したまま、1つあたりの確保量（バイト）を返す"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(count)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size / count
+
+def played_game(players: int, actions: int, headless: bool) -> Game:
+    game = Game(list(range(1, players + 1)), game_id="", headless=headless)
+    game.start_new_round()
+    for _ in range(actions):
+        if game.is_game_over():
+            break
+        player = game.current_player
+        target = game.players[(game.current_player_index + 1) % players]
+        item = next(iter(player.items), None)
+        if item is not None and item.name != "Handcuffs":
+            game.handle_action({'action': 'use', 'item_name': item.name})
+        else:
+            game.handle_action({'action': 'shoot', 'target_id': target.id})
+    return game
+
+SHARED_RNG = random.Random(1) # ゲームの乱数生成器を共有する（Shotgun 自体の大きさだけを測る）
+
+def loaded_shotgun() -> Shotgun:
+    shotgun = Shotgun(SHARED_RNG)
+    shotgun.load_shells(4, 4)
+    shotgun.fire()
+    return shotgun
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=5000)
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--actions', type=int, default=20, help="計測前に各ゲームで進める操作数")
+    args = parser.parse_args()
+
+    # 実機への送信はベンチマーク対象外
+    Game.send_trigger = lambda self, shell: None
+    hardware_interface.set_transport(LoopbackTransport(keep=False))
+    configure_logging({'enabled': False})
+
+    print(f"{'object':<28} {'bytes each':>11}")
+    print(f"{'Player':<28} {allocated(lambda: Player(1), args.games * 4):>11,.0f}")
+    print(f"{'Shotgun (8 shells loaded)':<28} {allocated(loaded_shotgun, args.games):>11,.0f}")
+    for players in args.players:
+        for headless in (True, False):
+            label = f"Game {players}p {'headless' if headless else 'full'}"
+            size = allocated(lambda: played_game(players, args.actions, headless), args.games)
+            print(f"{label:<28} {size:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+状態レスポンスのシリアライズのベンチマーク。
+以前の /state・/action の経路（get_state() の dict を FastAPI の jsonable_encoder + JSONResponse で毎回エンコード）と、
+orjson で直接エンコードする場合、Game.get_state_json() のキャッシュを読む場合（変化のないゲームの読み出し）、
+状態が変わった直後の最初の読み出しを比べ、1回あたりの時間とレスポンスの大きさを報告する。
+
+実行: python -m benchmarks.bench_state_json [--calls 20000] [--players 2 4 8] [--messages 0 50]
+"""
+import argparse
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.game import Game
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+def per_call_us(call, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def sample_game(players: int, messages: int) -> Game:
+    game = Game(list(range(1, players + 1)), game_id="", seed=1)
+    game.start_new_round()
+    for turn in range(20):
+        if game.is_game_over():
+            break
+        target = game.players[(game.current_player_index + 1) % players].id
+        game.handle_action({'action': 'shoot', 'target_id': target})
+    for index in range(messages):
+        game.broadcast_message(f"message {index}")
+    return game
+
+def bench(game: Game, calls: int) -> dict:
+    viewer = game.players[0].id
+
+    def first_read():
+        game._state_json.clear() # 状態変化の直後と同じ（キャッシュが空）
+        game.get_state_json()
+
+    return {
+        'jsonable_encoder': (per_call_us(lambda: JSONResponse(jsonable_encoder(game.get_state())).body, calls),
+                             len(JSONResponse(jsonable_encoder(game.get_state())).body)),
+        'orjson': (per_call_us(lambda: orjson.dumps(game.get_state()), calls), len(orjson.dumps(game.get_state()))),
+        'first read': (per_call_us(first_read, calls), len(game.get_state_json())),
+        'cached': (per_call_us(game.get_state_json, calls), len(game.get_state_json())),
+        'cached player': (per_call_us(lambda: game.get_state_json(viewer), calls), len(game.get_state_json(viewer))),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--messages', type=int, nargs='+', default=[0, 50], help="管理者メッセージの件数（状態の大きさ）")
+    args = parser.parse_args()
+
+    # 実機への送信はベンチマーク対象外
+    Game.send_trigger = lambda self, shell: None
+    hardware_interface.set_transport(LoopbackTransport(keep=False))
+    configure_logging({'enabled': False})
+
+    print(f"{'players':>7} {'msgs':>5} {'path':<18} {'us/call':>9} {'bytes':>7} {'speedup':>8}")
+    for players in args.players:
+        for messages in args.messages:
+            results = bench(sample_game(players, messages), args.calls)
+            baseline = results['jsonable_encoder'][0]
+            for path, (elapsed, size) in results.items():
+                print(f"{players:>7} {messages:>5} {path:<18} {elapsed:>9.2f} {size:>7} {baseline / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Undo ジャーナルのベンチマーク。
+空砲のみを装填して誰も死なないゲームを 1,000 ターン以上進め、
+ターン数が増えても1アクションあたりのレイテンシが一定であることを確認する。
+
+実行: python -m benchmarks.bench_undo [--turns 1000]
+"""
+import argparse
+import time
+
+from core.game import Game
+from utils.log import configure_logging
+
+def run(turns: int, sample_every: int):
+    # 実機への送信はベンチマーク対象外
+    Game.send_trigger = lambda self, shell: None
+
+    game = Game([1, 2, 3, 4], {'shell_counts': {'live': 0, 'blank': 8}})
+    samples = []
+    configure_logging({'enabled': False})
+    game.start_new_round()
+    window = []
+    for turn in range(1, turns + 1):
+        target = game.players[(game.current_player_index + 1) % len(game.players)].id
+        start = time.perf_counter()
+        game.handle_action({'action': 'shoot', 'target_id': target})
+        window.append(time.perf_counter() - start)
+        if turn % sample_every == 0:
+            samples.append((turn, sum(window) / len(window), max(window)))
+            window = []
+
+    start = time.perf_counter()
+    undone = 0
+    while game.undo():
+        undone += 1
+    undo_elapsed = time.perf_counter() - start
+
+    print(f"{'turn':>6} {'avg action (us)':>16} {'max action (us)':>16}")
+    for turn, avg, worst in samples:
+        print(f"{turn:>6} {avg * 1e6:>16.1f} {worst * 1e6:>16.1f}")
+    print(f"\nUndo depth reached: {undone} actions in {undo_elapsed * 1e3:.1f} ms "
+          f"({undo_elapsed / max(undone, 1) * 1e6:.1f} us/undo)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turns', type=int, default=1000)
+    parser.add_argument('--sample-every', type=int, default=100)
+    args = parser.parse_args()
+    run(args.turns, args.sample_every)
+
+if __name__ == "__main__":
+    main()
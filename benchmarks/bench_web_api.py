@@ -0,0 +1,229 @@
+"""
+Web API の負荷・レイテンシ・ベンチマーク。
+web_server.app をプロセス内で (httpx.ASGITransport 経由で) 起動し、/api/game/create で大量のゲームを作ってから、
+操作・状態取得・差分ポーリング・一覧・Undo を混ぜたトラフィックを指定した並列度で送る。
+エンドポイントごとのスループットと p50/p95/p99 レイテンシ、ゲーム1つあたりのメモリ増加量を報告する。
+
+--json で結果をファイルに保存し、--compare で前回の結果との差を表示できる（回帰の確認用）。
+
+実行: python -m benchmarks.bench_web_api [--games 2000] [--concurrency 32] [--requests 20000]
+                                          [--mix action=40,state=20,poll=20,list=10,undo=10]
+                                          [--store memory|sqlite] [--json out.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+
+from core.event_log import event_log_writer
+from core.game import Game
+from core.game_manager import game_manager
+from core.storage import SQLiteGameStore
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+DEFAULT_MIX = "action=40,state=20,poll=20,list=10,undo=10"
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - {"action", "state", "poll", "list", "undo"}
+    if unknown:
+        raise ValueError(f"Unknown request kinds: {unknown}")
+    return mix
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))] * 1000
+
+def rss_mb() -> float:
+    # Linux では KB 単位、macOS ではバイト単位
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+class Traffic:
+    """1回のベンチマーク実行中のクライアント状態と計測値"""
+    def __init__(self, client: httpx.AsyncClient, game_ids: list[str], mix: dict[str, int], seed: int):
+        self.client = client
+        self.game_ids = game_ids
+        self.kinds = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.versions: dict[str, int] = {} # ゲームID -> ポーリングで最後に見たバージョン
+        self.latencies: dict[str, list[float]] = {kind: [] for kind in self.kinds}
+        self.statuses: dict[str, dict[int, int]] = {kind: {} for kind in self.kinds}
+
+    async def request(self, kind: str):
+        game_id = self.rng.choice(self.game_ids)
+        start = time.perf_counter()
+        if kind == "action":
+            target = self.rng.choice((1, 2))
+            response = await self.client.post(f"/api/game/{game_id}/action", json={"action": "shoot", "target_id": target})
+            if response.status_code == 200 and not response.json().get("success"):
+                # 決着したゲームは巻き戻して使い続ける（計測には含めない）
+                self.latencies[kind].append(time.perf_counter() - start)
+                self._count(kind, response.status_code)
+                await self.client.post(f"/api/game/{game_id}/reset")
+                return
+        elif kind == "state":
+            response = await self.client.get(f"/api/game/{game_id}/state")
+        elif kind == "poll":
+            since = self.versions.get(game_id)
+            query = f"?since={since}" if since is not None else ""
+            response = await self.client.get(f"/api/game/{game_id}/state{query}")
+            if response.status_code == 200:
+                self.versions[game_id] = response.json()["version"]
+        elif kind == "list":
+            response = await self.client.get("/api/games", params={"limit": 50})
+        else:
+            response = await self.client.post(f"/api/game/{game_id}/undo")
+        self.latencies[kind].append(time.perf_counter() - start)
+        self._count(kind, response.status_code)
+
+    def _count(self, kind: str, status: int):
+        self.statuses[kind][status] = self.statuses[kind].get(status, 0) + 1
+
+    async def run(self, total: int, concurrency: int) -> float:
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await self.request(self.rng.choices(self.kinds, self.weights)[0])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+async def create_games(client: httpx.AsyncClient, count: int, concurrency: int) -> tuple[list[str], list[float]]:
+    game_ids, latencies = [], []
+    remaining = count
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.post("/api/game/create", json={"player_ids": [1, 2]})
+            latencies.append(time.perf_counter() - start)
+            game_ids.append(response.json()["game_id"])
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return game_ids, latencies
+
+async def run(app, args, mix: dict[str, int]) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+        # ゲーム作成：メモリ増加量を測る
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        rss_before = rss_mb()
+        create_start = time.perf_counter()
+        game_ids, create_latencies = await create_games(client, args.games, args.concurrency)
+        create_elapsed = time.perf_counter() - create_start
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # 混合トラフィック
+        traffic = Traffic(client, game_ids, mix, args.seed)
+        elapsed = await traffic.run(args.requests, args.concurrency)
+        gc.collect()
+
+    endpoints = {"create": summarize(create_latencies, create_elapsed, {200: len(create_latencies)})}
+    for kind in traffic.kinds:
+        endpoints[kind] = summarize(traffic.latencies[kind], elapsed, traffic.statuses[kind])
+    return {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "parameters": {"games": args.games, "concurrency": args.concurrency, "requests": args.requests,
+                       "mix": mix, "store": args.store, "seed": args.seed},
+        "total": {"requests": sum(len(v) for v in traffic.latencies.values()), "seconds": elapsed,
+                  "throughput": sum(len(v) for v in traffic.latencies.values()) / elapsed},
+        "endpoints": endpoints,
+        "memory": {"bytes_per_game": (after - before) / max(args.games, 1),
+                   "rss_before_mb": rss_before, "rss_after_mb": rss_mb()},
+    }
+
+def summarize(latencies: list[float], elapsed: float, statuses: dict[int, int]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+def report(result: dict, baseline: dict | None):
+    print(f"{'endpoint':<8} {'count':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for name, stats in result["endpoints"].items():
+        line = (f"{name:<8} {stats['count']:>7} {stats['throughput']:>9,.0f} {stats['p50_ms']:>8.2f} "
+                f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}  {stats['statuses']}")
+        base = (baseline or {}).get("endpoints", {}).get(name)
+        if base and base["p95_ms"]:
+            line += f"  (p95 {(stats['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}% vs baseline)"
+        print(line)
+    total, memory = result["total"], result["memory"]
+    print(f"\ntotal: {total['requests']} requests in {total['seconds']:.2f}s ({total['throughput']:,.0f} req/s)")
+    if baseline:
+        print(f"  throughput {(total['throughput'] / baseline['total']['throughput'] - 1) * 100:+.1f}% vs baseline")
+    print(f"memory: {memory['bytes_per_game'] / 1024:.1f} KiB per game "
+          f"(max RSS {memory['rss_before_mb']:.0f} -> {memory['rss_after_mb']:.0f} MiB)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"種類=重み のカンマ区切り (既定: {DEFAULT_MIX})")
+    parser.add_argument('--store', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="結果をJSONで保存するパス")
+    parser.add_argument('--compare', help="比較対象となる以前の --json 出力")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # 実機への発射トリガー・テーブル端末への送信はベンチマーク対象外。ログ・ストアは一時ディレクトリへ
+        Game.send_trigger = lambda self, shell: None
+        hardware_interface.set_transport(LoopbackTransport(keep=False))
+        event_log_writer.log_dir = directory
+        # 読み込み時に config.json のストアとログ設定が適用されるので、その後で差し替える
+        import web_server
+        configure_logging({'enabled': False})
+        store = SQLiteGameStore(os.path.join(directory, "games.db")) if args.store == 'sqlite' else None
+        game_manager.set_store(store, max(args.games * 2, 1000))
+        result = asyncio.run(run(web_server.app, args, mix))
+        event_log_writer.flush()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
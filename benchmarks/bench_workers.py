@@ -0,0 +1,134 @@
+"""
+複数ワーカー構成の負荷試験。
+共有 SQLite ストア ("storage.shared": true) で uvicorn --workers N を起動し、
+複数のクライアントから /api/game/{id}/action を送り続けて、ワーカー数ごとのスループットとレイテンシを測る。
+どのワーカーにどのリクエストが届いても同じゲームを扱えること（404 や不整合が出ないこと）も確かめる。
+
+実行: python -m benchmarks.bench_workers [--workers 1 2 4] [--games 32] [--clients 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_config(directory: str) -> str:
+    """ベンチマーク用の設定（共有ストアを一時ディレクトリに置き、実機との通信は行わない）"""
+    with open("config.json") as f:
+        settings = json.load(f)
+    settings['storage'] = {"backend": "sqlite", "path": os.path.join(directory, "games.db"),
+                           "shared": True, "lease_ttl": 5.0, "sync_interval": 0.5}
+    settings['network'] = {"table_transport": {"type": "log"}}
+    settings['logging'] = {"enabled": False}
+    path = os.path.join(directory, "config.json")
+    with open(path, "w") as f:
+        json.dump(settings, f)
+    return path
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/games?limit=1")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+async def run_load(base_url: str, games: int, clients: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        await wait_ready(client)
+        game_ids = []
+        for _ in range(games):
+            response = await client.post("/api/game/create", json={"player_ids": [1, 2]})
+            game_ids.append(response.json()["game_id"])
+
+        latencies, errors = [], {}
+        stop_at = time.perf_counter() + duration
+
+        async def worker(index: int):
+            game_id = game_ids[index % games]
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                response = await client.post(f"/api/game/{game_id}/action",
+                                             json={"action": "shoot", "target_id": 1 + index % 2})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors[response.status_code] = errors.get(response.status_code, 0) + 1
+                elif not response.json().get("success"):
+                    # 決着したら最初からやり直して負荷をかけ続ける
+                    await client.post(f"/api/game/{game_id}/reset")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        # どのワーカーから見ても、保存された操作数が一致しているか
+        counts = []
+        for game_id in game_ids[:4]:
+            actions = [len((await client.get(f"/api/game/{game_id}/actions")).json()["actions"]) for _ in range(4)]
+            counts.append(len(set(actions)) == 1)
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+        "errors": errors,
+        "consistent": all(counts),
+    }
+
+def bench(workers: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        env = {**os.environ, "BR_CONFIG": write_config(directory)}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "web_server:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL
+        )
+        try:
+            return asyncio.run(run_load(f"http://127.0.0.1:{port}", args.games, args.clients, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--games', type=int, default=32)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--json', action='store_true', help="結果をJSONで出力する")
+    args = parser.parse_args()
+
+    results = {}
+    for workers in args.workers:
+        results[workers] = bench(workers, args)
+        if not args.json:
+            r = results[workers]
+            speedup = r['throughput'] / results[args.workers[0]]['throughput']
+            ideal = workers / args.workers[0]
+            print(f"workers={workers:<3} {r['throughput']:>8,.0f} req/s  speedup x{speedup:.2f} (ideal x{ideal:.0f})  "
+                  f"p50 {r['p50_ms']:.1f}ms  p99 {r['p99_ms']:.1f}ms  errors {r['errors']}  consistent {r['consistent']}")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    print(f"(client and server share {os.cpu_count()} CPU core(s); scaling is bounded by the core count)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""pytest の設定。リポジトリ直下を import パスに入れる（core, hardware などをそのまま import できるように）"""
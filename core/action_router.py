@@ -0,0 +1,109 @@
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+from utils.latency import LatencyWindow
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from .game_manager import GameManager
+
+class ActionQueueFull(Exception):
+    """ゲームの待ち行列が上限に達している（呼び出し側は少し待って再送する）"""
+
+class GameNotFound(LookupError):
+    """投入先のゲームが存在しない"""
+
+class ActionQueue:
+    """1ゲーム分の待ち行列。running の間はちょうど1つのワーカーが処理している"""
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.items: deque = deque() # (method, args, future, submitted_at, context)
+        self.running = False
+        self.counts = {'submitted': 0, 'processed': 0, 'failed': 0, 'rejected': 0}
+        self.latency = LatencyWindow() # 投入から処理完了までの時間
+
+    def metrics(self) -> dict:
+        latency = self.latency.summary()
+        return {'queue_depth': len(self.items), 'running': self.running, **self.counts,
+                'latency_ms': {'p50': latency['p50'], 'p99': latency['p99'], 'max': latency['max']}}
+
+class ActionRouter:
+    """
+    ゲームへの操作を、ゲームごとに直列化して実行する。
+    Web・デバイスなど、どのスレッドから投入された操作も同じゲームに対しては1つずつ順番に処理され、
+    異なるゲームの操作はスレッドプールで並行に処理される。
+    待ち行列が max_pending を超える場合は ActionQueueFull で投入を拒否する（バックプレッシャー）。
+    待ち行列は存在するゲームにだけ作り、空になったら捨てる（でたらめなIDで増え続けないように）。
+    """
+    def __init__(self, manager: 'GameManager', max_pending: int = 64, workers: int = 4):
+        self.manager = manager
+        self.max_pending = max_pending
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="game-actions")
+        self._queues: dict[str, ActionQueue] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, game_id: str, method, *args) -> concurrent.futures.Future:
+        """
+        game.<method>(*args) の実行を予約する。method に関数を渡した場合は method(game, *args) を実行する。
+        Returns:
+            concurrent.futures.Future: メソッドの戻り値（ゲームがなければ GameNotFound）
+        """
+        future = concurrent.futures.Future()
+        if game_id not in self._queues and not self.manager.has_game(game_id):
+            future.set_exception(GameNotFound(f"Game {game_id} not found"))
+            return future
+        with self._lock:
+            queue = self._queues.get(game_id)
+            if queue is None:
+                queue = self._queues[game_id] = ActionQueue(game_id)
+            if len(queue.items) >= self.max_pending:
+                queue.counts['rejected'] += 1
+                raise ActionQueueFull(f"Too many pending actions for game {game_id}")
+            queue.counts['submitted'] += 1
+            # 投入元のコンテキスト（リクエストのトレースなど）のまま実行する
+            queue.items.append((method, args, future, time.perf_counter(), contextvars.copy_context()))
+            start_worker = not queue.running
+            queue.running = True
+        if start_worker:
+            self._executor.submit(self._drain, queue)
+        return future
+
+    def _drain(self, queue: ActionQueue):
+        while True:
+            with self._lock:
+                if not queue.items:
+                    queue.running = False
+                    if self._queues.get(queue.game_id) is queue:
+                        del self._queues[queue.game_id]
+                    return
+                method, args, future, submitted_at, context = queue.items.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = context.run(self._execute, queue.game_id, method, args, submitted_at)
+            except BaseException as e:
+                queue.counts['failed'] += 1
+                future.set_exception(e)
+            else:
+                queue.counts['processed'] += 1
+                future.set_result(result)
+            queue.latency.add(time.perf_counter() - submitted_at)
+
+    def _execute(self, game_id: str, method, args: tuple, submitted_at: float):
+        if metrics.enabled:
+            metrics.record_phase('queue_wait', submitted_at)
+        return self.manager.execute(game_id, method, args)
+
+    def forget(self, game_id: str):
+        """終了した・メモリから追い出したゲームの待ち行列と統計を破棄する（処理中なら空になった時に消える）"""
+        with self._lock:
+            queue = self._queues.get(game_id)
+            if queue is not None and not queue.items and not queue.running:
+                del self._queues[game_id]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {game_id: queue.metrics() for game_id, queue in self._queues.items()}
@@ -0,0 +1,157 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+
+from utils.log import get_logger
+
+log = get_logger("eventlog")
+
+LOG_DIR = "logs"
+# 開いたままにしておくゲームのログファイルの上限（超えたら最も長く書いていないものを閉じる）
+MAX_OPEN_FILES = 64
+
+def game_log_path(game_id: str, log_dir: str = LOG_DIR) -> str:
+    return os.path.join(log_dir, f"game_{game_id}.jsonl")
+
+class EventLogWriter:
+    """
+    ゲームのイベントログを JSON Lines 形式で追記するバックグラウンドライター。
+    書き込み要求はキューに積むだけで返り、専用スレッドが件数・時間のしきい値で
+    まとめてファイルへ書き出す。クラッシュしても直近のバッチ以外は失われない。
+    ファイルは開いたまま使い回すが、max_open_files を超えたら最近書いていないものから閉じる（次に書く時に開き直す）。
+    """
+    _CLOSE = object()
+
+    def __init__(self, log_dir: str = LOG_DIR, batch_size: int = 256, flush_interval: float = 0.5,
+                 max_open_files: int = MAX_OPEN_FILES):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_open_files = max_open_files
+        self._queue = queue.SimpleQueue()
+        self._files = OrderedDict() # game_id -> file object（最近書いた順）
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def write(self, game_id: str, entry: dict):
+        """ログエントリを書き込みキューに積む"""
+        self._ensure_started()
+        self._queue.put((game_id, entry))
+
+    def close(self, game_id: str):
+        """未書き込みのエントリを書き出した後、ゲームのログファイルを閉じる"""
+        self._ensure_started()
+        self._queue.put((game_id, self._CLOSE))
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """キューに積まれた全エントリがファイルに書き出されるまで待つ"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def _run(self):
+        pending: dict[str, list[str]] = {}
+        pending_count = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                game_id, entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write_pending(pending)
+                pending_count, deadline = 0, None
+                continue
+
+            if isinstance(entry, threading.Event):
+                self._write_pending(pending)
+                pending_count, deadline = 0, None
+                for f in self._files.values():
+                    f.flush()
+                entry.set()
+            elif entry is self._CLOSE:
+                self._write_pending({game_id: pending.pop(game_id, [])})
+                f = self._files.pop(game_id, None)
+                if f:
+                    f.close()
+            else:
+                pending.setdefault(game_id, []).append(json.dumps(entry, ensure_ascii=False))
+                pending_count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if pending_count >= self.batch_size:
+                    self._write_pending(pending)
+                    pending_count, deadline = 0, None
+
+    def _write_pending(self, pending: dict[str, list[str]]):
+        for game_id, lines in pending.items():
+            if not lines:
+                continue
+            try:
+                f = self._files.get(game_id)
+                if f is None:
+                    while len(self._files) >= self.max_open_files:
+                        self._files.popitem(last=False)[1].close()
+                    os.makedirs(self.log_dir, exist_ok=True)
+                    f = open(game_log_path(game_id, self.log_dir), 'a', encoding='utf-8')
+                    self._files[game_id] = f
+                else:
+                    self._files.move_to_end(game_id)
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+            except OSError as e:
+                log.error("Failed to write log for game %s: %s", game_id, e)
+        pending.clear()
+
+class GameLogReader:
+    """JSON Lines のゲームログを必要な分だけ読み込むリーダー"""
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def for_game(cls, game_id: str, log_dir: str = LOG_DIR) -> 'GameLogReader':
+        return cls(game_log_path(game_id, log_dir))
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, since_seq: int = 0, event_types: set[str] | None = None):
+        """seq が since_seq 以上のイベントを1件ずつ返すジェネレータ"""
+        if not self.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get('seq', 0) < since_seq:
+                    continue
+                if event_types and entry.get('type') not in event_types:
+                    continue
+                yield entry
+
+    def page(self, since_seq: int = 0, limit: int | None = None) -> list[dict]:
+        return list(islice(self.events(since_seq), limit))
+
+    def tail(self, count: int) -> list[dict]:
+        return list(deque(self.events(), maxlen=count))
+
+# シングルトンインスタンスとしてエクスポート
+event_log_writer = EventLogWriter()
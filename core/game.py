@@ -2,36 +2,141 @@ from .player import Player
 from .shotgun import Shotgun
 from .items import ITEMS
 from . import logic
-from .game_config import config
+from .game_config import RuleSet
+from .profiles import profiles
+from .state_diff import make_patch, append_patch
+from .journal import Journal, record_setattr
+from .event_log import event_log_writer, game_log_path
+from .action_router import ActionQueueFull
 from hardware.interface import hardware_interface
+from hardware.dispatcher import hardware_dispatcher
+from utils.metrics import metrics
+from utils.log import get_logger
+import logging
 import time
-import json
-import os
+import random
+import secrets
 from datetime import datetime
-import copy
+import functools
+from collections import deque
+
+import orjson
+
+# 差分配信のために保持する過去バージョンのスナップショット数
+STATE_HISTORY_SIZE = 64
+# UI 表示用にメモリ上に保持する直近ログの件数（全件はファイルに書き出す）
+LOG_TAIL_SIZE = 200
+
+log = get_logger("game")
+
+_last_timestamp = (0, "")
+
+def _timestamp() -> str:
+    """ログ用の "HH:MM:SS" 文字列。同じ秒の間は整形結果を使い回す"""
+    global _last_timestamp
+    now = int(time.time())
+    if _last_timestamp[0] != now:
+        _last_timestamp = (now, datetime.fromtimestamp(now).strftime("%H:%M:%S"))
+    return _last_timestamp[1]
+
+def read_only(fn):
+    """
+    ゲーム状態を変更しない呼び出しに付ける印。
+    共有ストアの GameManager.execute() はリースを取らず、他のワーカーの操作を取り込んだメモリ上のゲームから読む。
+    """
+    fn.read_only = True
+    return fn
+
+def mutation(method):
+    """
+    ゲーム状態を変更する公開メソッドに付けるデコレータ。
+    入れ子の呼び出し（handle_action -> start_new_round など）はまとめて扱い、
+    最も外側の呼び出しが終わった時点で、実際に変更があればリスナーへ1回だけ通知する。
+    最も外側の呼び出しは操作ログ (Game.actions) に記録され、replay() で再現できる。
+    その間に送られたハードウェア通知は1フレームにまとめて送信される。
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        outermost = self._mutation_depth == 0
+        if outermost:
+            # 外部から呼ばれた操作だけを記録する（リプレイの入力になる）
+            self.actions.append([method.__name__, list(args), kwargs])
+            if not self.headless:
+                # 1操作の間に出たハードウェア通知は1フレームにまとめて送る
+                hardware_interface.begin_batch()
+        self._mutation_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._mutation_depth -= 1
+            if outermost:
+                try:
+                    self._commit_changes()
+                finally:
+                    # 通知が失敗しても送信バッチは必ず閉じる（閉じ損ねるとこのスレッドからは2度と送信されない）
+                    if not self.headless:
+                        hardware_interface.end_batch()
+    return wrapper
 
 class Game:
     """ゲーム全体の進行と状態を管理する司令塔クラス"""
-    def __init__(self, player_ids: list[int], custom_settings: dict = None):
-        self.players = [Player(pid) for pid in player_ids]
-        self.shotgun = Shotgun()
-        self.game_id = ""
+
+    def __init__(self, player_ids: list[int], custom_settings: dict = None, game_id: str = "",
+                 seed: int | None = None, headless: bool = False, ruleset: RuleSet | None = None):
+        """
+        Args:
+            player_ids (list[int]): 参加するプレイヤーIDのリスト
+            custom_settings (dict): カスタム設定（弾数、アイテム、'profile' にルールプロファイル名など）
+            game_id (str): ゲームID
+            seed (int | None): 乱数シード。省略時はランダムに決定する
+            headless (bool): Trueの場合、ハードウェア通信・ログファイル出力・標準出力を行わない
+            ruleset (RuleSet | None): 使うルール。省略時は現在の設定に custom_settings を重ねたもの。
+                設定が読み込み直されても、このゲームは最後までこのルールで進む
+        Raises:
+            ConfigError: 未登録のプロファイル、または custom_settings が不正
+        """
+        self.ruleset = ruleset or profiles.rules_for(custom_settings)
+
+        # Deterministic RNG & Action Log (for replay)
+        self.seed = seed if seed is not None else secrets.randbits(63)
+        self.rng = random.Random(self.seed)
+        self.player_ids = list(player_ids)
+        self.actions = [] # [method_name, args, kwargs] のリスト
+        self.headless = headless
+
+        # Undo/Redo Journal
+        self.journal = Journal()
+
+        # Change Notification (for WebSocket/SSE push)
+        self._listeners = []
+        self._mutation_depth = 0
+        self._dirty = False
+
+        # State Versioning (for incremental diffs)
+        self.version = 0
+        self._state_history = deque(maxlen=STATE_HISTORY_SIZE) # (version, core_state, log_count, message_count)
+        self._state_json = {} # 表示 (None=全体, プレイヤーID) -> シリアライズ済みの状態。変更のたびに捨てる
+
+        self.players = [Player(pid, self.ruleset) for pid in player_ids]
+        self.shotgun = Shotgun(self.rng)
+        for player in self.players:
+            player.journal = self.journal
+        self.shotgun.journal = self.journal
+        self.game_id = game_id
         self.round_number = 0
         self.current_player_index = 0
         self.custom_settings = custom_settings or {}
         
         # Logging
-        self.logs = []
+        self.logs = deque(maxlen=LOG_TAIL_SIZE) # 直近ログのリングバッファ
+        self.log_count = 0 # これまでに記録したログの総数
         self.start_time = datetime.now()
-        self.log_event("GAME_START", f"Game started with players: {player_ids}")
         
         # Admin Messages
         self.messages = [] # List of {timestamp, message}
         self.messages = [] # List of {timestamp, message}
         self.is_terminated = False
-        
-        # Undo History
-        self.history = []
+        self._game_over_logged = False
 
         # Interaction State (for Handcuffs etc)
         self.pending_interaction = None # { 'type': 'select_target', 'source': player_id, 'item': item_name }
@@ -39,6 +144,51 @@ class Game:
         # Last Action (for UI Popups)
         self.last_action = None # { 'type', 'source', 'target', 'item', 'result', 'timestamp' }
 
+        # ゲーム外のスレッドからの変更を、このゲームの待ち行列に載せる関数（GameManager が設定する）
+        self.post = None # post(fn) -> fn(game) を他の操作と直列に実行する
+
+        self.log_event("GAME_START", f"Game started with players: {player_ids}")
+
+    def add_listener(self, callback):
+        """状態が変化した時に callback(game) を呼び出すよう登録する"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _set(self, name: str, value):
+        """Undo の対象になる属性（ラウンド数・手番）を変更する"""
+        record_setattr(self.journal, self, name, value)
+
+    def _mark_changed(self):
+        """状態が変化したことを記録する。mutation の外で呼ばれた場合は即座に通知する"""
+        self._dirty = True
+        self._state_json.clear()
+        if self._mutation_depth == 0:
+            self._commit_changes()
+
+    @metrics.timed('commit')
+    def _commit_changes(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        self.version += 1
+        if not self.headless:
+            core_state = self._core_state()
+            self._state_history.append((self.version, core_state, self.log_count, len(self.messages)))
+            # テーブル端末にも最新状態を送る（操作中なら同じ操作の通知と1フレームにまとまる）
+            hardware_interface.send_game_state(self.game_id, {**core_state, 'version': self.version})
+            if self.status != 'active':
+                hardware_interface.forget_game(self.game_id)
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception:
+                log.exception("State listener failed (game %s)", self.game_id)
+
+    @mutation
     def set_pending_interaction(self, interaction_type: str, source_id: int, item_name: str):
         self.pending_interaction = {
             'type': interaction_type,
@@ -47,6 +197,7 @@ class Game:
         }
         self.log_event("INTERACTION_START", f"Interaction started: {interaction_type} by Player {source_id}")
 
+    @mutation
     def clear_pending_interaction(self):
         if self.pending_interaction:
             self.log_event("INTERACTION_END", "Interaction cleared/cancelled.")
@@ -61,16 +212,24 @@ class Game:
 
     def log_event(self, event_type: str, message: str):
         """イベントをログに記録する"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = _timestamp()
         log_entry = {
+            "seq": self.log_count,
             "timestamp": timestamp,
             "type": event_type,
             "message": message,
             "round": self.round_number
         }
         self.logs.append(log_entry)
-        print(f"[{timestamp}] [{event_type}] {message}")
-
+        self.log_count += 1
+        if not self.headless:
+            if self.game_id:
+                event_log_writer.write(self.game_id, log_entry)
+            if log.isEnabledFor(logging.INFO):
+                log.info("[%s] %s", event_type, message, extra={'game_id': self.game_id, 'round': self.round_number})
+        self._mark_changed()
+
+    @mutation
     def broadcast_message(self, message: str, duration: int = None):
         """全プレイヤー（タブレット）にメッセージを送信"""
         self.messages.append({
@@ -80,6 +239,7 @@ class Game:
         })
         self.log_event("ADMIN_MESSAGE", message)
 
+    @mutation
     def force_end(self):
         """ゲームを強制終了する"""
         self.is_terminated = True
@@ -87,21 +247,30 @@ class Game:
         self.save_logs()
 
     def save_logs(self):
-        """ログをファイルに保存する"""
-        os.makedirs("logs", exist_ok=True)
-        filename = f"logs/game_{self.game_id}_{self.start_time.strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.logs, f, indent=2, ensure_ascii=False)
-        print(f"Logs saved to {filename}")
+        """
+        ログファイルを閉じる。ログは記録のたびにバックグラウンドで追記されているため、
+        ここでは未書き込み分の書き出しを依頼するだけで待たない。
+        """
+        if not self.game_id or self.headless:
+            return
+        event_log_writer.close(self.game_id)
+        log.info("Logs saved to %s", game_log_path(self.game_id))
+
+    def recent_logs(self, count: int) -> list[dict]:
+        """直近 count 件のログを返す"""
+        start = max(0, len(self.logs) - count)
+        return [self.logs[i] for i in range(start, len(self.logs))]
 
+    @metrics.timed('round_start')
+    @mutation
     def start_new_round(self):
         if self.is_terminated: return
 
-        self.round_number += 1
+        self._set('round_number', self.round_number + 1)
         self.log_event("ROUND_START", f"Round {self.round_number} Starting")
         
         living_players = [p for p in self.players if p.lives > 0]
-        items_to_distribute = logic.distribute_items(self.round_number, living_players, self.custom_settings)
+        items_to_distribute = logic.distribute_items(self.round_number, living_players, self.rng, self.ruleset)
         
         for player_id, item_names in items_to_distribute.items():
             player = self.get_player_by_id(player_id)
@@ -114,34 +283,53 @@ class Game:
 
     def reload_shotgun(self):
         self.log_event("SHOTGUN_RELOAD", "Reloading shotgun...")
-        live_count, blank_count = logic.calculate_shell_counts(self.round_number, self.custom_settings)
+        live_count, blank_count = logic.calculate_shell_counts(self.round_number, self.ruleset)
         self.shotgun.load_shells(live_count, blank_count)
         self.log_event("SHOTGUN_LOADED", f"Shotgun loaded with {live_count} live and {blank_count} blank shells.")
 
+    @metrics.timed('action')
+    @mutation
     def handle_action(self, action_data: dict):
         if self.is_terminated: return
 
         # Save state before action
         self.save_checkpoint()
+        try:
+            action = action_data.get('action')
+            if action == 'shoot':
+                target_id = action_data.get('target_id')
+                if target_id is None: return
+                self.shoot(int(target_id))
+            elif action == 'use':
+                item_name = action_data.get('item_name')
+                kwargs = {'target_id': action_data.get('target_id')}
+                self.use_item(item_name, **kwargs)
+
+            # Clear interaction if action was successful (or attempted)
+            # We might want to be more specific, but for now, any action clears the pending state
+            self.clear_pending_interaction()
+        finally:
+            self.journal.commit()
+
+    @mutation
+    def reset(self):
+        """ゲームをラウンド1からやり直す（Undo可能）"""
+        self.save_checkpoint()
+        try:
+            self._set('round_number', 0)
+            for p in self.players:
+                p.lives = self.ruleset.initial_lives
+                p.items = []
+                p.skip_turns = 0
+            self.start_new_round()
+        finally:
+            self.journal.commit()
 
-        action = action_data.get('action')
-        if action == 'shoot':
-            target_id = action_data.get('target_id')
-            if target_id is None: return
-            self.shoot(int(target_id))
-        elif action == 'use':
-            item_name = action_data.get('item_name')
-            kwargs = {'target_id': action_data.get('target_id')}
-            self.use_item(item_name, **kwargs)
-        
-        # Clear interaction if action was successful (or attempted)
-        # We might want to be more specific, but for now, any action clears the pending state
-        self.clear_pending_interaction()
-
+    @metrics.timed('shoot')
     def shoot(self, target_id: int):
         # Auto-reload check removed from start to allow "click" on empty if we wanted, 
         # but here we want to prevent shooting if empty, though it should have auto-reloaded.
-        if not self.shotgun.chamber:
+        if not self.shotgun.remaining:
             self.log_event("SHOTGUN_EMPTY", "Shotgun is empty! Reloading...")
             self.start_new_round()
             return
@@ -155,11 +343,12 @@ class Game:
         
         shell = self.shotgun.fire()
         self.log_event("ACTION_SHOOT", f"{self.current_player.name} shoots at {target_player.name}...")
-        hardware_interface.signal_shot_fired(self.game_id, self.current_player.id, shell)
+        if not self.headless:
+            hardware_interface.signal_shot_fired(self.game_id, self.current_player.id, shell)
         
         # Calculate damage based on config
         base_damage = 1
-        damage_multiplier = config.config.get('item_effects', {}).get('saw_damage_multiplier', 2)
+        damage_multiplier = self.ruleset.saw_damage_multiplier
         damage = (base_damage * damage_multiplier) if is_sawed_off else base_damage
         
         # If shotgun.fire() didn't reset it, we might need to. 
@@ -187,13 +376,15 @@ class Game:
             'result': result_msg,
             'timestamp': time.time()
         }
+        if not self.headless:
+            self.send_trigger(shell)
 
         if self.is_game_over(): 
             self.save_logs()
             return
 
         # Auto-Reload Check: If chamber is now empty, reload immediately
-        if not self.shotgun.chamber:
+        if not self.shotgun.remaining:
              self.log_event("SHOTGUN_EMPTY", "Chamber is empty. Starting new round sequence...")
              # We wait a brief moment or just trigger it. 
              # Since this is a turn-based API, we just update the state.
@@ -221,9 +412,36 @@ class Game:
         # But if the round ends, does the turn pass?
         # Let's assume turn logic handles "who goes next".
         # If the gun is empty, we MUST reload.
-        if not self.shotgun.chamber and not self.is_game_over():
+        if not self.shotgun.remaining and not self.is_game_over():
              self.start_new_round()
 
+    def send_trigger(self, shell: str):
+        """
+        物理ショットガンへ発射トリガーを送信する（待たない）。
+        送達結果は last_action['hardware'] に反映されるが、操作ログには残さない。
+        """
+        action = self.last_action = {**self.last_action, 'hardware': {'status': 'pending'}}
+
+        def apply(game: 'Game', ack: dict):
+            # 既に次のアクションに進んでいれば何もしない
+            if game.last_action is not action:
+                return
+            game.last_action = {**action, 'hardware': {'status': ack['status'], 'latency_ms': round(ack['latency_ms'], 1)}}
+            game._mark_changed()
+
+        def on_ack(ack: dict):
+            # 通信用スレッドから呼ばれるので、他の操作と競合しないようゲームの待ち行列を通す
+            if self.post is None:
+                apply(self, ack)
+                return
+            try:
+                self.post(apply, ack)
+            except ActionQueueFull:
+                pass # 混雑時は送達状況の表示を諦める（ゲーム進行には影響しない）
+
+        hardware_dispatcher.submit("shotgun", f"FIRE:{shell}", on_ack=on_ack)
+
+    @metrics.timed('item_use')
     def use_item(self, item_name: str, **kwargs):
         player = self.current_player
         item = player.find_item(item_name)
@@ -235,9 +453,10 @@ class Game:
         self.log_event("ACTION_USE_ITEM", f"{player.name} tries to use {item.name}...")
         success, message = item.use(self, **kwargs)
 
-        hardware_interface.signal_item_use_result(
-            self.game_id, player.id, item.name, success, message
-        )
+        if not self.headless:
+            hardware_interface.signal_item_use_result(
+                self.game_id, player.id, item.name, success, message
+            )
 
         if success:
             self.log_event("ITEM_SUCCESS", f"Success: {message}")
@@ -262,33 +481,45 @@ class Game:
             self.log_event("ITEM_FAIL", f"Failed to use {item.name}: {message}")
 
     def next_turn(self):
-        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+        self._set('current_player_index', (self.current_player_index + 1) % len(self.players))
 
         while self.current_player.skip_turns > 0 or self.current_player.lives <= 0:
             if self.current_player.skip_turns > 0:
                 self.current_player.skip_turns -= 1
                 self.log_event("TURN_SKIP", f"{self.current_player.name} is skipped due to Handcuffs.")
-            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            self._set('current_player_index', (self.current_player_index + 1) % len(self.players))
 
         self.log_event("TURN_CHANGE", f"Turn passes to {self.current_player.name}.")
 
+    def _is_decided(self) -> bool:
+        """終了条件を満たしているか（ログを残さない判定）"""
+        living_players = [p for p in self.players if p.lives > 0]
+        if self.ruleset.first_death:
+            return len(living_players) < len(self.players)
+        return len(living_players) <= 1 # last_man_standing
+
+    @property
+    def status(self) -> str:
+        """'active' / 'over' / 'terminated'"""
+        if self.is_terminated:
+            return 'terminated'
+        return 'over' if self._is_decided() else 'active'
+
     def is_game_over(self) -> bool:
         if self.is_terminated: return True
 
-        end_condition = config.rules.get('end_condition', 'last_man_standing')
-        living_players = [p for p in self.players if p.lives > 0]
-        
-        if end_condition == 'first_death':
-            is_over = len(living_players) < len(self.players)
-        else: # last_man_standing
-            is_over = len(living_players) <= 1
-        
-        if is_over:
+        is_over = self._is_decided()
+        if is_over and not self._game_over_logged:
+             # 判定は何度も呼ばれる（ダッシュボードの一覧など）ので、ログは決着時に1回だけ残す
+             self._game_over_logged = True
              winner = self.get_winner()
              if winner:
                  self.log_event("GAME_OVER", f"Winner is {winner.name}!")
              else:
                  self.log_event("GAME_OVER", "Game ends in a draw.")
+        elif not is_over:
+             # Undo などで決着前に戻った場合は、次の決着で再びログを残す
+             self._game_over_logged = False
         
         return is_over
 
@@ -296,8 +527,7 @@ class Game:
         # Removed recursive call to self.is_game_over()
         living_players = [p for p in self.players if p.lives > 0]
         
-        end_condition = config.rules.get('end_condition', 'last_man_standing')
-        if end_condition == 'first_death':
+        if self.ruleset.first_death:
             # In first_death, if someone died, the game is over. 
             # But who is the winner? Usually the last one alive or everyone else?
             # If it's "first death loses", then everyone else wins? 
@@ -307,9 +537,10 @@ class Game:
         else: # last_man_standing
             return living_players[0] if len(living_players) == 1 else None
 
-    def get_state(self) -> dict:
+    def _core_state(self) -> dict:
+        """ログとメッセージを除いた、差分比較の対象となる状態"""
         players_state = [
-            {'id': p.id, 'name': p.name, 'lives': p.lives, 'items': [item.name for item in p.items], 'is_skipped': p.skip_turns > 0}
+            {'id': p.id, 'name': p.name, 'lives': p.lives, 'items': p.item_names(), 'is_skipped': p.skip_turns > 0}
             for p in self.players
         ]
         live_count, blank_count = self.shotgun.get_shell_counts()
@@ -318,52 +549,121 @@ class Game:
             'blank_shells': blank_count,
             'is_sawed_off': self.shotgun.is_sawed_off
         }
-        state = {
+        return {
             'round': self.round_number,
             'players': players_state,
             'shotgun': shotgun_state,
             'current_player_id': self.current_player.id,
             'current_player_index': self.current_player_index,
             'is_terminated': self.is_terminated,
-            'messages': self.messages,
-            'logs': self.logs[-10:], # Send last 10 logs for UI
             'pending_interaction': self.pending_interaction,
             'last_action': self.last_action
         }
+
+    @metrics.timed('state_build')
+    @read_only
+    def get_state(self) -> dict:
+        state = self._core_state()
+        state['version'] = self.version
+        state['messages'] = self.messages
+        state['logs'] = self.recent_logs(10) # Send last 10 logs for UI
         return state
 
-    def save_checkpoint(self):
-        """現在のゲーム状態を履歴に保存する"""
-        # Deepcopy is expensive, but safe for this scale
-        state_snapshot = {
-            'players': copy.deepcopy(self.players),
-            'shotgun': copy.deepcopy(self.shotgun),
-            'round_number': self.round_number,
-            'current_player_index': self.current_player_index,
-            'is_terminated': self.is_terminated,
-            'logs': copy.deepcopy(self.logs),
-            'messages': copy.deepcopy(self.messages)
+    @read_only
+    def get_player_state(self, player_id: int) -> dict:
+        """
+        プレイヤーのタブレット向けの状態。操作ログは含めず、他のプレイヤーが虫眼鏡で見た弾の種類も伏せる。
+        Raises:
+            ValueError: 該当するプレイヤーがいない
+        """
+        player = self.get_player_by_id(player_id)
+        if player is None:
+            raise ValueError(f"Player {player_id} is not in this game")
+        state = self._core_state()
+        last_action = state['last_action']
+        if last_action and last_action.get('item') == "MagnifyingGlass" and last_action['source'] != player.name:
+            state['last_action'] = {**last_action, 'result': None}
+        state['version'] = self.version
+        state['messages'] = self.messages
+        state['viewer'] = {'player_id': player_id, 'is_your_turn': self.current_player.id == player_id}
+        return state
+
+    @read_only
+    def get_state_json(self, player_id: int | None = None) -> bytes:
+        """
+        get_state()（player_id を指定すると get_player_state()）を JSON にしたもの。
+        次に状態が変わるまでは同じバイト列を使い回すので、変化のないゲームの読み出しはシリアライズを伴わない。
+        """
+        payload = self._state_json.get(player_id)
+        if payload is None:
+            state = self.get_state() if player_id is None else self.get_player_state(player_id)
+            with metrics.span('state_serialize'):
+                payload = orjson.dumps(state)
+            self._state_json[player_id] = payload
+        return payload
+
+    @read_only
+    def get_state_since(self, since_version: int) -> dict | None:
+        """
+        指定バージョンからの差分を返す。
+        Returns:
+            dict | None: 変化がなければNone。履歴に残っていれば {'version', 'since', 'patch'}、
+                         古すぎる場合は {'version', 'full'}。
+        """
+        if since_version == self.version:
+            return None
+
+        base = next((h for h in self._state_history if h[0] == since_version), None)
+        if base is not None:
+            # ログとメッセージは追記のみなので、増えた分だけを送ればよい
+            _, old_state, old_log_count, old_message_count = base
+            new_logs = self.recent_logs(min(self.log_count - old_log_count, 10))
+            patch = make_patch(old_state, self._core_state())
+            patch += append_patch('/logs', new_logs)
+            patch += append_patch('/messages', self.messages[old_message_count:])
+            return {'version': self.version, 'since': since_version, 'patch': patch}
+
+        return {'version': self.version, 'full': self.get_state()}
+
+    @read_only
+    def get_action_log(self) -> dict:
+        """
+        シード・設定・ルール・操作列からなるゲームログを返す。replay() に渡すと同じ状態を再現できる。
+        ルールは作成時に固定したものをそのまま含めるので、後で設定ファイルやプロファイルが変わっても同じ結果になる
+        """
+        return {
+            'game_id': self.game_id,
+            'seed': self.seed,
+            'player_ids': self.player_ids,
+            'custom_settings': self.custom_settings,
+            'rules': self.ruleset.snapshot(),
+            'actions': [list(action) for action in self.actions]
         }
-        self.history.append(state_snapshot)
-        # Limit history size to prevent memory issues
-        if len(self.history) > 50:
-            self.history.pop(0)
-        print(f"[Undo] Checkpoint saved. History size: {len(self.history)}")
 
+    @metrics.timed('checkpoint')
+    def save_checkpoint(self):
+        """
+        アクション前のチェックポイント。
+        状態をコピーする代わりに、以降の変更を1つのUndo単位としてジャーナルに記録し始める。
+        """
+        self.journal.begin()
+
+    @mutation
     def undo(self) -> bool:
         """1つ前の状態に戻す"""
-        if not self.history:
-            print("[Undo] No history to undo.")
+        if not self.journal.undo():
+            log.info("No history to undo (game %s)", self.game_id)
             return False
-        
-        last_state = self.history.pop()
-        self.players = last_state['players']
-        self.shotgun = last_state['shotgun']
-        self.round_number = last_state['round_number']
-        self.current_player_index = last_state['current_player_index']
-        self.is_terminated = last_state['is_terminated']
-        self.logs = last_state['logs']
-        self.messages = last_state['messages']
-        
+
         self.log_event("UNDO", "Game state reverted to previous checkpoint.")
         return True
+
+    @mutation
+    def redo(self) -> bool:
+        """Undoで取り消したアクションをやり直す"""
+        if not self.journal.redo():
+            log.info("No history to redo (game %s)", self.game_id)
+            return False
+
+        self.log_event("REDO", "Game state restored to the next checkpoint.")
+        return True
@@ -1,29 +1,235 @@
 import json
+import os
+import threading
+from types import MappingProxyType
+from .items import ITEMS
+from .sampling import AliasSampler
+
+END_CONDITIONS = ('first_death', 'last_man_standing')
+# RuleSet に取り込む設定ファイルの節
+RULE_SECTIONS = ('game_rules', 'item_effects', 'shell_counts_by_round', 'item_distribution')
+# ライフ・弾数・配布数の上限（テーブル端末向けのフレームでは1バイトで送る。hardware/codec.py）
+BYTE_MAX = 0xFF
+
+class ConfigError(ValueError):
+    """設定ファイルの内容が不正"""
+
+class RuleSet:
+    """
+    設定ファイルのゲームルール部分をコンパイルした、変更できない設定。
+    ラウンドごとの表は配列に、効果量は属性に展開してあるので、参照のたびに辞書をたどったり
+    ラウンド番号を文字列にしたりしない。読み込み直すと新しい RuleSet が作られ、既存のものは変わらない。
+    """
+    __slots__ = ('version', 'end_condition', 'first_death', 'initial_lives', 'max_lives',
+                 'saw_damage_multiplier', 'cigarette_heal_amount',
+                 'shell_counts_table', 'default_shell_counts', 'items_per_round_table', 'default_items_per_round',
+                 'item_probabilities', 'item_sampler', 'source')
+
+    def __init__(self, settings: dict, version: int = 0):
+        """
+        Args:
+            settings (dict): config.json と同じ形式の辞書（game_rules, item_effects, shell_counts_by_round, item_distribution）
+            version (int): 版番号
+        Raises:
+            ConfigError: 値が不正
+        """
+        rules = _section(settings, 'game_rules')
+        effects = settings.get('item_effects', {})
+        distribution = _section(settings, 'item_distribution')
+
+        end_condition = rules.get('end_condition', 'last_man_standing')
+        if end_condition not in END_CONDITIONS:
+            raise ConfigError(f"game_rules.end_condition must be one of {END_CONDITIONS}, got {end_condition!r}")
+        initial_lives = _integer(rules.get('initial_lives'), 'game_rules.initial_lives', minimum=1)
+        max_lives = _integer(rules.get('max_lives'), 'game_rules.max_lives', minimum=initial_lives, maximum=BYTE_MAX)
+
+        shell_counts, default_shells = _round_table(_section(settings, 'shell_counts_by_round'), 'shell_counts_by_round',
+                                                    _shell_pair)
+        items_per_round, default_items = _round_table(_section(distribution, 'items_per_round', 'item_distribution'),
+                                                      'item_distribution.items_per_round',
+                                                      lambda value, path: _integer(value, path, minimum=0, maximum=BYTE_MAX))
+
+        probabilities = _section(distribution, 'item_probabilities', 'item_distribution')
+        for name, weight in probabilities.items():
+            if name not in ITEMS:
+                raise ConfigError(f"item_distribution.item_probabilities: unknown item {name!r}")
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+                raise ConfigError(f"item_distribution.item_probabilities.{name} must be a non-negative number")
+
+        values = {
+            'version': version,
+            'end_condition': end_condition,
+            'first_death': end_condition == 'first_death',
+            'initial_lives': initial_lives,
+            'max_lives': max_lives,
+            'saw_damage_multiplier': _integer(effects.get('saw_damage_multiplier', 2), 'item_effects.saw_damage_multiplier', minimum=1),
+            'cigarette_heal_amount': _integer(effects.get('cigarette_heal_amount', 1), 'item_effects.cigarette_heal_amount', minimum=0),
+            'shell_counts_table': shell_counts,
+            'default_shell_counts': default_shells,
+            'items_per_round_table': items_per_round,
+            'default_items_per_round': default_items,
+            'item_probabilities': MappingProxyType(dict(probabilities)),
+            # 正の重みが1つもなければアイテムは配られない
+            'item_sampler': AliasSampler(probabilities) if any(w > 0 for w in probabilities.values()) else None,
+            'source': MappingProxyType({key: settings[key] for key in RULE_SECTIONS if key in settings}),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleSet is immutable; reload the config to change it")
+
+    def derive(self, overrides: dict) -> 'RuleSet':
+        """
+        一部の節・項目だけを差し替えた RuleSet を作る（版番号は引き継ぐ）。
+        game_rules・item_effects・item_distribution は項目ごとに上書きし、
+        shell_counts_by_round とラウンドごと・アイテムごとの表は丸ごと置き換える。
+        Raises:
+            ConfigError: 差し替え後の値が不正
+        """
+        unknown = set(overrides) - set(RULE_SECTIONS)
+        if unknown:
+            raise ConfigError(f"unknown rule sections: {', '.join(sorted(unknown))}")
+        settings = dict(self.source)
+        for key, value in overrides.items():
+            if key == 'shell_counts_by_round':
+                settings[key] = value
+            else:
+                settings[key] = {**settings.get(key, {}), **_section(overrides, key)}
+        return RuleSet(settings, self.version)
+
+    def snapshot(self) -> dict:
+        """JSON にできる形 {'version', 'source'}。from_snapshot() で同じルールを作り直せる（ゲームと一緒に保存する用）"""
+        return {'version': self.version, 'source': dict(self.source)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> 'RuleSet':
+        return cls(snapshot['source'], snapshot['version'])
+
+    def shell_counts(self, round_number: int) -> tuple[int, int]:
+        """(実弾の数, 空砲の数)"""
+        table = self.shell_counts_table
+        return table[round_number] if 0 <= round_number < len(table) else self.default_shell_counts
+
+    def items_per_round(self, round_number: int) -> int:
+        table = self.items_per_round_table
+        return table[round_number] if 0 <= round_number < len(table) else self.default_items_per_round
+
+def _section(settings: dict, key: str, parent: str = "") -> dict:
+    value = settings.get(key)
+    if not isinstance(value, dict):
+        raise ConfigError(f"{parent + '.' if parent else ''}{key} must be an object")
+    return value
+
+def _integer(value, path: str, minimum: int, maximum: int | None = None) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ConfigError(f"{path} must be an integer >= {minimum}, got {value!r}")
+    if maximum is not None and value > maximum:
+        raise ConfigError(f"{path} must be an integer <= {maximum}, got {value!r}")
+    return value
+
+def _shell_pair(value, path: str) -> tuple[int, int]:
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ConfigError(f"{path} must be [live, blank]")
+    live, blank = _integer(value[0], path + "[0]", 0, BYTE_MAX), _integer(value[1], path + "[1]", 0, BYTE_MAX)
+    if live + blank == 0:
+        raise ConfigError(f"{path} must load at least one shell")
+    return live, blank
+
+def _round_table(table: dict, path: str, convert) -> tuple[tuple, object]:
+    """{"default": x, "1": y, ...} を、ラウンド番号を添字とする配列と既定値に展開する"""
+    if 'default' not in table:
+        raise ConfigError(f"{path} needs a 'default' entry")
+    default = convert(table['default'], f"{path}.default")
+    rounds = {}
+    for key, value in table.items():
+        if key == 'default':
+            continue
+        if not key.isdigit() or int(key) < 1:
+            raise ConfigError(f"{path}: round keys must be positive integers, got {key!r}")
+        rounds[int(key)] = convert(value, f"{path}.{key}")
+    return tuple(rounds.get(r, default) for r in range(max(rounds, default=0) + 1)), default
 
 class GameConfig:
     _instance = None
 
-    def __new__(cls, config_file='config.json'):
+    def __new__(cls, config_file=None):
+        # 環境変数 BR_CONFIG で別の設定ファイルを指定できる（負荷試験などで起動するワーカー用）
+        config_file = config_file or os.environ.get('BR_CONFIG', 'config.json')
         if cls._instance is None:
             cls._instance = super(GameConfig, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._watch_stop = None
+            cls._instance.ruleset = None
             cls._instance._load_config(config_file)
         return cls._instance
 
     def _load_config(self, config_file):
-        with open(config_file, 'r') as f:
-            self.config = json.load(f)
+        """読み込みと検証が済んでから差し替える。失敗した時は今の設定のまま ConfigError/OSError を送出する"""
+        with self._lock:
+            mtime = os.stat(config_file).st_mtime_ns
+            with open(config_file, 'r') as f:
+                try:
+                    settings = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ConfigError(f"{config_file}: {e}") from e
+            ruleset = RuleSet(settings, version=self.ruleset.version + 1 if self.ruleset else 1)
+            self.path = config_file
+            self._mtime = mtime
+            self.config = settings
+            # 進行中のゲームは作成時の RuleSet を持ち続けるので、ここで差し替えても影響しない
+            self.ruleset = ruleset
+
+    def reload(self, config_file=None):
+        """設定ファイルを読み込み直す"""
+        self._load_config(config_file or os.environ.get('BR_CONFIG', 'config.json'))
+
+    def watch(self, interval: float = 1.0):
+        """
+        設定ファイルの更新を interval 秒ごとに確かめ、変わっていれば読み込み直す。
+        反映されるのはそれ以降に作られるゲームのルールだけ（通信・ストレージなどの設定は再起動が必要）。
+        """
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+        threading.Thread(target=self._watch_loop, args=(interval, self._watch_stop), name="config-watcher", daemon=True).start()
+
+    def stop_watching(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def _watch_loop(self, interval: float, stop: threading.Event):
+        from utils.log import get_logger
+        log = get_logger("config")
+        while not stop.wait(interval):
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._mtime:
+                continue
+            try:
+                self._load_config(self.path)
+            except (OSError, ConfigError) as e:
+                self._mtime = mtime # 同じ内容で何度も失敗しないよう、次に更新されるまで待つ
+                log.warning("Config reload failed, keeping version %d: %s", self.ruleset.version, e)
+            else:
+                log.info("Config reloaded from %s (version %d)", self.path, self.ruleset.version)
+
+    @property
+    def version(self) -> int:
+        return self.ruleset.version
 
     @property
     def rules(self):
         return self.config['game_rules']
 
-    def get_shell_counts(self, round_number: int) -> list[int]:
-        round_str = str(round_number)
-        return self.config['shell_counts_by_round'].get(round_str, self.config['shell_counts_by_round']['default'])
+    def get_shell_counts(self, round_number: int) -> tuple[int, int]:
+        return self.ruleset.shell_counts(round_number)
 
     def get_items_per_round(self, round_number: int) -> int:
-        round_str = str(round_number)
-        return self.config['item_distribution']['items_per_round'].get(round_str, self.config['item_distribution']['items_per_round']['default'])
+        return self.ruleset.items_per_round(round_number)
 
     @property
     def item_probabilities(self) -> dict:
@@ -36,5 +242,25 @@ class GameConfig:
     def get_device_config(self, device_name: str) -> dict | None:
         return self.network_config.get('devices', {}).get(device_name)
 
+    @property
+    def storage_config(self) -> dict:
+        return self.config.get('storage', {})
+
+    @property
+    def sharding_config(self) -> dict:
+        return self.config.get('sharding', {})
+
+    @property
+    def metrics_config(self) -> dict:
+        return self.config.get('metrics', {})
+
+    @property
+    def logging_config(self) -> dict:
+        return self.config.get('logging', {})
+
+    @property
+    def reload_config(self) -> dict:
+        return self.config.get('hot_reload', {})
+
 # シングルトンインスタンスとしてエクスポート
 config = GameConfig()
@@ -1,46 +1,359 @@
+import concurrent.futures
+import functools
+import os
+import socket
+import threading
+import time
 import uuid
-from .game import Game
+from collections import OrderedDict
+from .action_router import ActionRouter, ActionQueueFull, GameNotFound
+from .event_log import event_log_writer
+from .game import Game, read_only
+from .replay import replay, REPLAYABLE_ACTIONS
+from .sharding import shard_of
+from .storage import GameStore, SORT_COLUMNS, encode_cursor, decode_cursor
+from hardware.interface import hardware_interface
+from utils.log import get_logger
+
+# メモリ上に保持するゲーム数の既定値（ストア使用時のみ、終了済みのものから追い出す）
+DEFAULT_MAX_CACHED_GAMES = 1000
+# ワーカー間でストアを共有する場合のリース期限と、他ワーカーの更新を取り込む間隔（秒）
+DEFAULT_LEASE_TTL = 5.0
+DEFAULT_SYNC_INTERVAL = 0.5
+
+log = get_logger("manager")
 
 class GameManager:
     """複数のゲームインスタンスを管理するクラス"""
     def __init__(self):
-        self.games = {}
+        self.games = OrderedDict() # ゲームID -> Game（最近使われた順）
+        self.store: GameStore | None = None
+        self.max_cached_games = DEFAULT_MAX_CACHED_GAMES
+        self._persisted_counts = {} # ゲームID -> ストアに書き込み済みの操作数
+        self.summaries = {} # ゲームID -> 一覧用サマリー（ストアがない場合の一覧の元データ）
+        self.listing_version = 0 # サマリーが変わるたびに増える（一覧の ETag 用）
+        self._boot_id = uuid.uuid4().hex[:8]
+        self.router = ActionRouter(self) # ゲームごとに操作を直列化する待ち行列
+        self._listeners = [] # 管理下のすべてのゲームに登録するリスナー (add_listener)
+        self.shard_index, self.shard_count = 0, 1 # 複数プロセスで分担する場合の担当範囲
+        self._lock = threading.RLock() # games の出し入れ（Webと待ち行列のワーカーの両方から呼ばれる）
+        self.shared = False # 他のプロセスと同じストアを共有しているか
+        self.lease_ttl = DEFAULT_LEASE_TTL
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{self._boot_id}" # リースの持ち主としての名前
+        self._sync_thread: threading.Thread | None = None
 
-    def create_game(self, player_ids: list[int], custom_settings: dict = None) -> str:
+    def set_store(self, store: GameStore | None, max_cached_games: int = DEFAULT_MAX_CACHED_GAMES,
+                  shared: bool = False, lease_ttl: float = DEFAULT_LEASE_TTL,
+                  sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        """
+        永続化ストアを設定する。設定後は作成したゲームの操作ログがストアに追記され、
+        メモリにないゲームは get_game() 時にストアから復元される。
+        shared=True の場合は、同じストアを使う複数のワーカープロセスのどれがどのゲームを扱ってもよい。
+        ゲームへの操作はそのゲームのリースを取ってから、他のワーカーが追記した操作を取り込んで実行する。
+        """
+        self.store = store
+        self.max_cached_games = max_cached_games
+        self.shared = shared and store is not None
+        self.lease_ttl = lease_ttl
+        if self.shared and self._sync_thread is None:
+            self._sync_thread = threading.Thread(target=self._sync_loop, args=(sync_interval,), daemon=True)
+            self._sync_thread.start()
+
+    def set_shard(self, index: int, count: int):
+        """このプロセスが担当するシャードを設定する。以後作成するゲームのIDは必ずこのシャードに属する"""
+        self.shard_index, self.shard_count = index, count
+
+    def owns(self, game_id: str) -> bool:
+        return shard_of(game_id, self.shard_count) == self.shard_index
+
+    def create_game(self, player_ids: list[int], custom_settings: dict = None, seed: int | None = None) -> str:
         """
         新しいゲームを作成し、IDを返す。
         Args:
             player_ids (list[int]): 参加するプレイヤーIDのリスト
             custom_settings (dict): カスタム設定（弾数、アイテムなど）
+            seed (int | None): 乱数シード（試合の再現用）。省略時はランダム
         Returns:
             str: 生成されたゲームID
         """
         game_id = str(uuid.uuid4())[:8]
-        new_game = Game(player_ids, custom_settings)
-        new_game.game_id = game_id
-        self.games[game_id] = new_game
-        print(f"Game created with ID: {game_id}")
+        while not self.owns(game_id):
+            game_id = str(uuid.uuid4())[:8]
+        new_game = Game(player_ids, custom_settings, game_id=game_id, seed=seed)
+        now = time.time()
+        summary = self._summarize(new_game, created_at=now, updated_at=now)
+        if self.store:
+            self.store.create_game(game_id, new_game.seed, new_game.player_ids, new_game.custom_settings,
+                                   new_game.ruleset.snapshot(), summary)
+        with self._lock:
+            self.summaries[game_id] = summary
+            self.listing_version += 1
+            self._track(new_game)
+        log.info("Game created with ID: %s", game_id)
         return game_id
 
     def get_game(self, game_id: str) -> Game | None:
-        """IDを指定してゲームインスタンスを取得する"""
-        return self.games.get(game_id)
+        """IDを指定してゲームインスタンスを取得する。メモリになければストアから復元する"""
+        with self._lock:
+            game = self.games.get(game_id)
+            if game is not None:
+                self.games.move_to_end(game_id)
+                return game
+            if self.store is None or not self.owns(game_id):
+                return None
+        return self._load(game_id)
+
+    def has_game(self, game_id: str) -> bool:
+        """ゲームが存在するか（メモリになければストアを引くが、復元はしない）"""
+        with self._lock:
+            if game_id in self.games:
+                return True
+        if self.store is None or not self.owns(game_id):
+            return False
+        return bool(self.store.action_counts([game_id]))
+
+    def _load(self, game_id: str) -> Game | None:
+        """
+        ストアから復元する。操作ログの再実行は長くかかり得るので、ほかのゲームを止めないよう
+        manager のロックの外で行い、登録する時だけロックを取る
+        """
+        game_log = self.store.load_game_log(game_id)
+        if game_log is None:
+            return None
+        # 再実行中はハードウェア通信・ログ出力をしないよう headless で復元し、その後通常のゲームに戻す
+        game = replay(game_log)
+        game.headless = False
+        with self._lock:
+            # 同時に復元した別のスレッドが先に登録していれば、そちらを使う
+            existing = self.games.get(game_id)
+            if existing is not None:
+                self.games.move_to_end(game_id)
+                return existing
+            now = time.time()
+            self.summaries[game_id] = game_log.get('summary') or self._summarize(game, now, now)
+            self._track(game)
+        log.info("Game %s restored from storage (%d actions).", game_id, len(game.actions))
+        return game
+
+    def add_listener(self, callback):
+        """
+        管理下のすべてのゲーム（以後作成・復元されるものを含む）の状態変化で callback(game) を呼ぶ。
+        メモリから追い出したゲームを復元すると別の Game になるので、ゲーム単位ではなくここで登録する
+        """
+        with self._lock:
+            self._listeners.append(callback)
+            for game in self.games.values():
+                game.add_listener(callback)
+
+    def _track(self, game: Game):
+        self.games[game.game_id] = game
+        self._persisted_counts[game.game_id] = len(game.actions)
+        game.add_listener(self._on_change)
+        for callback in self._listeners:
+            game.add_listener(callback)
+        game.post = functools.partial(self.router.submit, game.game_id)
+        self._evict()
+
+    @staticmethod
+    def _summarize(game: Game, created_at: float, updated_at: float) -> dict:
+        """一覧表示用のサマリーを作る"""
+        live_shells, blank_shells = game.shotgun.get_shell_counts()
+        status = game.status
+        return {
+            "id": game.game_id,
+            "status": status,
+            "round": game.round_number,
+            "players": len(game.players),
+            "is_over": status != 'active',
+            "is_terminated": game.is_terminated,
+            "shell_counts": {"live": live_shells, "blank": blank_shells},
+            "current_turn": game.current_player_index + 1 if game.players else 0,
+            "player_stats": [{"id": p.id, "lives": p.lives, "max_lives": p.max_lives} for p in game.players],
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def _on_change(self, game: Game):
+        """
+        状態変化のたびに呼ばれる。新しく記録された操作があれば、
+        サマリーを更新してストアへ操作と一緒に書き込む。
+        """
+        count = self._persisted_counts.get(game.game_id)
+        if count is None or len(game.actions) == count:
+            return
+        with self._lock:
+            summary = self._summarize(game, self.summaries[game.game_id]['created_at'], time.time())
+            self.summaries[game.game_id] = summary
+            self.listing_version += 1
+        if self.store:
+            self.store.append_actions(game.game_id, count, game.actions[count:], summary)
+        self._persisted_counts[game.game_id] = len(game.actions)
+
+    def execute(self, game_id: str, method, args: tuple):
+        """
+        ActionRouter のワーカーから呼ばれ、game.<method>(*args)（関数なら method(game, *args)）を実行する。
+        共有ストアの場合は、実行中ほかのワーカーがこのゲームに触れないようリースを取る。
+        read_only の印が付いた読み出しはリースを取らず、他のワーカーの操作を取り込んでからメモリ上のゲームから読む。
+        """
+        if not self.shared or _is_read_only(method):
+            return self._call(game_id, method, args)
+        self._acquire_lease(game_id)
+        try:
+            return self._call(game_id, method, args)
+        finally:
+            self.store.release_lease(game_id, self._owner)
 
-    def dispatch_action(self, game_id: str, action_data: dict):
-        """外部から受信したアクションを適切なゲームに振り分ける"""
+    def _call(self, game_id: str, method, args: tuple):
         game = self.get_game(game_id)
-        if game:
-            print(f"[GameManager] Dispatching action to game {game_id}: {action_data}")
-            # ここで handle_action を呼び出す。スレッドセーフなキューを介して行うのが望ましい
-            game.handle_action(action_data)
+        if game is None:
+            raise GameNotFound(f"Game {game_id} not found")
+        if self.shared:
+            self._catch_up(game)
+        return method(game, *args) if callable(method) else getattr(game, method)(*args)
+
+    def _acquire_lease(self, game_id: str):
+        deadline = time.monotonic() + self.lease_ttl * 2
+        delay = 0.001
+        while not self.store.acquire_lease(game_id, self._owner, self.lease_ttl):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Game {game_id} is locked by another worker")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _catch_up(self, game: Game):
+        """他のワーカーがストアに追記した操作をメモリ上のゲームに適用する"""
+        actions = self.store.load_actions(game.game_id, len(game.actions))
+        if not actions:
+            return
+        # 再実行分をストアへ書き戻さないよう、適用中は書き込み済み件数の管理から外す。
+        # ハードウェア通知・ログファイルへの書き込みは元のワーカーが済ませているので headless で適用する
+        self._persisted_counts[game.game_id] = None
+        game.headless = True
+        try:
+            for name, args, kwargs in actions:
+                if name not in REPLAYABLE_ACTIONS:
+                    raise ValueError(f"Action '{name}' cannot be replayed.")
+                getattr(game, name)(*args, **kwargs)
+        finally:
+            game.headless = False
+            self._persisted_counts[game.game_id] = len(game.actions)
+
+    def _sync_loop(self, interval: float):
+        """
+        メモリ上のゲームのうち、他のワーカーで進んだものを定期的に取り込む。
+        取り込みは各ゲームの待ち行列で行うので、このワーカーの購読者（WebSocket/SSE）にも変化が届く。
+        """
+        while self.shared:
+            time.sleep(interval)
+            with self._lock:
+                local_counts = {game_id: len(game.actions) for game_id, game in self.games.items()}
+            try:
+                stored_counts = self.store.action_counts(list(local_counts))
+            except Exception as e:
+                log.warning("Sync failed: %s", e)
+                continue
+            for game_id, count in stored_counts.items():
+                if count > local_counts[game_id]:
+                    try:
+                        self.router.submit(game_id, _sync_only)
+                    except ActionQueueFull:
+                        pass # 処理待ちの操作が取り込みも兼ねる
+
+    @property
+    def listing_etag(self) -> str:
+        """サマリーが1つでも変われば変わる ETag。ストアがあれば全ワーカーで共通の値になる"""
+        if self.store:
+            return f'"s{self.store.listing_version()}"'
+        return f'"{self._boot_id}-{self.listing_version}"'
+
+    def list_games(self, status: str | None = None, sort: str = 'updated', descending: bool = True,
+                   cursor: str | None = None, limit: int = 50) -> dict:
+        """
+        サマリー一覧を1ページ分返す。ストアがあればインデックスで、なければメモリ上で並べ替える。
+        Returns:
+            dict: {'games': [...], 'next_cursor': str | None}
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        after = decode_cursor(cursor) if cursor else None
+
+        if self.store:
+            games = self.store.list_summaries(status, sort, descending, after, limit + 1)
         else:
-            print(f"[GameManager] Received action for non-existent game {game_id}")
+            column = SORT_COLUMNS[sort]
+            with self._lock:
+                games = [s for s in self.summaries.values() if status is None or s['status'] == status]
+            games.sort(key=lambda s: (s[column], s['id']), reverse=descending)
+            if after:
+                games = [s for s in games if ((s[column], s['id']) < after if descending else (s[column], s['id']) > after)]
+            games = games[:limit + 1]
+
+        next_cursor = encode_cursor(games[limit - 1], sort) if len(games) > limit else None
+        return {'games': games[:limit], 'next_cursor': next_cursor}
+
+    def _evict(self):
+        """保持数の上限を超えたら、使われていない終了済みのゲームからメモリを解放する"""
+        if self.store is None or len(self.games) <= self.max_cached_games:
+            return
+        newest = next(reversed(self.games))
+        for game_id in [gid for gid, game in self.games.items() if gid != newest and game.status != 'active']:
+            self._unload(game_id)
+            if len(self.games) <= self.max_cached_games:
+                break
+
+    def _unload(self, game_id: str):
+        game = self.games.pop(game_id)
+        game.remove_listener(self._on_change)
+        for callback in self._listeners:
+            game.remove_listener(callback)
+        game.post = None
+        hardware_interface.forget_game(game_id)
+        if not game.headless:
+            event_log_writer.close(game_id)
+        self.router.forget(game_id)
+        self._persisted_counts.pop(game_id, None)
+        if self.store:
+            # ストアから一覧を引けるので、メモリ上のサマリーも手放す
+            self.summaries.pop(game_id, None)
+
+    def dispatch_action(self, game_id: str, action_data: dict) -> concurrent.futures.Future | None:
+        """
+        外部から受信したアクションを適切なゲームに振り分ける。
+        どのスレッドから呼ばれても、同じゲームへの操作はゲームごとの待ち行列で1つずつ実行される。
+        Returns:
+            concurrent.futures.Future | None: 実行完了を表す Future。ゲームがなければNone
+        Raises:
+            ActionQueueFull: 待ち行列が上限に達している
+        """
+        if self.get_game(game_id) is None:
+            log.warning("Received action for non-existent game %s", game_id)
+            return None
+        log.debug("Dispatching action to game %s: %s", game_id, action_data)
+        return self.router.submit(game_id, 'handle_action', action_data)
 
     def end_game(self, game_id: str):
         """IDを指定してゲームを終了（削除）する"""
-        if game_id in self.games:
-            del self.games[game_id]
-            print(f"Game {game_id} has ended.")
+        with self._lock:
+            found = game_id in self.games
+            if found:
+                self._unload(game_id)
+            if self.summaries.pop(game_id, None) is not None:
+                self.listing_version += 1
+        self.router.forget(game_id)
+        if self.store:
+            self.store.delete_game(game_id)
+            self.listing_version += 1
+        if found:
+            log.info("Game %s has ended.", game_id)
+
+def _is_read_only(method) -> bool:
+    if not callable(method):
+        method = getattr(Game, method, None)
+    return getattr(method, 'read_only', False)
+
+@read_only
+def _sync_only(game: Game):
+    """何もしない操作（実行前の取り込みだけを行わせる）"""
 
 # シングルトンインスタンスとしてエクスポート
 game_manager = GameManager()
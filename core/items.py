@@ -26,8 +26,7 @@ class Cigarette(Item):
         if player.lives >= player.max_lives:
             return False, "Health is already full."
         
-        from .game_config import config
-        heal_amount = config.config.get('item_effects', {}).get('cigarette_heal_amount', 1)
+        heal_amount = game.ruleset.cigarette_heal_amount
         player.heal(heal_amount)
         message = f"{player.name} restored {heal_amount} life."
         return True, message
@@ -37,7 +36,7 @@ class Beer(Item):
         super().__init__("Beer", "弾を1発排出する")
 
     def use(self, game: 'Game', **kwargs) -> tuple[bool, str]:
-        if not game.shotgun.chamber:
+        if not game.shotgun.remaining:
             return False, "Shotgun chamber is empty."
             
         shell = game.shotgun.eject_shell()
@@ -81,7 +80,7 @@ class MagnifyingGlass(Item):
         super().__init__("MagnifyingGlass", "次の弾の種類を見る")
 
     def use(self, game: 'Game', **kwargs) -> tuple[bool, str]:
-        if not game.shotgun.chamber:
+        if not game.shotgun.remaining:
             return False, "Shotgun chamber is empty."
             
         shell = game.shotgun.peek_next_shell()
@@ -99,3 +98,7 @@ ITEMS = {
     "handcuffs": Handcuffs(),
     "magnifyingglass": MagnifyingGlass(),
 }
+
+# 所持数配列（Player.item_counts）の並び。添字はアイテム名（小文字）から引く
+ITEM_TYPES = tuple(ITEMS.values())
+ITEM_INDEX = {name: index for index, name in enumerate(ITEMS)}
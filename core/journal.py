@@ -0,0 +1,107 @@
+class SetAttr:
+    """属性の変更（ダメージ・回復、ターン移動、手錠のスキップ数、鋸、ラウンド開始時の装填など）"""
+    __slots__ = ('obj', 'name', 'old', 'new')
+
+    def __init__(self, obj, name: str, old, new):
+        self.obj = obj
+        self.name = name
+        self.old = old
+        self.new = new
+
+    def apply(self):
+        object.__setattr__(self.obj, self.name, self.new)
+
+    def revert(self):
+        object.__setattr__(self.obj, self.name, self.old)
+
+class ArrayAdd:
+    """配列の要素の増減（アイテムの所持数など）"""
+    __slots__ = ('values', 'index', 'delta')
+
+    def __init__(self, values, index: int, delta: int):
+        self.values = values
+        self.index = index
+        self.delta = delta
+
+    def apply(self):
+        self.values[self.index] += self.delta
+
+    def revert(self):
+        self.values[self.index] -= self.delta
+
+class Journal:
+    """
+    Undo/Redo 用の操作ジャーナル。
+    1アクション分の小さな可逆操作をグループとして積み上げるため、
+    チェックポイントのコストはゲームの長さに依存しない。
+    """
+    def __init__(self):
+        self.undo_stack: list[list] = []
+        self.redo_stack: list[list] = []
+        self._group: list | None = None
+
+    @property
+    def recording(self) -> bool:
+        return self._group is not None
+
+    def record(self, op):
+        self._group.append(op)
+
+    def begin(self):
+        """操作グループの記録を開始する。既に記録中なら何もしない"""
+        if self._group is None:
+            self._group = []
+
+    def commit(self):
+        """記録中のグループを確定する。空のグループは捨てる"""
+        group, self._group = self._group, None
+        if group:
+            self.undo_stack.append(group)
+            self.redo_stack.clear()
+
+    def undo(self) -> bool:
+        if not self.undo_stack:
+            return False
+        group = self.undo_stack.pop()
+        for op in reversed(group):
+            op.revert()
+        self.redo_stack.append(group)
+        return True
+
+    def redo(self) -> bool:
+        if not self.redo_stack:
+            return False
+        group = self.redo_stack.pop()
+        for op in group:
+            op.apply()
+        self.undo_stack.append(group)
+        return True
+
+def record_setattr(journal: Journal | None, obj, name: str, value):
+    """記録中であればジャーナルに残しつつ、属性を変更する"""
+    if journal is not None and journal._group is not None:
+        journal.record(SetAttr(obj, name, getattr(obj, name), value))
+    setattr(obj, name, value)
+
+class Journaled:
+    """
+    _journaled_fields に含まれる属性への代入と、_add による配列の要素の増減を
+    ジャーナルに記録するオブジェクトの基底クラス。サブクラスも __slots__ を持つ前提。
+    """
+    __slots__ = ('journal',)
+    _journaled_fields: frozenset = frozenset()
+
+    def __init__(self):
+        object.__setattr__(self, 'journal', None)
+
+    def __setattr__(self, name, value):
+        journal = self.journal
+        if journal is not None and journal._group is not None and name in self._journaled_fields:
+            journal.record(SetAttr(self, name, getattr(self, name), value))
+        object.__setattr__(self, name, value)
+
+    def _add(self, values, index: int, delta: int):
+        values[index] += delta
+        journal = self.journal
+        if journal is not None and journal._group is not None:
+            journal.record(ArrayAdd(values, index, delta))
@@ -1,27 +1,52 @@
 from __future__ import annotations
-import typing
-from .game_config import config
+from .game_config import config, RuleSet
+from .items import Item, ITEM_TYPES, ITEM_INDEX
+from .journal import Journaled
 
-if typing.TYPE_CHECKING:
-    from .items import Item
-
-class Player:
+class Player(Journaled):
     """
     プレイヤーの状態を管理するデータクラス。
+    所持品はアイテムの種類ごとの所持数（ITEM_TYPES の順に並べたバイト列）で持つ。
     """
-    def __init__(self, player_id: int):
+    __slots__ = ('id', 'name', 'lives', 'max_lives', 'item_counts', 'skip_turns')
+    _journaled_fields = frozenset({'lives', 'skip_turns', 'item_counts'})
+
+    def __init__(self, player_id: int, ruleset: RuleSet | None = None):
         """
         Args:
             player_id (int): プレイヤーID (1-4)
+            ruleset (RuleSet | None): ライフの初期値・上限を決めるルール。省略時は現在の設定
         """
+        super().__init__()
+        ruleset = ruleset or config.ruleset
         self.id: int = player_id
-        print(f"DEBUG: Initializing Player {player_id} with NEW CODE")
         self.name: str = f"Player {player_id}"
-        self.lives: int = config.rules['initial_lives']
-        self.max_lives: int = config.rules['max_lives']
-        self.items: list['Item'] = []
+        self.lives: int = ruleset.initial_lives
+        self.max_lives: int = ruleset.max_lives
+        self.item_counts: bytearray = bytearray(len(ITEM_TYPES))
         self.skip_turns: int = 0
 
+    @property
+    def items(self) -> list[Item]:
+        """所持品のアイテムオブジェクトのリスト（種類ごとにまとめた順）。呼ぶたびに作り直す"""
+        return [item for item, count in zip(ITEM_TYPES, self.item_counts) for _ in range(count)]
+
+    @items.setter
+    def items(self, items: list[Item]):
+        counts = bytearray(len(ITEM_TYPES))
+        for item in items:
+            counts[ITEM_INDEX[item.name.lower()]] += 1
+        self.item_counts = counts
+
+    @property
+    def item_count(self) -> int:
+        """所持品の総数"""
+        return sum(self.item_counts)
+
+    def item_names(self) -> list[str]:
+        """所持品の名前のリスト（items と同じ順）"""
+        return [item.name for item, count in zip(ITEM_TYPES, self.item_counts) for _ in range(count)]
+
     def take_damage(self, amount: int):
         """
         ダメージ量を受け取り、ライフを減らす。
@@ -32,27 +57,27 @@ class Player:
         """
         回復量を受け取り、ライフを増やす。上限を超えない。
         """
-        self.lives = min(self.lives + amount, config.rules['max_lives'])
+        self.lives = min(self.lives + amount, self.max_lives)
 
-    def add_item(self, item_obj: 'Item'):
+    def add_item(self, item_obj: Item):
         """
         アイテムオブジェクトを所持品に追加する。
         """
-        self.items.append(item_obj)
+        self._add(self.item_counts, ITEM_INDEX[item_obj.name.lower()], 1)
 
-    def find_item(self, item_name: str) -> 'Item' | None:
+    def find_item(self, item_name: str) -> Item | None:
         """
-        アイテム名を元に所持品からアイテムオブジェクトを探して返す。
+        アイテム名（大文字小文字は区別しない）を元に、所持していればそのアイテムオブジェクトを返す。
         """
-        for item in self.items:
-            if item.name.lower() == item_name.lower():
-                return item
-        return None
+        index = ITEM_INDEX.get(item_name.lower())
+        if index is None or not self.item_counts[index]:
+            return None
+        return ITEM_TYPES[index]
 
     def remove_item(self, item_name: str):
         """
-        アイテム名を元に所持品からアイテムを削除する。
+        アイテム名を元に所持品からアイテムを1つ削除する。
         """
-        item_to_remove = self.find_item(item_name)
-        if item_to_remove:
-            self.items.remove(item_to_remove)
+        index = ITEM_INDEX.get(item_name.lower())
+        if index is not None and self.item_counts[index]:
+            self._add(self.item_counts, index, -1)
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from .game_config import config, ConfigError, RuleSet
+
+PROFILES_FILE = 'profiles.json'
+PROFILE_NAME = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# コンパイル済みの RuleSet を保持する組み合わせ（プロファイル × custom_settings）の上限
+MAX_COMPILED = 1024
+
+class RuleProfiles:
+    """
+    名前付きのルールプロファイル（店舗ごとのハウスルールなど）。
+    config.json と同じディレクトリの profiles.json に {名前: 差し替える設定} の形で保存する。
+    差し替える設定は config.json のルール部分と同じ形式で、RuleSet.derive() で現在の設定に重ねる。
+
+    ゲームのルール（プロファイル + custom_settings）は組み合わせごとに1度だけ RuleSet にコンパイルし、
+    同じ組み合わせのゲームすべてで共有する。config.json が読み込み直されたらコンパイルし直す。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: dict[str, dict] = {}
+        self._mtime: int | None = None
+        self._compiled: dict[tuple, RuleSet] = {} # (プロファイル名, custom_settings のJSON) -> RuleSet
+        self._base_version = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(config.path)), PROFILES_FILE)
+
+    def _refresh(self):
+        """profiles.json が更新されていれば読み込み直す（他のワーカーが保存した分も反映される）。ロックを持って呼ぶ"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        profiles = {}
+        if mtime is not None:
+            with open(self.path, 'r') as f:
+                try:
+                    profiles = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ConfigError(f"{self.path}: {e}") from e
+        self._profiles = profiles
+        self._mtime = mtime
+        self._compiled.clear()
+
+    def list(self) -> dict[str, dict]:
+        """登録済みのプロファイル {名前: 差し替える設定}"""
+        with self._lock:
+            self._refresh()
+            return dict(self._profiles)
+
+    def save(self, name: str, overrides: dict):
+        """
+        プロファイルを検証して登録する（同名のものは置き換える）。
+        置き換えても、そのプロファイルで作成済みのゲームは作成時のルールのまま
+        （ルールはゲームと一緒に保存され、復元・リプレイもそのルールで行う）。
+        Raises:
+            ConfigError: 名前か設定が不正
+        """
+        if not PROFILE_NAME.match(name):
+            raise ConfigError(f"Profile name must match {PROFILE_NAME.pattern}")
+        config.ruleset.derive(overrides)
+        with self._lock:
+            self._refresh()
+            profiles = {**self._profiles, name: overrides}
+            # 書きかけのファイルを他のワーカーに読ませないよう、一時ファイルに書いてから置き換える
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=PROFILES_FILE, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(profiles, f, indent=2, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._profiles = profiles
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self._compiled = {key: ruleset for key, ruleset in self._compiled.items() if key[0] != name}
+
+    def rules_for(self, custom_settings: dict | None) -> RuleSet:
+        """
+        ゲームの custom_settings（'profile' にプロファイル名を入れられる）に対応する RuleSet。
+        Raises:
+            ConfigError: 未登録のプロファイル、または設定が不正
+        """
+        base = config.ruleset
+        if not custom_settings:
+            return base
+        settings = dict(custom_settings)
+        name = settings.pop('profile', None)
+        key = (name, json.dumps(settings, sort_keys=True))
+        with self._lock:
+            if base.version != self._base_version:
+                self._compiled.clear()
+                self._base_version = base.version
+            if name is not None:
+                self._refresh()
+            ruleset = self._compiled.get(key)
+            if ruleset is None:
+                if name is not None:
+                    if name not in self._profiles:
+                        raise ConfigError(f"Unknown rule profile {name!r}")
+                    base = self._compiled.get((name, '{}')) or base.derive(self._profiles[name])
+                ruleset = base.derive(_custom_overrides(settings)) if settings else base
+                if len(self._compiled) >= MAX_COMPILED:
+                    self._compiled.pop(next(iter(self._compiled)))
+                self._compiled[key] = ruleset
+            return ruleset
+
+def _custom_overrides(custom_settings: dict) -> dict:
+    """CreateGameRequest の custom_settings を、config.json のルール部分と同じ形式の差し替えに直す"""
+    overrides = {}
+    if 'shell_counts' in custom_settings:
+        # custom_settings['shell_counts'] は {'live': int, 'blank': int} を想定
+        shells = custom_settings['shell_counts']
+        overrides['shell_counts_by_round'] = {'default': [shells['live'], shells['blank']]}
+    elif 'total_shells' in custom_settings or 'live_ratio' in custom_settings:
+        total = custom_settings.get('total_shells', 8) # Default max
+        ratio = custom_settings.get('live_ratio', 0.5)
+
+        # Ensure limits
+        total = max(2, min(total, 8)) # Min 2 (1 each), Max 8 (shotgun capacity)
+
+        # Ensure at least 1 live and 1 blank
+        live_count = min(max(int(total * ratio), 1), total - 1)
+        overrides['shell_counts_by_round'] = {'default': [live_count, total - live_count]}
+
+    distribution = {}
+    if 'items_per_round' in custom_settings:
+        distribution['items_per_round'] = {'default': custom_settings['items_per_round']}
+    if 'item_probabilities' in custom_settings:
+        distribution['item_probabilities'] = custom_settings['item_probabilities']
+    if distribution:
+        overrides['item_distribution'] = distribution
+    return overrides
+
+# シングルトンインスタンスとしてエクスポート
+profiles = RuleProfiles()
@@ -0,0 +1,45 @@
+from .game import Game
+from .game_config import RuleSet
+
+# リプレイで再実行してよい操作（@mutation が付いた Game の公開メソッド）
+REPLAYABLE_ACTIONS = {
+    'handle_action',
+    'start_new_round',
+    'broadcast_message',
+    'force_end',
+    'reset',
+    'undo',
+    'redo',
+    'set_pending_interaction',
+    'clear_pending_interaction',
+}
+
+def replay(game_log: dict, action_index: int | None = None) -> Game:
+    """
+    Game.get_action_log() の出力からゲームを再構築する。
+    シードが同じなら装填順・配布アイテムも同じになるため、操作を順に再実行するだけで
+    任意の時点の状態を復元できる。ハードウェア通信やログ出力は行わない。
+    Args:
+        game_log (dict): {'seed', 'player_ids', 'custom_settings', 'rules', 'actions', ...}
+            'rules' (RuleSet.snapshot()) がない古いログは、現在の設定に custom_settings を重ねたルールで再現する
+        action_index (int | None): 先頭から何件の操作を適用するか。Noneなら全件
+    Returns:
+        Game: 再構築されたゲーム (headless)
+    """
+    game = Game(
+        game_log['player_ids'],
+        game_log.get('custom_settings'),
+        game_id=game_log.get('game_id', ""),
+        seed=game_log['seed'],
+        headless=True,
+        ruleset=RuleSet.from_snapshot(game_log['rules']) if game_log.get('rules') else None
+    )
+    actions = game_log.get('actions', [])
+    if action_index is not None:
+        actions = actions[:action_index]
+
+    for name, args, kwargs in actions:
+        if name not in REPLAYABLE_ACTIONS:
+            raise ValueError(f"Action '{name}' cannot be replayed.")
+        getattr(game, name)(*args, **kwargs)
+    return game
@@ -0,0 +1,54 @@
+import random
+
+class AliasSampler:
+    """
+    Vose のエイリアス法による重み付き抽選。
+    構築は O(種類数)、1回の抽選は重みの大きさにも種類数にもよらず O(1)（乱数1つ）。
+    重みは小数でもよく、0 以下のものは選ばれない。
+    """
+    __slots__ = ('names', 'probability', 'alias')
+
+    def __init__(self, weights: dict[str, float]):
+        """
+        Raises:
+            ValueError: 正の重みを持つものが1つもない
+        """
+        names = [name for name, weight in weights.items() if weight > 0]
+        if not names:
+            raise ValueError("At least one weight must be positive")
+        count = len(names)
+        total = sum(weights[name] for name in names)
+        scaled = [weights[name] * count / total for name in names]
+
+        probability = [1.0] * count
+        alias = list(range(count))
+        small = [index for index, p in enumerate(scaled) if p < 1.0]
+        large = [index for index, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # 残りは誤差を除けばちょうど 1.0（自分自身が必ず選ばれる）
+
+        self.names = names
+        self.probability = probability
+        self.alias = alias
+
+    def draw(self, rng: random.Random) -> str:
+        # 乱数の整数部で列を、小数部でその列の本体か別名かを決める
+        u = rng.random() * len(self.names)
+        column = int(u)
+        return self.names[column] if u - column < self.probability[column] else self.names[self.alias[column]]
+
+    def draw_many(self, rng: random.Random, count: int) -> list[str]:
+        """count 回分の抽選結果を1度に返す（draw() を count 回呼んだのと同じ結果）"""
+        names, probability, alias = self.names, self.probability, self.alias
+        size = len(names)
+        results = []
+        for _ in range(count):
+            u = rng.random() * size
+            column = int(u)
+            results.append(names[column] if u - column < probability[column] else names[alias[column]])
+        return results
@@ -0,0 +1,30 @@
+import os
+import re
+import zlib
+
+# /game/<id>..., /api/game/<id>/..., /ws/game/<id> からゲームIDを取り出す
+GAME_PATH = re.compile(r"^/(?:api/|ws/)?game/([^/]+)")
+
+def shard_of(game_id: str, shard_count: int) -> int:
+    """ゲームIDから担当シャードの番号を決める（全プロセスで同じ結果になる）"""
+    if shard_count <= 1:
+        return 0
+    return zlib.crc32(game_id.encode()) % shard_count
+
+def game_id_from_path(path: str) -> str | None:
+    """URLパスがゲーム単位のものなら、そのゲームIDを返す"""
+    match = GAME_PATH.match(path)
+    if match is None or match.group(1) == 'create':
+        return None
+    return match.group(1)
+
+def current_shard() -> tuple[int, int]:
+    """
+    このプロセスが担当するシャード (番号, 総数)。
+    shard_router から起動されたワーカーには環境変数 BR_SHARD_INDEX / BR_SHARD_COUNT が渡される。
+    """
+    count = int(os.environ.get('BR_SHARD_COUNT', 1))
+    index = int(os.environ.get('BR_SHARD_INDEX', 0))
+    if not 0 <= index < max(count, 1):
+        raise ValueError(f"BR_SHARD_INDEX {index} is out of range for {count} shards")
+    return index, max(count, 1)
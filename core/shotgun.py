@@ -1,14 +1,52 @@
 import random
-from hardware.comms import network_manager
+from .journal import Journaled
 
-class Shotgun:
+# 薬室のバイト値
+BLANK, LIVE = 0, 1
+SHELL_NAMES = ('blank', 'live')
+
+class TakeShell:
+    """薬室の先頭から弾を1つ取り出す操作（発射・排出）のジャーナル記録"""
+    __slots__ = ('shotgun', 'shell')
+
+    def __init__(self, shotgun: 'Shotgun', shell: int):
+        self.shotgun = shotgun
+        self.shell = shell
+
+    def apply(self):
+        self.shotgun._advance(self.shell, 1)
+
+    def revert(self):
+        self.shotgun._advance(self.shell, -1)
+
+class Shotgun(Journaled):
     """
     ショットガンの状態を管理するデータクラス。
+    装填した弾はバイト列 (LIVE/BLANK) で持ち、撃った分はカーソルを進めるだけで取り除かない。
+    残りの実弾・空砲の数は取り出すたびに更新する。
     """
-    def __init__(self):
-        self.chamber: list[str] = [] # 'live' or 'blank' の文字列リスト
+    __slots__ = ('rng', 'shells', 'cursor', 'live_count', 'blank_count', 'is_sawed_off')
+    _journaled_fields = frozenset({'shells', 'cursor', 'live_count', 'blank_count', 'is_sawed_off'})
+
+    def __init__(self, rng: random.Random | None = None):
+        super().__init__()
+        self.rng = rng or random.Random()
+        self.shells: bytearray = bytearray() # 装填した弾。cursor より前は撃ち終えたもの（装填のたびに作り直す）
+        self.cursor: int = 0
+        self.live_count: int = 0 # 残りの実弾の数
+        self.blank_count: int = 0 # 残りの空砲の数
         self.is_sawed_off: bool = False # 鋸が使われているか
 
+    @property
+    def chamber(self) -> list[str]:
+        """残っている弾の種類 ('live'/'blank') のリスト（先頭が次弾）。呼ぶたびに作り直す"""
+        return [SHELL_NAMES[shell] for shell in self.shells[self.cursor:]]
+
+    @property
+    def remaining(self) -> int:
+        """残弾数"""
+        return self.live_count + self.blank_count
+
     def load_shells(self, live_count: int, blank_count: int):
         """
         Gameクラスから実弾と空砲の数を受け取り、シャッフルして装填する。
@@ -16,9 +54,12 @@ class Shotgun:
             live_count (int): 実弾の数
             blank_count (int): 空砲の数
         """
-        shells = ['live'] * live_count + ['blank'] * blank_count
-        random.shuffle(shells)
-        self.chamber = shells
+        shells = bytearray([LIVE]) * live_count + bytearray([BLANK]) * blank_count
+        self.rng.shuffle(shells)
+        self.shells = shells
+        self.cursor = 0
+        self.live_count = live_count
+        self.blank_count = blank_count
 
     def fire(self) -> str | None:
         """
@@ -26,21 +67,9 @@ class Shotgun:
         Returns:
             str | None: 'live' または 'blank'。弾がなければNone。
         """
-        if not self.chamber:
+        if not self.live_count and not self.blank_count:
             return None
-        shell = self.chamber.pop(0)
-        
-        # ネットワーク経由でトリガー送信 (非同期)
-        def send_trigger():
-            try:
-                print(f"Sending trigger: FIRE:{shell}")
-                response = network_manager.send_command("shotgun", f"FIRE:{shell}")
-                print(f"Shotgun response: {response}")
-            except Exception as e:
-                print(f"Hardware communication failed (non-fatal): {e}")
-
-        import threading
-        threading.Thread(target=send_trigger, daemon=True).start()
+        shell = self._take()
 
         # 鋸の効果は1回限り
         if self.is_sawed_off:
@@ -53,9 +82,9 @@ class Shotgun:
         Returns:
             str | None: 'live' または 'blank'。弾がなければNone。
         """
-        if not self.chamber:
+        if not self.live_count and not self.blank_count:
             return None
-        return self.chamber.pop(0)
+        return self._take()
 
     def peek_next_shell(self) -> str | None:
         """
@@ -63,9 +92,9 @@ class Shotgun:
         Returns:
             str | None: 'live' または 'blank'。弾がなければNone。
         """
-        if not self.chamber:
+        if not self.live_count and not self.blank_count:
             return None
-        return self.chamber[0]
+        return SHELL_NAMES[self.shells[self.cursor]]
 
     def get_shell_counts(self) -> tuple[int, int]:
         """
@@ -73,4 +102,20 @@ class Shotgun:
         Returns:
             tuple[int, int]: (実弾の数, 空砲の数)
         """
-        return (self.chamber.count('live'), self.chamber.count('blank'))
+        return (self.live_count, self.blank_count)
+
+    def _take(self) -> str:
+        shell = self.shells[self.cursor]
+        self._advance(shell, 1)
+        journal = self.journal
+        if journal is not None and journal._group is not None:
+            journal.record(TakeShell(self, shell))
+        return SHELL_NAMES[shell]
+
+    def _advance(self, shell: int, step: int):
+        """カーソルを step 発分進め、その弾の種類の残数を減らす（負なら戻す）。ジャーナルには残さない"""
+        object.__setattr__(self, 'cursor', self.cursor + step)
+        if shell == LIVE:
+            object.__setattr__(self, 'live_count', self.live_count - step)
+        else:
+            object.__setattr__(self, 'blank_count', self.blank_count - step)
@@ -0,0 +1,241 @@
+import threading
+from collections import OrderedDict
+from .game_config import config, RuleSet
+
+# アイテム所持数タプルの並び順
+ITEM_ORDER = ("cigarette", "beer", "saw", "handcuffs", "magnifyingglass")
+CIGARETTE, BEER, SAW, HANDCUFFS, MAGNIFYING_GLASS = range(len(ITEM_ORDER))
+ITEM_DISPLAY_NAMES = ("Cigarette", "Beer", "Saw", "Handcuffs", "MagnifyingGlass")
+
+class TranspositionTable:
+    """
+    探索済み局面の評価値を保持する LRU キャッシュ。
+    Solver はルールごとに共有され、ヒントの探索は複数のスレッドで同時に走るので、出し入れはロックの中で行う。
+    """
+    def __init__(self, maxsize: int = 1_000_000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {'size': len(self), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+class Solver:
+    """
+    2人対戦の最適行動と勝率を、装填中の弾が尽きるまで厳密に求める期待値探索。
+    局面は手番側から見た
+        (実弾数, 空砲数, 判明している次弾, 鋸, 自ライフ, 相手ライフ, 自アイテム, 相手アイテム, 相手の手錠)
+    のタプルで表し、評価値は手番側の勝率。
+    弾が尽きた後（次ラウンド）の勝率は、配布アイテムが不確定なためライフ比で近似する。
+    """
+    def __init__(self, max_lives: int, saw_multiplier: int, heal_amount: int, table_size: int = 1_000_000):
+        self.max_lives = max_lives
+        self.saw_multiplier = saw_multiplier
+        self.heal_amount = heal_amount
+        self.table = TranspositionTable(table_size)
+
+    def evaluate(self, state: tuple) -> tuple[float, tuple | None]:
+        """局面の (勝率, 最善手) を返す"""
+        cached = self.table.get(state)
+        if cached is not None:
+            return cached
+
+        live, blank = state[0], state[1]
+        if live + blank == 0:
+            result = (self.reload_value(state[4], state[5]), None)
+        else:
+            result = (-1.0, None)
+            for move, value in self.action_values(state):
+                if value > result[0]:
+                    result = (value, move)
+        self.table.put(state, result)
+        return result
+
+    def value(self, state: tuple) -> float:
+        return self.evaluate(state)[0]
+
+    @staticmethod
+    def reload_value(my_lives: int, opponent_lives: int) -> float:
+        return my_lives / (my_lives + opponent_lives)
+
+    @staticmethod
+    def outcomes(live: int, blank: int, known: str | None) -> list[tuple[str, float]]:
+        if known:
+            return [(known, 1.0)]
+        total = live + blank
+        result = []
+        if live:
+            result.append(('live', live / total))
+        if blank:
+            result.append(('blank', blank / total))
+        return result
+
+    def action_values(self, state: tuple):
+        """手番側が取れる全ての手と、その手を選んだ場合の勝率を返すジェネレータ"""
+        live, blank, known, sawed, me, opp, my_items, opp_items, opp_skip = state
+        yield ('shoot', 'opponent'), self._shoot_value(state, at_self=False)
+        yield ('shoot', 'self'), self._shoot_value(state, at_self=True)
+
+        if my_items[CIGARETTE] and me < self.max_lives:
+            healed = min(me + self.heal_amount, self.max_lives)
+            yield ('use', CIGARETTE), self.value(
+                (live, blank, known, sawed, healed, opp, _used(my_items, CIGARETTE), opp_items, opp_skip))
+
+        if my_items[BEER]:
+            items = _used(my_items, BEER)
+            value = 0.0
+            for shell, p in self.outcomes(live, blank, known):
+                rest_live, rest_blank = (live - 1, blank) if shell == 'live' else (live, blank - 1)
+                value += p * self.value((rest_live, rest_blank, None, sawed, me, opp, items, opp_items, opp_skip))
+            yield ('use', BEER), value
+
+        if my_items[SAW] and not sawed:
+            yield ('use', SAW), self.value(
+                (live, blank, known, True, me, opp, _used(my_items, SAW), opp_items, opp_skip))
+
+        if my_items[HANDCUFFS] and not opp_skip:
+            yield ('use', HANDCUFFS), self.value(
+                (live, blank, known, sawed, me, opp, _used(my_items, HANDCUFFS), opp_items, 1))
+
+        if my_items[MAGNIFYING_GLASS] and known is None:
+            items = _used(my_items, MAGNIFYING_GLASS)
+            value = 0.0
+            for shell, p in self.outcomes(live, blank, None):
+                value += p * self.value((live, blank, shell, sawed, me, opp, items, opp_items, opp_skip))
+            yield ('use', MAGNIFYING_GLASS), value
+
+    def _shoot_value(self, state: tuple, at_self: bool) -> float:
+        live, blank, known, sawed, me, opp, my_items, opp_items, opp_skip = state
+        damage = self.saw_multiplier if sawed else 1
+        value = 0.0
+        for shell, p in self.outcomes(live, blank, known):
+            if shell == 'live':
+                rest = (live - 1, blank)
+                if at_self:
+                    lives = me - damage
+                    v = 0.0 if lives <= 0 else self._pass_turn(rest, lives, opp, my_items, opp_items, opp_skip)
+                else:
+                    lives = opp - damage
+                    v = 1.0 if lives <= 0 else self._pass_turn(rest, me, lives, my_items, opp_items, opp_skip)
+            elif at_self:
+                # 自分に空砲なら手番継続
+                v = self.value((live, blank - 1, None, False, me, opp, my_items, opp_items, opp_skip))
+            else:
+                v = self._pass_turn((live, blank - 1), me, opp, my_items, opp_items, opp_skip)
+            value += p * v
+        return value
+
+    def _pass_turn(self, shells: tuple, me: int, opp: int, my_items: tuple, opp_items: tuple, opp_skip: int) -> float:
+        live, blank = shells
+        if opp_skip:
+            # 手錠で相手の手番が飛ばされ、自分の手番に戻る
+            return self.value((live, blank, None, False, me, opp, my_items, opp_items, opp_skip - 1))
+        return 1.0 - self.value((live, blank, None, False, opp, me, opp_items, my_items, 0))
+
+def _used(items: tuple, index: int) -> tuple:
+    return items[:index] + (items[index] - 1,) + items[index + 1:]
+
+def _item_counts(item_names: list[str]) -> tuple:
+    counts = [0] * len(ITEM_ORDER)
+    for name in item_names:
+        counts[ITEM_ORDER.index(name.lower())] += 1
+    return tuple(counts)
+
+_solvers: dict[tuple, Solver] = {}
+
+def get_solver(ruleset: RuleSet | None = None) -> Solver:
+    """ルール（省略時は現在の設定）に対応する Solver を返す（置換表は同じルールのテーブル間で共有される）"""
+    ruleset = ruleset or config.ruleset
+    rules = (ruleset.max_lives, ruleset.saw_damage_multiplier, ruleset.cigarette_heal_amount)
+    solver = _solvers.get(rules)
+    if solver is None:
+        # 同時に作られても、使われるのは先に登録された1つだけ
+        solver = _solvers.setdefault(rules, Solver(*rules))
+    return solver
+
+def solve(state: dict, player_id: int, known_shell: str | None = None, ruleset: RuleSet | None = None) -> dict:
+    """
+    Game.get_state() のスナップショットから、指定プレイヤーの勝率と（手番なら）最善手を求める。
+    Args:
+        state (dict): Game.get_state() の戻り値
+        player_id (int): ヒントを求めるプレイヤー
+        known_shell (str | None): 拡大鏡などで手番側だけが知っている次弾 ('live' / 'blank')
+        ruleset (RuleSet | None): ゲームのルール (Game.ruleset)。省略時は現在の設定
+    Returns:
+        dict: {'win_probability', 'best_action', 'action_values', 'cached'}
+    """
+    players = state['players']
+    if len(players) != 2:
+        raise ValueError("The solver supports 2-player games only.")
+    mover = next(p for p in players if p['id'] == state['current_player_id'])
+    other = next(p for p in players if p['id'] != mover['id'])
+    if player_id not in (mover['id'], other['id']):
+        raise ValueError(f"Player {player_id} is not in this game.")
+
+    if mover['lives'] <= 0 or other['lives'] <= 0:
+        alive = mover if mover['lives'] > 0 else other
+        return {'win_probability': 1.0 if alive['id'] == player_id and alive['lives'] > 0 else 0.0,
+                'best_action': None, 'action_values': [], 'cached': True}
+
+    shotgun = state['shotgun']
+    key = (
+        shotgun['live_shells'],
+        shotgun['blank_shells'],
+        known_shell,
+        shotgun['is_sawed_off'],
+        mover['lives'],
+        other['lives'],
+        _item_counts(mover['items']),
+        _item_counts(other['items']),
+        1 if other['is_skipped'] else 0,
+    )
+    solver = get_solver(ruleset)
+    cached = key in solver.table
+    value, move = solver.evaluate(key)
+
+    if player_id != mover['id']:
+        return {'win_probability': 1.0 - value, 'best_action': None, 'action_values': [], 'cached': cached}
+
+    action_values = [
+        {'action': _to_action_data(candidate, mover, other), 'win_probability': v}
+        for candidate, v in solver.action_values(key)
+    ] if key[0] + key[1] else []
+    return {
+        'win_probability': value,
+        'best_action': _to_action_data(move, mover, other) if move else None,
+        'action_values': action_values,
+        'cached': cached
+    }
+
+def _to_action_data(move: tuple, mover: dict, other: dict) -> dict:
+    """探索の手を Game.handle_action に渡せる action_data に変換する"""
+    kind, arg = move
+    if kind == 'shoot':
+        return {'action': 'shoot', 'target_id': mover['id'] if arg == 'self' else other['id']}
+    target_id = other['id'] if arg == HANDCUFFS else None
+    return {'action': 'use', 'item_name': ITEM_DISPLAY_NAMES[arg], 'target_id': target_id}
@@ -0,0 +1,33 @@
+def make_patch(old, new, path: str = "") -> list[dict]:
+    """
+    2つの状態辞書を比較し、JSON Patch 形式 (RFC 6902 の replace/add) の差分リストを返す。
+    長さの変わったリストは丸ごと置き換える（アイテム一覧などは小さいため）。
+    """
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+
+    if isinstance(new, dict):
+        patch = []
+        for key, value in new.items():
+            child = f"{path}/{key}"
+            if key not in old:
+                patch.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                patch.extend(make_patch(old[key], value, child))
+        return patch
+
+    if isinstance(new, list):
+        if len(old) != len(new):
+            return [{'op': 'replace', 'path': path, 'value': new}]
+        patch = []
+        for index, (old_value, new_value) in enumerate(zip(old, new)):
+            patch.extend(make_patch(old_value, new_value, f"{path}/{index}"))
+        return patch
+
+    if old != new:
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return []
+
+def append_patch(path: str, values: list) -> list[dict]:
+    """追記のみのリスト（ログ・メッセージ）の新規要素を add 操作に変換する"""
+    return [{'op': 'add', 'path': f"{path}/-", 'value': value} for value in values]
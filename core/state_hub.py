@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from .game import Game
+
+class StateHub:
+    """
+    ゲームごとの購読者（操作パネル・プレイヤータブレット）へ状態をプッシュ配信するハブ。
+    状態は Game.get_state_json() のキャッシュを使うので、状態変化1回につきシリアライズは1回だけで、全購読者で共有する。
+    ゲームの状態を読むのはそのゲームの待ち行列のスレッドだけで、イベントループには出来上がった JSON だけを渡す。
+    購読は (ゲームID, 表示) ごとで、表示が None なら全体、プレイヤーIDならそのプレイヤーの表示
+    (Game.get_player_state: 他人の拡大鏡の結果やログを含まない) を配信する。
+    """
+    def __init__(self):
+        self._subscribers: dict[str, dict[int | None, set[asyncio.Queue]]] = {} # game_id -> 表示 -> キュー
+        self._pending: dict[str, tuple[int, dict]] = {} # game_id -> 配信待ちの (状態のバージョン, {表示: JSON})
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def publish(self, game: 'Game'):
+        """
+        Gameのリスナーとして、状態を変えたゲームの待ち行列のスレッドで呼ばれる（GameManager.add_listener で登録する）。
+        配信はイベントループ上でまとめて行うため、連続した変更は最新の1回の送信に集約される。
+        """
+        game_id = game.game_id
+        viewers = self._subscribers.get(game_id)
+        if not viewers or self._loop is None:
+            return
+        update = (game.version, {viewer: self._serialize(game, viewer) for viewer in list(viewers)})
+        with self._lock:
+            pending = self._pending.get(game_id)
+            if pending is None or pending[0] <= update[0]:
+                self._pending[game_id] = update
+        if pending is None:
+            self._loop.call_soon_threadsafe(self._flush, game_id)
+
+    @staticmethod
+    def _serialize(game: 'Game', viewer: int | None) -> str | None:
+        try:
+            return game.get_state_json(viewer).decode()
+        except ValueError:
+            return None # ゲームにいないプレイヤー（購読時に弾いているので通常は起きない）
+
+    def _flush(self, game_id: str):
+        with self._lock:
+            update = self._pending.pop(game_id, None)
+            viewers = {viewer: list(queues) for viewer, queues in self._subscribers.get(game_id, {}).items()}
+        if update is None:
+            return
+        for viewer, queues in viewers.items():
+            payload = update[1].get(viewer)
+            if payload is None:
+                continue
+            for queue in queues:
+                self._offer(queue, payload)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, payload: str):
+        # 遅いクライアントには最新の状態だけを届ければよいので、古いものは捨てる
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    async def subscribe(self, game_id: str, player_id: int | None,
+                        snapshot: Callable[[], Awaitable[bytes]]) -> asyncio.Queue:
+        """
+        購読を開始し、現在の状態が入ったキューを返す。
+        Args:
+            game_id (str): ゲームID
+            player_id (int | None): プレイヤーの表示を購読する場合はそのID。None なら全体
+            snapshot: 現在の状態の JSON (Game.get_state_json(player_id)) をゲームの待ち行列上で読んで返すコルーチン関数
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.setdefault(game_id, {}).setdefault(player_id, set()).add(queue)
+        try:
+            payload = await snapshot()
+        except BaseException:
+            self.unsubscribe(game_id, player_id, queue)
+            raise
+        # 登録後の変更がすでに届いていれば、そちらの方が新しい（待ち中の配信は読んだ状態と同じか新しい）
+        if queue.empty():
+            self._offer(queue, payload.decode())
+        return queue
+
+    def unsubscribe(self, game_id: str, player_id: int | None, queue: asyncio.Queue):
+        with self._lock:
+            viewers = self._subscribers.get(game_id, {})
+            queues = viewers.get(player_id)
+            if queues:
+                queues.discard(queue)
+                if not queues:
+                    del viewers[player_id]
+            if not viewers:
+                self._subscribers.pop(game_id, None)
+
+    def subscriber_count(self, game_id: str) -> int:
+        return sum(len(queues) for queues in self._subscribers.get(game_id, {}).values())
+
+# シングルトンインスタンスとしてエクスポート
+state_hub = StateHub()
@@ -0,0 +1,290 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 一覧のソートキー -> サマリー・テーブルの列名
+SORT_COLUMNS = {'updated': 'updated_at', 'created': 'created_at'}
+
+class GameStore:
+    """
+    ゲームの永続化インターフェース。
+    ゲームはシード・参加者・カスタム設定・ルール (RuleSet.snapshot()) と操作ログ (Game.actions) だけを保存し、
+    読み込み時は replay() で状態を再構築する。
+    """
+    def create_game(self, game_id: str, seed: int, player_ids: list[int], custom_settings: dict, rules: dict,
+                    summary: dict):
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def append_actions(self, game_id: str, first_index: int, actions: list, summary: dict):
+        """first_index 番目以降の操作を追記し、一覧用のサマリー（ステータスを含む）を更新する"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def list_summaries(self, status: str | None = None, sort: str = 'updated', descending: bool = True,
+                       after: tuple | None = None, limit: int = 50) -> list[dict]:
+        """
+        サマリーを並べ替えて返す。
+        Args:
+            status (str | None): 'active' / 'over' / 'terminated' で絞り込む
+            sort (str): 'updated' または 'created'
+            descending (bool): 新しい順
+            after (tuple | None): 前ページ末尾の (ソートキーの値, ゲームID)。この次から返す
+            limit (int): 最大件数
+        """
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def load_game_log(self, game_id: str) -> dict | None:
+        """Game.get_action_log() の形式に最新のサマリー ('summary') を加えて返す。存在しなければNone"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def delete_game(self, game_id: str):
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def load_actions(self, game_id: str, start: int) -> list:
+        """start 番目以降の操作を返す（他のワーカーが追記した分の取り込み用）"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def action_counts(self, game_ids: list[str]) -> dict[str, int]:
+        """ゲームごとの保存済み操作数"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def listing_version(self) -> int:
+        """ゲームの作成・更新・削除のたびに増える値（全ワーカーで共通の一覧 ETag 用）"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def acquire_lease(self, game_id: str, owner: str, ttl: float) -> bool:
+        """
+        ゲームの排他リースを取得する。他の owner が有効なリースを持っていれば False。
+        期限切れのリース（持ち主のワーカーが落ちた場合など）は奪ってよい。
+        """
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def release_lease(self, game_id: str, owner: str):
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def close(self):
+        pass
+
+class SQLiteGameStore(GameStore):
+    """
+    SQLite (WALモード) によるストア。
+    接続は1本をロックで共有し、1操作ごとに小さなトランザクションで追記する。
+    同じファイルを複数のプロセス（uvicorn のワーカー）から開いて共有できる。
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS games (
+            game_id TEXT PRIMARY KEY,
+            seed INTEGER NOT NULL,
+            player_ids TEXT NOT NULL,
+            custom_settings TEXT NOT NULL,
+            rules TEXT,
+            status TEXT NOT NULL DEFAULT 'active',
+            action_count INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            summary TEXT
+        );
+        CREATE TABLE IF NOT EXISTS actions (
+            game_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            PRIMARY KEY (game_id, idx)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS leases (
+            game_id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('listing_version', 0);
+    """
+    # 書き込みのたびに一覧のバージョンを進める（同じトランザクション内で実行する）
+    BUMP_LISTING_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'listing_version'"
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # 他のプロセスが書き込み中ならロックが空くまで待つ
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(games)")}
+        if 'summary' not in columns:
+            self._conn.execute("ALTER TABLE games ADD COLUMN summary TEXT")
+        if 'rules' not in columns:
+            # 以前の行は NULL（読み込み時は現在の設定のルールで再現する）
+            self._conn.execute("ALTER TABLE games ADD COLUMN rules TEXT")
+        self._conn.execute("DROP INDEX IF EXISTS idx_games_status_updated")
+        # 一覧のページングはすべてインデックスだけで辿れるようにする
+        for column in SORT_COLUMNS.values():
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_games_{column} ON games ({column}, game_id)")
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_games_status_{column} ON games (status, {column}, game_id)")
+
+    def create_game(self, game_id: str, seed: int, player_ids: list[int], custom_settings: dict, rules: dict,
+                    summary: dict):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO games (game_id, seed, player_ids, custom_settings, rules, status, created_at, updated_at, "
+                    "summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (game_id, seed, json.dumps(player_ids), json.dumps(custom_settings or {}), json.dumps(rules),
+                     summary['status'],
+                     summary['created_at'], summary['updated_at'], json.dumps(summary))
+                )
+                self._conn.execute(self.BUMP_LISTING_VERSION)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def append_actions(self, game_id: str, first_index: int, actions: list, summary: dict):
+        rows = [(game_id, first_index + i, json.dumps(action)) for i, action in enumerate(actions)]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO actions (game_id, idx, action) VALUES (?, ?, ?)", rows)
+                self._conn.execute(
+                    "UPDATE games SET action_count = ?, status = ?, updated_at = ?, summary = ? WHERE game_id = ?",
+                    (first_index + len(actions), summary['status'], summary['updated_at'], json.dumps(summary), game_id)
+                )
+                self._conn.execute(self.BUMP_LISTING_VERSION)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_summaries(self, status: str | None = None, sort: str = 'updated', descending: bool = True,
+                       after: tuple | None = None, limit: int = 50) -> list[dict]:
+        column = SORT_COLUMNS[sort]
+        conditions, params = ["summary IS NOT NULL"], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if after:
+            conditions.append(f"({column}, game_id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        query = (f"SELECT summary FROM games WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY {column} {direction}, game_id {direction} LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [json.loads(summary) for (summary,) in rows]
+
+    def load_game_log(self, game_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seed, player_ids, custom_settings, rules, action_count, summary FROM games WHERE game_id = ?",
+                (game_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            seed, player_ids, custom_settings, rules, action_count, summary = row
+            actions = self._conn.execute(
+                "SELECT action FROM actions WHERE game_id = ? AND idx < ? ORDER BY idx",
+                (game_id, action_count)
+            ).fetchall()
+        return {
+            'game_id': game_id,
+            'seed': seed,
+            'player_ids': json.loads(player_ids),
+            'custom_settings': json.loads(custom_settings),
+            'rules': json.loads(rules) if rules else None,
+            'actions': [json.loads(action) for (action,) in actions],
+            'summary': json.loads(summary) if summary else None
+        }
+
+    def delete_game(self, game_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM actions WHERE game_id = ?", (game_id,))
+                self._conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+                self._conn.execute("DELETE FROM leases WHERE game_id = ?", (game_id,))
+                self._conn.execute(self.BUMP_LISTING_VERSION)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_actions(self, game_id: str, start: int) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT action FROM actions WHERE game_id = ? AND idx >= ? AND idx < "
+                "(SELECT action_count FROM games WHERE game_id = ?) ORDER BY idx",
+                (game_id, start, game_id)
+            ).fetchall()
+        return [json.loads(action) for (action,) in rows]
+
+    def action_counts(self, game_ids: list[str]) -> dict[str, int]:
+        if not game_ids:
+            return {}
+        placeholders = ", ".join("?" * len(game_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT game_id, action_count FROM games WHERE game_id IN ({placeholders})", game_ids
+            ).fetchall()
+        return dict(rows)
+
+    def listing_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'listing_version'").fetchone()[0]
+
+    def acquire_lease(self, game_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO leases (game_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (game_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (game_id, owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, game_id: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE game_id = ? AND owner = ?", (game_id, owner))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def encode_cursor(summary: dict, sort: str) -> str:
+    """ページ末尾のサマリーから、次ページを取得するための不透明なカーソル文字列を作る"""
+    raw = json.dumps([summary[SORT_COLUMNS[sort]], summary['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """encode_cursor() の逆変換。不正な文字列なら ValueError"""
+    try:
+        value, game_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return value, game_id
+
+def open_store(settings: dict | None) -> GameStore | None:
+    """
+    config.json の storage セクションからストアを生成する。
+    未設定・backend が "memory" の場合は None（永続化しない）を返す。
+    """
+    if not settings:
+        return None
+    backend = settings.get('backend', 'memory')
+    if backend == 'memory':
+        return None
+    if backend == 'sqlite':
+        return SQLiteGameStore(settings.get('path', 'data/games.db'))
+    raise ValueError(f"Unknown storage backend: {backend}")
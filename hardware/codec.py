@@ -0,0 +1,138 @@
+"""
+テーブル端末向けのバイナリ・フレーム形式。
+
+フレーム:  b"BR" | version (u8) | メッセージ数 (u16) | メッセージ...
+メッセージ: 種別 (u8) | 本文の長さ (u16) | 本文
+整数はすべてビッグエンディアン。文字列は長さ (u8 または u16) + UTF-8。
+"""
+import struct
+
+MAGIC = b"BR"
+VERSION = 1
+
+FRAME_HEADER = struct.Struct(">2sBH")
+MESSAGE_HEADER = struct.Struct(">BH")
+
+SHOT_FIRED = 1
+ITEM_RESULT = 2
+GAME_STATE = 3
+MESSAGE_TYPES = {'shot_fired': SHOT_FIRED, 'item_result': ITEM_RESULT, 'game_state': GAME_STATE}
+MESSAGE_NAMES = {code: name for name, code in MESSAGE_TYPES.items()}
+
+# アイテム名 <-> 1バイトのコード（末尾に追加していくこと）
+ITEM_CODES = ("Cigarette", "Beer", "Saw", "Handcuffs", "MagnifyingGlass")
+UNKNOWN_ITEM = 0xFF
+
+_SHOT = struct.Struct(">IB")          # player_id, live
+_ITEM = struct.Struct(">IBB")         # player_id, item, success
+_STATE = struct.Struct(">IHIBBBB")    # version, round, current_player_id, live, blank, sawed_off, players
+_PLAYER = struct.Struct(">IBBB")      # id, lives, skipped, items
+
+class CodecError(ValueError):
+    pass
+
+def _pack_str(text: str, wide: bool = False, limit: int | None = None) -> bytes:
+    """長さを前置した UTF-8。長すぎる場合は文字の途中で切らないよう、収まる所までの文字で切り詰める"""
+    data = text.encode('utf-8')
+    limit = min(limit, 0xFFFF) if limit is not None else (0xFFFF if wide else 0xFF)
+    if len(data) > limit:
+        data = data[:limit].decode('utf-8', 'ignore').encode('utf-8')
+    return (struct.pack(">H", len(data)) if wide else bytes((len(data),))) + data
+
+def _unpack_str(buffer: memoryview, offset: int, wide: bool = False) -> tuple[str, int]:
+    if wide:
+        (length,) = struct.unpack_from(">H", buffer, offset)
+        offset += 2
+    else:
+        length = buffer[offset]
+        offset += 1
+    return bytes(buffer[offset:offset + length]).decode('utf-8'), offset + length
+
+def _item_code(name: str) -> int:
+    try:
+        return ITEM_CODES.index(name)
+    except ValueError:
+        return UNKNOWN_ITEM
+
+def _item_name(code: int) -> str:
+    return ITEM_CODES[code] if code < len(ITEM_CODES) else "Unknown"
+
+def encode_message(payload: dict) -> bytes:
+    """HardwareInterface のペイロード (dict) を1メッセージ分のバイト列にする"""
+    kind = payload['type']
+    game_id = _pack_str(payload['game_id'])
+    if kind == 'shot_fired':
+        body = game_id + _SHOT.pack(payload['player_id'], payload['shell_type'] == 'live')
+    elif kind == 'item_result':
+        head = game_id + _ITEM.pack(payload['player_id'], _item_code(payload['item_name']), bool(payload['success']))
+        # 本文の長さ (u16) に収まるよう、メッセージは残りのバイト数で切り詰める
+        body = head + _pack_str(payload['message'], wide=True, limit=0xFFFF - len(head) - 2)
+    elif kind == 'game_state':
+        state = payload['state']
+        shotgun = state['shotgun']
+        players = state['players']
+        parts = [game_id, _STATE.pack(
+            state.get('version', 0), min(state['round'], 0xFFFF), state['current_player_id'],
+            shotgun['live_shells'], shotgun['blank_shells'], shotgun['is_sawed_off'], len(players)
+        )]
+        for p in players:
+            parts.append(_PLAYER.pack(p['id'], max(p['lives'], 0), p['is_skipped'], len(p['items'])))
+            parts.append(bytes(_item_code(name) for name in p['items']))
+        body = b"".join(parts)
+    else:
+        raise CodecError(f"Unknown message type: {kind}")
+    return MESSAGE_HEADER.pack(MESSAGE_TYPES[kind], len(body)) + body
+
+def encode_frame(messages: list[bytes]) -> bytes:
+    """encode_message() の結果をまとめて1フレームにする"""
+    return FRAME_HEADER.pack(MAGIC, VERSION, len(messages)) + b"".join(messages)
+
+def decode_frame(frame: bytes) -> list[dict]:
+    """フレームをペイロード (dict) のリストに戻す"""
+    buffer = memoryview(frame)
+    try:
+        magic, version, count = FRAME_HEADER.unpack_from(buffer, 0)
+    except struct.error as e:
+        raise CodecError("Truncated frame header") from e
+    if magic != MAGIC or version != VERSION:
+        raise CodecError(f"Unsupported frame: magic={magic!r} version={version}")
+
+    offset = FRAME_HEADER.size
+    payloads = []
+    for _ in range(count):
+        try:
+            kind, length = MESSAGE_HEADER.unpack_from(buffer, offset)
+            offset += MESSAGE_HEADER.size
+            payloads.append(_decode_body(kind, buffer[offset:offset + length]))
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise CodecError(f"Malformed message at offset {offset}") from e
+        offset += length
+    return payloads
+
+def _decode_body(kind: int, body: memoryview) -> dict:
+    game_id, offset = _unpack_str(body, 0)
+    if kind == SHOT_FIRED:
+        player_id, live = _SHOT.unpack_from(body, offset)
+        return {'type': 'shot_fired', 'game_id': game_id, 'player_id': player_id,
+                'shell_type': 'live' if live else 'blank'}
+    if kind == ITEM_RESULT:
+        player_id, item, success = _ITEM.unpack_from(body, offset)
+        message, _ = _unpack_str(body, offset + _ITEM.size, wide=True)
+        return {'type': 'item_result', 'game_id': game_id, 'player_id': player_id,
+                'item_name': _item_name(item), 'success': bool(success), 'message': message}
+    if kind == GAME_STATE:
+        version, round_number, current, live, blank, sawed, count = _STATE.unpack_from(body, offset)
+        offset += _STATE.size
+        players = []
+        for _ in range(count):
+            pid, lives, skipped, num_items = _PLAYER.unpack_from(body, offset)
+            offset += _PLAYER.size
+            items = [_item_name(code) for code in body[offset:offset + num_items]]
+            offset += num_items
+            players.append({'id': pid, 'lives': lives, 'is_skipped': bool(skipped), 'items': items})
+        return {'type': 'game_state', 'game_id': game_id, 'state': {
+            'version': version, 'round': round_number, 'current_player_id': current,
+            'shotgun': {'live_shells': live, 'blank_shells': blank, 'is_sawed_off': bool(sawed)},
+            'players': players,
+        }}
+    raise CodecError(f"Unknown message type: {kind}")
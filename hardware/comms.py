@@ -1,6 +1,9 @@
-import socket
-import time
+import concurrent.futures
 from core.game_config import config
+from utils.log import get_logger
+from .device_client import device_client
+
+log = get_logger("hardware")
 
 class NetworkManager:
     _instance = None
@@ -17,38 +20,29 @@ class NetworkManager:
     def send_command(self, device_name: str, command: str) -> str | None:
         """
         指定されたデバイスにコマンドを送信し、レスポンスを待機する。
+        接続はデバイスごとに維持され、再利用される。
         Args:
             device_name (str): config.jsonで定義されたデバイス名
             command (str): 送信するコマンド文字列
         Returns:
             str | None: レスポンス文字列。エラー時はNone。
         """
-        device_config = config.get_device_config(device_name)
-        if not device_config:
-            print(f"Device configuration for '{device_name}' not found.")
+        if not config.get_device_config(device_name):
+            log.warning("Device configuration for '%s' not found.", device_name)
             return None
+        return device_client.send_command(device_name, command, self.timeout)
 
-        target_ip = device_config.get('ip')
-        port = device_config.get('port')
-
-        if not target_ip or not port:
-             print(f"Invalid configuration for '{device_name}': IP or Port missing.")
-             return None
-
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(self.timeout)
-                s.connect((target_ip, port))
-                s.sendall(command.encode('utf-8'))
-                
-                # レスポンス受信
-                data = s.recv(1024)
-                if not data:
-                    return None
-                return data.decode('utf-8').strip()
-        except Exception as e:
-            print(f"Network Error ({device_name}): {e}")
-            return None
+    def send_command_async(self, device_name: str, command: str) -> concurrent.futures.Future:
+        """
+        レスポンスを待たずにコマンドを送信する。
+        Returns:
+            concurrent.futures.Future: レスポンス文字列を結果に持つ Future（エラー時は例外）
+        """
+        return device_client.send(device_name, command, self.timeout)
+
+    def metrics(self) -> dict:
+        """デバイスごとの接続状態とレイテンシ"""
+        return device_client.metrics()
 
 # シングルトンインスタンス
 network_manager = NetworkManager()
@@ -0,0 +1,256 @@
+import asyncio
+import concurrent.futures
+import struct
+import threading
+import time
+from collections import deque
+from core.game_config import config
+from utils.latency import LatencyWindow
+from utils.log import get_logger
+from utils.metrics import metrics
+
+# フレーム形式: 4バイトのビッグエンディアン長 + UTF-8 の本文（要求・応答とも）
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 1 << 20
+
+log = get_logger("hardware")
+
+def encode_frame(text: str) -> bytes:
+    body = text.encode('utf-8')
+    return FRAME_HEADER.pack(len(body)) + body
+
+async def read_frame(reader: asyncio.StreamReader) -> str:
+    """1フレームを読み込む。接続が閉じられた場合は asyncio.IncompleteReadError"""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Frame too large: {length} bytes")
+    body = await reader.readexactly(length)
+    return body.decode('utf-8')
+
+class DeviceMetrics:
+    """デバイスごとの通信統計"""
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.latency = LatencyWindow() # 直近の往復時間
+
+    def to_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'latency_ms': self.latency.summary(),
+        }
+
+class DeviceConnection:
+    """
+    1台のデバイスへの永続接続。
+    要求は応答を待たずに続けて送り（パイプライン）、応答は送信順に FIFO で対応付ける。
+    切断時は待機中の要求を失敗させ、次の要求で指数バックオフしながら再接続する。
+    待機中の要求のキューは接続ごとに別にし、古い接続の読み込みタスクや送信の失敗が新しい接続に触れないようにする。
+    """
+    def __init__(self, name: str, host: str, port: int, connect_timeout: float = 5.0,
+                 backoff_initial: float = 0.1, backoff_max: float = 5.0):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.metrics = DeviceMetrics()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._pending: deque[asyncio.Future] = deque()
+        self._read_task: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self):
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self._writer is not None:
+                # 相手から閉じられた接続の要求を、新しい接続の応答と対応付けないよう先に失敗させる
+                self._drop(self._writer, ConnectionError(f"Connection to '{self.name}' lost"))
+            # 直前の失敗からバックオフ時間が経つまでは待つ
+            delay = self._next_attempt - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.connect_timeout)
+            except Exception:
+                self._backoff = min(self.backoff_max, self._backoff * 2 or self.backoff_initial)
+                self._next_attempt = time.monotonic() + self._backoff
+                raise
+            if self.metrics.connects:
+                self.metrics.reconnects += 1
+            self.metrics.connects += 1
+            self._backoff = 0.0
+            self._next_attempt = 0.0
+            self._pending = deque()
+            self._read_task = asyncio.create_task(self._read_loop(self._reader, self._writer, self._pending))
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         pending: deque[asyncio.Future]):
+        try:
+            while True:
+                response = await read_frame(reader)
+                if not pending:
+                    continue # 要求のない応答（タイムアウト済みなど）は捨てる
+                future = pending.popleft()
+                if not future.done():
+                    future.set_result(response)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            self._drop(writer, ConnectionError(f"Connection to '{self.name}' lost: {e}"))
+        except asyncio.CancelledError:
+            self._drop(writer, ConnectionError(f"Connection to '{self.name}' closed"))
+            raise
+
+    def _drop(self, writer: asyncio.StreamWriter | None, error: Exception):
+        """
+        writer の接続を閉じ、その接続で待機中の要求を失敗させる。
+        すでに別の接続に置き換わっていれば何もしない（古い接続の要求は置き換えた時点で失敗させている）。
+        """
+        if writer is None or writer is not self._writer:
+            return
+        writer.close()
+        self._reader = self._writer = None
+        pending, self._pending = self._pending, deque()
+        while pending:
+            future = pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, command: str, timeout: float) -> str:
+        """コマンドを送信して応答を返す。失敗時は例外"""
+        self.metrics.requests += 1
+        start = time.perf_counter()
+        future = None
+        try:
+            await asyncio.wait_for(self._ensure_connected(), timeout)
+            writer = self._writer
+            future = asyncio.get_running_loop().create_future()
+            self._pending.append(future)
+            try:
+                writer.write(encode_frame(command))
+                await writer.drain()
+            except (ConnectionError, OSError) as e:
+                # 書き込めない接続は捨てる（この要求を含め、待機中の要求も失敗させる）
+                self._drop(writer, ConnectionError(f"Connection to '{self.name}' lost: {e}"))
+                _discard(future)
+                raise
+            # 応答の順序を崩さないよう、タイムアウトしても future はキューに残す（応答は捨てられる）
+            response = await asyncio.wait_for(asyncio.shield(future), timeout - (time.perf_counter() - start))
+        except asyncio.TimeoutError:
+            if future is not None:
+                _discard(future)
+            self.metrics.timeouts += 1
+            self.metrics.failures += 1
+            self._observe('timeout', start)
+            raise
+        except Exception:
+            self.metrics.failures += 1
+            self._observe('error', start)
+            raise
+        self.metrics.latency.add(time.perf_counter() - start)
+        self._observe('ok', start)
+        return response
+
+    def _observe(self, outcome: str, start: float):
+        if metrics.enabled:
+            metrics.observe('br_device_command_seconds', (('device', self.name), ('outcome', outcome)),
+                            time.perf_counter() - start)
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+        self._drop(self._writer, ConnectionError(f"Connection to '{self.name}' closed"))
+
+def _discard(future: asyncio.Future):
+    """後から切断で失敗しても警告が出ないよう、結果を読み捨てる"""
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+class DeviceClient:
+    """
+    全デバイスへの永続接続を管理する非同期クライアント。
+    専用スレッドのイベントループで動作し、どのスレッドからでも send() で要求できる。
+    """
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._connections: dict[str, DeviceConnection] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """通信用イベントループを（未起動なら起動して）返す"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="device-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _connection(self, device_name: str) -> DeviceConnection | None:
+        connection = self._connections.get(device_name)
+        if connection is None:
+            device_config = config.get_device_config(device_name)
+            if not device_config or not device_config.get('ip') or not device_config.get('port'):
+                return None
+            connection = DeviceConnection(device_name, device_config['ip'], device_config['port'],
+                                          connect_timeout=self.timeout)
+            self._connections[device_name] = connection
+        return connection
+
+    async def request(self, device_name: str, command: str, timeout: float | None = None) -> str:
+        """（クライアントのイベントループ上で）コマンドを送信して応答を返す"""
+        connection = self._connection(device_name)
+        if connection is None:
+            raise LookupError(f"Device configuration for '{device_name}' not found.")
+        return await connection.request(command, timeout or self.timeout)
+
+    def send(self, device_name: str, command: str, timeout: float | None = None) -> concurrent.futures.Future:
+        """スレッドセーフに要求を投入し、応答の Future を返す（待たない）"""
+        return asyncio.run_coroutine_threadsafe(self.request(device_name, command, timeout), self.ensure_loop())
+
+    def send_command(self, device_name: str, command: str, timeout: float | None = None) -> str | None:
+        """応答を待つ同期版。エラー時はNone"""
+        try:
+            return self.send(device_name, command, timeout).result()
+        except Exception as e:
+            log.warning("Network Error (%s): %r", device_name, e)
+            return None
+
+    def metrics(self) -> dict:
+        return {name: {'connected': c.connected, **c.metrics.to_dict()} for name, c in self._connections.items()}
+
+    def close(self):
+        """全接続を閉じてイベントループを止める"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        async def close_all():
+            for connection in self._connections.values():
+                await connection.close()
+        asyncio.run_coroutine_threadsafe(close_all(), loop).result(timeout=self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=self.timeout)
+        self._connections.clear()
+
+# シングルトンインスタンス
+device_client = DeviceClient()
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+from core.game_config import config
+from utils.latency import LatencyWindow
+from utils.log import get_logger
+from .device_client import DeviceClient, device_client
+
+# キューが溢れた時の方針
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+log = get_logger("hardware")
+
+class Command:
+    """デバイスへ送る1件のコマンド"""
+    __slots__ = ('device', 'payload', 'coalesce_key', 'on_ack', 'submitted_at')
+
+    def __init__(self, device: str, payload: str, coalesce_key: str | None = None, on_ack=None):
+        self.device = device
+        self.payload = payload
+        self.coalesce_key = coalesce_key
+        self.on_ack = on_ack
+        self.submitted_at = time.perf_counter()
+
+class DeviceQueue:
+    """1台のデバイス用の順序付き有界キューと、それを処理するワーカー"""
+    def __init__(self, name: str, max_size: int, overflow: str, ttl: float):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.name = name
+        self.max_size = max_size
+        self.overflow = overflow
+        self.ttl = ttl
+        self.items: deque[Command] = deque()
+        self.wakeup = asyncio.Event()
+        self.worker: asyncio.Task | None = None
+        self.in_flight: Command | None = None
+        self.counts = {'submitted': 0, 'acked': 0, 'failed': 0, 'dropped': 0, 'coalesced': 0, 'expired': 0}
+        self.latency = LatencyWindow() # 投入から応答までの時間（キュー待ちを含む）
+
+    def metrics(self) -> dict:
+        latency = self.latency.summary()
+        return {
+            'queue_depth': len(self.items),
+            'in_flight': self.in_flight is not None,
+            'max_queue': self.max_size,
+            'overflow': self.overflow,
+            **self.counts,
+            'latency_ms': {'p50': latency['p50'], 'p99': latency['p99'], 'max': latency['max']},
+        }
+
+class HardwareDispatcher:
+    """
+    デバイスごとに1本の順序付きキューを持つコマンド送信器。
+    各キューは1つのワーカーが前のコマンドの応答を待ってから次を送るため、
+    同じデバイスへのコマンドは必ず投入順に届く。デバイスが応答しない間もキューは有界で、
+    同じ coalesce_key のコマンドは最新のものにまとめ、溢れた分は方針に従って捨てる。
+    結果は on_ack(ack) で通知する（通信用スレッドから呼ばれる）。
+    """
+    def __init__(self, client: DeviceClient = device_client, max_queue: int = 32,
+                 overflow: str = 'drop_oldest', ttl: float = 5.0):
+        self.client = client
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.ttl = ttl
+        self._queues: dict[str, DeviceQueue] = {}
+
+    def submit(self, device: str, payload: str, coalesce_key: str | None = None, on_ack=None):
+        """スレッドセーフにコマンドを投入する（待たない）"""
+        command = Command(device, payload, coalesce_key, on_ack)
+        self.client.ensure_loop().call_soon_threadsafe(self._enqueue, command)
+
+    def _queue(self, device: str) -> DeviceQueue:
+        queue = self._queues.get(device)
+        if queue is None:
+            # デバイスごとの設定 (config.json の network.devices.<name>) で上書きできる
+            settings = config.get_device_config(device) or {}
+            queue = DeviceQueue(
+                device,
+                settings.get('queue_size', self.max_queue),
+                settings.get('overflow', self.overflow),
+                settings.get('command_ttl', self.ttl),
+            )
+            queue.worker = asyncio.get_running_loop().create_task(self._worker(queue))
+            self._queues[device] = queue
+        return queue
+
+    def _enqueue(self, command: Command):
+        queue = self._queue(command.device)
+        queue.counts['submitted'] += 1
+
+        if command.coalesce_key is not None:
+            for index, queued in enumerate(queue.items):
+                if queued.coalesce_key == command.coalesce_key:
+                    # 未送信の古いコマンドを最新の内容で置き換える（順序は古い方の位置を保つ）
+                    queue.items[index] = command
+                    queue.counts['coalesced'] += 1
+                    self._ack(queue, queued, 'coalesced')
+                    return
+
+        if len(queue.items) >= queue.max_size:
+            queue.counts['dropped'] += 1
+            if queue.overflow == 'drop_newest':
+                self._ack(queue, command, 'dropped')
+                return
+            self._ack(queue, queue.items.popleft(), 'dropped')
+
+        queue.items.append(command)
+        queue.wakeup.set()
+
+    async def _worker(self, queue: DeviceQueue):
+        while True:
+            if not queue.items:
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                continue
+
+            command = queue.items.popleft()
+            if time.perf_counter() - command.submitted_at > queue.ttl:
+                # 送るには遅すぎる（発射トリガーが数秒遅れて届くのは害になる）
+                queue.counts['expired'] += 1
+                self._ack(queue, command, 'expired')
+                continue
+
+            queue.in_flight = command
+            try:
+                response = await self.client.request(command.device, command.payload)
+            except Exception as e:
+                queue.counts['failed'] += 1
+                self._ack(queue, command, 'failed', error=repr(e))
+            else:
+                queue.counts['acked'] += 1
+                queue.latency.add(time.perf_counter() - command.submitted_at)
+                self._ack(queue, command, 'acked', response=response)
+            finally:
+                queue.in_flight = None
+
+    @staticmethod
+    def _ack(queue: DeviceQueue, command: Command, status: str, response: str | None = None, error: str | None = None):
+        if command.on_ack is None:
+            return
+        ack = {
+            'device': queue.name,
+            'command': command.payload,
+            'status': status,
+            'response': response,
+            'error': error,
+            'latency_ms': (time.perf_counter() - command.submitted_at) * 1000,
+        }
+        try:
+            command.on_ack(ack)
+        except Exception:
+            log.exception("Ack callback failed")
+
+    def metrics(self) -> dict:
+        """デバイスごとのキュー深さ・処理件数・レイテンシと、接続の統計"""
+        connections = self.client.metrics()
+        return {
+            name: {**queue.metrics(), 'connection': connections.get(name)}
+            for name, queue in list(self._queues.items())
+        }
+
+# シングルトンインスタンス
+hardware_dispatcher = HardwareDispatcher()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from typing import TYPE_CHECKING
+from core.action_router import ActionQueueFull, GameNotFound
+from core.items import ITEMS
+from utils.log import get_logger
+from .device_client import encode_frame, read_frame
+
+if TYPE_CHECKING:
+    from core.action_router import ActionRouter
+    from core.game import Game
+
+log = get_logger("hardware")
+
+class EventDecodeError(ValueError):
+    pass
+
+def decode_event(event: dict) -> tuple[str, dict]:
+    """
+    デバイスからのイベントを (ゲームID, action_data) に変換する。
+        {"type": "trigger", "game_id": ..., "target_id": 2}             -> 射撃
+        {"type": "rfid", "game_id": ..., "item": "beer", "target_id": 2} -> アイテム使用
+    """
+    game_id = event.get('game_id')
+    if not game_id:
+        raise EventDecodeError("game_id is required")
+    kind = event.get('type')
+    if kind == 'trigger':
+        if event.get('target_id') is None:
+            raise EventDecodeError("target_id is required for trigger events")
+        return game_id, {'action': 'shoot', 'target_id': event['target_id']}
+    if kind == 'rfid':
+        item = event.get('item')
+        if not item:
+            raise EventDecodeError("item is required for rfid events")
+        # RFIDタグには小文字のアイテムキーが書かれている
+        return game_id, {'action': 'use', 'item_name': _display_name(item), 'target_id': event.get('target_id')}
+    raise EventDecodeError(f"Unknown event type: {kind}")
+
+def _display_name(item: str) -> str:
+    entry = ITEMS.get(item.lower())
+    return entry.name if entry else item
+
+def apply_event(game: 'Game', action_data: dict) -> tuple[str, str] | None:
+    """
+    ゲームの待ち行列上で action_data を実行する。Web の /action と同じく、終了したゲームや
+    脱落したプレイヤーへの操作は実行せず (エラー種別, 詳細) を返す
+    """
+    if game.is_game_over():
+        return 'game_over', "Game is over"
+    if game.current_player.lives <= 0:
+        return 'eliminated', f"{game.current_player.name} has been eliminated"
+    target_id = action_data.get('target_id')
+    if target_id is not None:
+        target = game.get_player_by_id(int(target_id))
+        if target is None:
+            return 'invalid', f"Player {target_id} is not in this game"
+        if target.lives <= 0:
+            return 'eliminated', f"{target.name} has been eliminated"
+    game.handle_action(action_data)
+    return None
+
+class DeviceEventServer:
+    """
+    RFIDリーダー・トリガー等からのイベントを受け付ける asyncio サーバー。
+    device_client と同じ長さ付きフレームで JSON を1件ずつ受け取り、ゲームごとの待ち行列に投入して、
+    処理結果を {"ok": bool, "error": ...} で返す。1接続内のイベントは受信順に処理される。
+    error は invalid / busy / not_found / game_over / eliminated / failed のいずれか。
+    """
+    def __init__(self, router: 'ActionRouter', host: str = "0.0.0.0", port: int = 9000, reuse_port: bool = False):
+        self.router = router
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.counts = {'events': 0, 'accepted': 0, 'rejected': 0, 'busy': 0}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> 'DeviceEventServer':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, reuse_port=self.reuse_port or None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Device event server listening on %s:%s", self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                reply = await self.process(frame)
+                writer.write(encode_frame(json.dumps(reply)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def process(self, frame: str) -> dict:
+        """1件のイベントを処理して返信内容を返す"""
+        self.counts['events'] += 1
+        try:
+            game_id, action_data = decode_event(json.loads(frame))
+            future = self.router.submit(game_id, apply_event, action_data)
+        except ActionQueueFull as e:
+            self.counts['busy'] += 1
+            return {'ok': False, 'error': 'busy', 'detail': str(e)}
+        except (ValueError, TypeError, AttributeError) as e:
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': 'invalid', 'detail': str(e)}
+
+        try:
+            refused = await asyncio.wrap_future(future)
+        except GameNotFound as e:
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': 'not_found', 'detail': str(e)}
+        except Exception as e:
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': 'failed', 'detail': str(e)}
+        if refused:
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': refused[0], 'detail': refused[1]}
+        self.counts['accepted'] += 1
+        return {'ok': True}
@@ -1,11 +1,20 @@
-import time
+import asyncio
+import struct
 import threading
-import json
 from typing import TYPE_CHECKING
+from core.game_config import config
+from utils.log import get_logger
+from utils.metrics import metrics
+from .codec import CodecError, encode_message, encode_frame
+from .device_client import device_client
+from .event_server import DeviceEventServer
+from .transport import Transport, create_transport
 
 if TYPE_CHECKING:
     from core.game_manager import GameManager
 
+log = get_logger("hardware")
+
 class HardwareInterface:
     """ハードウェア通信の窓口となるシングルトンクラス"""
     _instance = None
@@ -14,19 +23,79 @@ class HardwareInterface:
         if cls._instance is None:
             cls._instance = super(HardwareInterface, cls).__new__(cls)
             cls._instance.game_manager = None
+            cls._instance.transport = None
+            cls._instance._local = threading.local() # スレッドごとの送信バッチ
+            cls._instance._sent_versions = {} # ゲームID -> 最後に送った状態のバージョン（終了・追い出しで消す）
+            cls._instance._lock = threading.Lock() # 送信経路の作成と統計（複数のワーカースレッドから送信される）
+            cls._instance.stats = {'frames': 0, 'messages': 0, 'bytes': 0}
         return cls._instance
 
     def register_game_manager(self, manager: 'GameManager'):
         """GameManagerのインスタンスを登録する"""
         self.game_manager = manager
 
+    def set_transport(self, transport: Transport | None):
+        """送信経路を差し替える。None なら次の送信時に config.json から作り直す"""
+        with self._lock:
+            previous, self.transport = self.transport, transport
+        if previous is not None:
+            previous.close()
+
+    def begin_batch(self):
+        """
+        送信バッチを開始する。end_batch() までに送ったメッセージは1フレームにまとめて送る。
+        入れ子にでき、最も外側の end_batch() で送信される。
+        """
+        local = self._local
+        if getattr(local, 'depth', 0) == 0:
+            local.messages = []
+        local.depth = getattr(local, 'depth', 0) + 1
+
+    def end_batch(self):
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0:
+            messages, local.messages = local.messages, None
+            if messages:
+                self._send_frame(messages)
+
+    @metrics.timed('hardware_send')
+    def _send_frame(self, messages: list[bytes]):
+        frame = encode_frame(messages)
+        with self._lock:
+            if self.transport is None:
+                self.transport = create_transport(config.network_config.get('table_transport'))
+            transport = self.transport
+            self.stats['frames'] += 1
+            self.stats['messages'] += len(messages)
+            self.stats['bytes'] += len(frame)
+        try:
+            transport.send(frame)
+        except Exception as e:
+            log.warning("Transport error (non-fatal): %s", e)
+
+    @metrics.timed('hardware_signal')
     def _send_payload(self, payload: dict):
-        """実際にデータを送信する共通メソッド"""
-        # 実際の環境では、ここでWebSocketやシリアル通信ライブラリを呼び出す
-        message_str = json.dumps(payload)
-        print(f"[HW_IF] SEND: {message_str}")
+        """実際にデータを送信する共通メソッド（バッチ中ならフレームにまとめる）"""
+        try:
+            message = encode_message(payload)
+        except (CodecError, struct.error) as e:
+            # 端末に送れない値でもゲームは止めない
+            log.warning("Cannot encode %s for game %s: %s", payload.get('type'), payload.get('game_id'), e)
+            return
+        messages = getattr(self._local, 'messages', None)
+        if messages is not None:
+            messages.append(message)
+        else:
+            self._send_frame([message])
 
     def send_game_state(self, game_id: str, game_state: dict):
+        # 同じバージョンの状態は送り直さない
+        version = game_state.get('version')
+        if version is not None:
+            if self._sent_versions.get(game_id) == version:
+                return
+            self._sent_versions[game_id] = version
         payload = {
             "type": "game_state",
             "game_id": game_id,
@@ -34,6 +103,10 @@ class HardwareInterface:
         }
         self._send_payload(payload)
 
+    def forget_game(self, game_id: str):
+        """終了した・メモリから追い出したゲームの送信済みバージョンを捨てる（再開すれば次の状態から送り直すだけ）"""
+        self._sent_versions.pop(game_id, None)
+
     def signal_shot_fired(self, game_id: str, player_id: int, shell_type: str):
         payload = {
             "type": "shot_fired",
@@ -55,18 +128,31 @@ class HardwareInterface:
         }
         self._send_payload(payload)
 
-    def _listener_thread(self):
-        """外部からのデータ受信をシミュレートするスレッド"""
-        print("[HW_IF] Listener thread started.")
-        # (シミュレーション部分は変更なし)
-        time.sleep(10) # デモ用に少し待機
-        print("[HW_IF] Listener thread finished.")
-
-    def start_listening(self):
-        """データ受信スレッドを開始する"""
-        if not hasattr(self, 'listener') or not self.listener.is_alive():
-            self.listener = threading.Thread(target=self._listener_thread, daemon=True)
-            self.listener.start()
+    def start_listening(self, host: str | None = None, port: int | None = None, reuse_port: bool = False) -> DeviceEventServer:
+        """
+        デバイスからのイベント受信サーバーを通信用スレッドで起動する。
+        受信した操作は GameManager のゲームごとの待ち行列を通して実行される。
+        reuse_port=True なら、同じポートで待ち受ける複数のワーカーに接続が振り分けられる。
+        """
+        if getattr(self, 'event_server', None) is not None:
+            return self.event_server
+        if self.game_manager is None:
+            raise RuntimeError("register_game_manager() must be called before start_listening()")
+        settings = config.network_config.get('event_server', {})
+        server = DeviceEventServer(
+            self.game_manager.router,
+            host or settings.get('host', '0.0.0.0'),
+            port if port is not None else settings.get('port', 9000),
+            reuse_port
+        )
+        asyncio.run_coroutine_threadsafe(server.start(), device_client.ensure_loop()).result()
+        self.event_server = server
+        return server
+
+    def stop_listening(self):
+        server, self.event_server = getattr(self, 'event_server', None), None
+        if server is not None:
+            asyncio.run_coroutine_threadsafe(server.stop(), device_client.ensure_loop()).result()
 
 # シングルトンインスタンス
 hardware_interface = HardwareInterface()
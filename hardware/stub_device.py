@@ -0,0 +1,90 @@
+"""
+動作確認用のスタブ・デバイスサーバー。
+device_client と同じ長さ付きフレームで要求を受け取り、"OK:<コマンド>" を返す。
+
+実行例:
+    python -m hardware.stub_device --port 8080 --delay 0.01
+"""
+import argparse
+import asyncio
+import threading
+from .device_client import encode_frame, read_frame
+
+class StubDevice:
+    """
+    長さ付きフレームのエコーサーバー。
+    受信したコマンドは received に記録され、delay 秒待ってから送信順に応答する。
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.received: list[str] = []
+        self.connections = 0
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._server: asyncio.AbstractServer | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def respond(self, command: str) -> str:
+        return f"OK:{command}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                command = await read_frame(reader)
+                self.received.append(command)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(encode_frame(self.respond(command)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # 接続中のクライアントも切断する（デバイスの電源断を再現する）
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+    def start_in_thread(self) -> 'StubDevice':
+        """専用スレッドのイベントループで起動する（同期コードからの確認用）"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="stub-device", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+async def main():
+    parser = argparse.ArgumentParser(description="Stub hardware device speaking the length-framed protocol")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    device = await StubDevice(args.host, args.port, args.delay).start()
+    print(f"Stub device listening on {device.host}:{device.port}")
+    await device._server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+import logging
+import socket
+import struct
+import threading
+import time
+from utils.log import get_logger
+from .codec import decode_frame
+
+log = get_logger("hardware")
+
+class Transport:
+    """テーブル端末へフレームを送る経路の基底クラス。送信失敗はゲーム進行を止めない"""
+    def send(self, frame: bytes):
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def close(self):
+        pass
+
+class LogTransport(Transport):
+    """送信先が設定されていない場合。デコードしたイベントをログに出すだけ（毎回の状態更新は省く）"""
+    def send(self, frame: bytes):
+        if not log.isEnabledFor(logging.INFO):
+            return
+        for payload in decode_frame(frame):
+            if payload['type'] != 'game_state':
+                log.info("SEND (%d bytes): %s", len(frame), payload)
+
+class LoopbackTransport(Transport):
+    """
+    送ったフレームをそのまま保持する（テスト・ベンチマーク用）。
+    handler を渡すと、受信側のように1フレームごとに呼び出す。
+    """
+    def __init__(self, handler=None, keep: bool = True):
+        self.handler = handler
+        self.keep = keep
+        self.frames: list[bytes] = []
+
+    def send(self, frame: bytes):
+        if self.keep:
+            self.frames.append(frame)
+        if self.handler:
+            self.handler(frame)
+
+    def received(self) -> list[dict]:
+        return [payload for frame in self.frames for payload in decode_frame(frame)]
+
+class TcpTransport(Transport):
+    """
+    1本の永続TCP接続に、4バイト長を前置したフレームを書き込む。
+    切断・接続失敗時はそのフレームを捨て、バックオフ時間が過ぎるまで再接続しない。
+    複数のゲームのワーカースレッドから呼ばれるので、接続と書き込みはロックで1本ずつ行う（フレームが混ざらないように）。
+    """
+    def __init__(self, host: str, port: int, timeout: float = 0.2, backoff_max: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.backoff_max = backoff_max
+        self._sock: socket.socket | None = None
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket | None:
+        if self._sock is not None:
+            return self._sock
+        if time.monotonic() < self._next_attempt:
+            return None
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._backoff = 0.0
+        except OSError as e:
+            self._backoff = min(self.backoff_max, self._backoff * 2 or 1.0)
+            self._next_attempt = time.monotonic() + self._backoff
+            log.warning("Connection to %s:%s failed: %s", self.host, self.port, e)
+        return self._sock
+
+    def send(self, frame: bytes):
+        with self._lock:
+            sock = self._connect()
+            if sock is None:
+                return
+            try:
+                sock.sendall(struct.pack(">I", len(frame)) + frame)
+            except OSError as e:
+                log.warning("Send to %s:%s failed: %s", self.host, self.port, e)
+                self._disconnect()
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+class UdpMulticastTransport(Transport):
+    """1フレーム = 1データグラムでマルチキャストグループへ送る（同じ卓の全端末が受信する）"""
+    def __init__(self, group: str, port: int, ttl: int = 1):
+        self.address = (group, port)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+
+    def send(self, frame: bytes):
+        try:
+            self._sock.sendto(frame, self.address)
+        except OSError as e:
+            log.warning("Multicast to %s failed: %s", self.address, e)
+
+    def close(self):
+        self._sock.close()
+
+def create_transport(settings: dict | None) -> Transport:
+    """
+    config.json の network.table_transport から送信経路を作る。
+        {"type": "tcp", "ip": ..., "port": ...}
+        {"type": "udp_multicast", "group": "239.0.0.1", "port": 5007, "ttl": 1}
+        {"type": "loopback"} / 未設定 (標準出力)
+    """
+    if not settings:
+        return LogTransport()
+    kind = settings.get('type')
+    if kind == 'tcp':
+        return TcpTransport(settings['ip'], settings['port'], settings.get('timeout', 0.2))
+    if kind == 'udp_multicast':
+        return UdpMulticastTransport(settings['group'], settings['port'], settings.get('ttl', 1))
+    if kind == 'loopback':
+        return LoopbackTransport()
+    if kind == 'log':
+        return LogTransport()
+    raise ValueError(f"Unknown table transport: {kind}")
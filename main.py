@@ -1,9 +1,11 @@
 import time
 import threading
 from core.game_manager import game_manager
+from core.game_config import config
 from utils.common import display_game_state
 from utils.mock_inputs import get_player_action
 from hardware.interface import hardware_interface
+from utils.log import configure_logging, flush_logging
 
 def run_interactive_game(game_id: str):
     """ユーザー入力で進行する単一のゲームループ"""
@@ -16,9 +18,12 @@ def run_interactive_game(game_id: str):
     game.start_new_round()
 
     while not game.is_game_over():
+        # イベントのログを盤面の表示より先に出し切る
+        flush_logging()
         display_game_state(game.get_state())
         action_data = get_player_action(game.current_player.name)
         game.handle_action(action_data)
+    flush_logging()
     print("\n--- GAME OVER ---")
     display_game_state(game.get_state())
     winner = game.get_winner()
@@ -30,6 +35,7 @@ def run_interactive_game(game_id: str):
 
 def main():
     """メインのエントリポイント"""
+    configure_logging(config.logging_config)
     # 3人プレイでゲームを開始
     player_ids = [1, 2, 3]
     print(f"Starting a {len(player_ids)}-player game.")
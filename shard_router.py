@@ -0,0 +1,164 @@
+"""
+Multi-process deployment: start one web_server worker process per shard and a lightweight
+HTTP router in front of them. Every game lives in exactly one shard, chosen by crc32(game_id),
+so a busy table only competes for the CPU of its own process.
+
+Usage: python shard_router.py [--shards 4] [--port 8000]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from core.game_config import config
+from core.sharding import shard_of, game_id_from_path
+from core.storage import SORT_COLUMNS, encode_cursor
+
+# Headers that belong to a single connection and must not be forwarded
+HOP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding", "upgrade"}
+
+class ShardRouter:
+    """Forwards each request to the shard process that owns its game"""
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.client: httpx.AsyncClient | None = None
+        self._next_shard = itertools.cycle(range(len(urls)))
+
+    def pick(self, path: str) -> int:
+        game_id = game_id_from_path(path)
+        if game_id is not None:
+            return shard_of(game_id, len(self.urls))
+        if path == "/api/game/create":
+            # New games are spread round-robin; the shard chooses an ID it owns
+            return next(self._next_shard)
+        return 0
+
+    def _build(self, shard: int, request: Request, body: bytes, params=None) -> httpx.Request:
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        return self.client.build_request(
+            request.method, self.urls[shard] + request.url.path,
+            params=params if params is not None else request.query_params, headers=headers, content=body
+        )
+
+    async def forward(self, request: Request) -> Response:
+        shard = self.pick(request.url.path)
+        upstream = await self.client.send(self._build(shard, request, await request.body()), stream=True)
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS}
+        if upstream.headers.get("content-type", "").startswith("text/event-stream"):
+            return StreamingResponse(upstream.aiter_raw(), status_code=upstream.status_code,
+                                     headers=headers, background=BackgroundTask(upstream.aclose))
+        content = await upstream.aread()
+        await upstream.aclose()
+        return Response(content, status_code=upstream.status_code, headers=headers)
+
+    async def fan_out(self, request: Request, params=None) -> list[httpx.Response]:
+        body = await request.body()
+        return await asyncio.gather(*(
+            self.client.send(self._build(shard, request, body, params)) for shard in range(len(self.urls))
+        ))
+
+    async def list_games(self, request: Request) -> Response:
+        """
+        Merge one page from every shard. The cursor is (sort key, game_id), which orders games
+        the same way in every shard, so each shard can resume from the same cursor.
+        """
+        params = {k: v for k, v in request.query_params.items()}
+        responses = await self.fan_out(request, params)
+        for upstream in responses:
+            if upstream.status_code != 200:
+                return Response(upstream.content, status_code=upstream.status_code, media_type="application/json")
+
+        etag = '"' + "|".join(r.headers.get("etag", "").strip('"') for r in responses) + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        sort = params.get("sort", "updated")
+        column = SORT_COLUMNS.get(sort, "updated_at")
+        limit = max(1, min(int(params.get("limit", 50)), 200))
+        pages = [r.json() for r in responses]
+        games = sorted((g for page in pages for g in page["games"]),
+                       key=lambda g: (g[column], g["id"]), reverse=params.get("order", "desc") == "desc")
+        more = len(games) > limit or any(page["next_cursor"] for page in pages)
+        games = games[:limit]
+        next_cursor = encode_cursor(games[-1], sort) if more and games else None
+        return JSONResponse({"games": games, "next_cursor": next_cursor}, headers={"ETag": etag})
+
+    async def metrics(self, request: Request) -> Response:
+        responses = await self.fan_out(request)
+        return JSONResponse({"shards": {str(shard): r.json() for shard, r in enumerate(responses)}})
+
+def create_app(urls: list[str]) -> FastAPI:
+    router = ShardRouter(urls)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        router.client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_keepalive_connections=64))
+        yield
+        await router.client.aclose()
+
+    app = FastAPI(title="Buckshot Roulette Shard Router", lifespan=lifespan)
+    app.state.router = router
+
+    @app.websocket("/ws/game/{game_id}")
+    async def game_state_socket(websocket: WebSocket, game_id: str):
+        # WebSockets are not relayed; closing before accept makes the client fall back to SSE, which is proxied
+        await websocket.close(code=1013)
+
+    @app.get("/api/games")
+    async def list_games(request: Request):
+        return await router.list_games(request)
+
+    @app.get("/api/actions/metrics")
+    @app.get("/api/hardware/metrics")
+    async def metrics(request: Request):
+        return await router.metrics(request)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    async def proxy(request: Request, path: str):
+        return await router.forward(request)
+
+    return app
+
+def start_shards(count: int, host: str, base_port: int) -> list[subprocess.Popen]:
+    """Start one uvicorn process per shard, each told which shard it owns via the environment"""
+    processes = []
+    for index in range(count):
+        env = {**os.environ, "BR_SHARD_INDEX": str(index), "BR_SHARD_COUNT": str(count)}
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "web_server:app", "--host", host, "--port", str(base_port + index)],
+            env=env
+        ))
+    return processes
+
+def main():
+    settings = config.sharding_config
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, default=settings.get("shards") or os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    shard_host = settings.get("host", "127.0.0.1")
+    base_port = settings.get("base_port", 8100)
+    processes = start_shards(args.shards, shard_host, base_port)
+    urls = [f"http://{shard_host}:{base_port + index}" for index in range(args.shards)]
+    print(f"Starting Shard Router on http://localhost:{args.port} ({args.shards} shards)")
+    try:
+        uvicorn.run(create_app(urls), host=args.host, port=args.port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""
+NumPy によるバッチ・モンテカルロシミュレーター。
+N 試合分の状態を配列で持ち（薬室は int8 行列、ライフ・アイテム所持数は整数配列）、
+全試合を1ステップずつマスク付きのベクトル演算で進める。
+各アクションの効果は Game.shoot / Cigarette / Beer / Saw / Handcuffs / MagnifyingGlass と同じ。
+
+実行例:
+    # ラウンド3 (実弾4・空砲4) で最初のリロード前に死者が出る確率
+    python -m simulation.batch --games 1000000 --round 3 --live 4 --blank 4 --stop-at-reload
+    # スカラー版 Game との統計的な突き合わせとスループット比較
+    python -m simulation.batch --games 20000 --cross-check
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from core.game_config import config
+
+ITEM_NAMES = ("Cigarette", "Beer", "Saw", "Handcuffs", "MagnifyingGlass")
+CIGARETTE, BEER, SAW, HANDCUFFS, MAGNIFYING_GLASS = range(len(ITEM_NAMES))
+
+BLANK, LIVE, EMPTY = 0, 1, -1
+UNKNOWN = -1
+
+# アクションコード。アイテム使用は USE_ITEM + アイテム番号
+SHOOT_SELF = 0
+SHOOT_OPPONENT = 1
+USE_ITEM = 2
+
+# ラウンドごとの設定表をこのラウンドまで展開する（それ以降は最後の値を使う）
+MAX_ROUND_TABLE = 64
+# 終わらない設定で無限ループしないための上限（simulation.engine と同じ）
+MAX_TURNS_PER_GAME = 500
+
+class BatchSimulator:
+    """N 試合を配列としてまとめて進めるシミュレーター"""
+    def __init__(self, num_games: int, num_players: int = 2, seed: int = 0,
+                 start_round: int = 1, shell_counts: tuple[int, int] | None = None):
+        """
+        Args:
+            num_games (int): 同時に進める試合数
+            num_players (int): プレイヤー数
+            seed (int): 乱数シード
+            start_round (int): 最初に装填するラウンド番号
+            shell_counts (tuple[int, int] | None): 全ラウンド共通の (実弾, 空砲)。省略時は config.json
+        """
+        self.rng = np.random.default_rng(seed)
+        self.num_games = num_games
+        self.num_players = num_players
+
+        ruleset = config.ruleset
+        self.initial_lives = ruleset.initial_lives
+        self.max_lives = ruleset.max_lives
+        self.first_death = ruleset.first_death
+        self.saw_multiplier = ruleset.saw_damage_multiplier
+        self.heal_amount = ruleset.cigarette_heal_amount
+
+        rounds = range(MAX_ROUND_TABLE + 1)
+        if shell_counts:
+            self.shell_table = np.array([shell_counts] * len(rounds), dtype=np.int16)
+        else:
+            self.shell_table = np.array([ruleset.shell_counts(max(r, 1)) for r in rounds], dtype=np.int16)
+        self.items_table = np.array([ruleset.items_per_round(max(r, 1)) for r in rounds], dtype=np.int16)
+        weights = np.array([ruleset.item_probabilities.get(name.lower(), 0) for name in ITEM_NAMES], dtype=float)
+        self.item_p = weights / weights.sum()
+        self.capacity = int(max(8, self.shell_table.sum(axis=1).max()))
+
+        n, p = num_games, num_players
+        self.chambers = np.full((n, self.capacity), EMPTY, dtype=np.int8)
+        self.cursor = np.zeros(n, dtype=np.int16)
+        self.loaded = np.zeros(n, dtype=np.int16)
+        self.lives = np.full((n, p), self.initial_lives, dtype=np.int16)
+        self.items = np.zeros((n, p, len(ITEM_NAMES)), dtype=np.int16)
+        self.skip = np.zeros((n, p), dtype=np.int16)
+        self.sawed = np.zeros(n, dtype=bool)
+        self.known = np.full(n, UNKNOWN, dtype=np.int8) # 手番のプレイヤーが拡大鏡で見た次弾
+        self.turn = np.zeros(n, dtype=np.int16)
+        self.round = np.full(n, start_round - 1, dtype=np.int16)
+        self.active = np.ones(n, dtype=bool)
+        self.turns = np.zeros(n, dtype=np.int32)
+        self.reloads = np.zeros(n, dtype=np.int16)
+        self.stopped_at_reload = np.zeros(n, dtype=bool)
+        self.item_uses = np.zeros(len(ITEM_NAMES), dtype=np.int64)
+        self.stop_at_reload = False
+
+        self._start_round(np.arange(n))
+
+    # --- Round handling ---
+
+    def _start_round(self, rows: np.ndarray):
+        self.round[rows] += 1
+        r = np.minimum(self.round[rows], MAX_ROUND_TABLE)
+        self._distribute_items(rows, self.items_table[r])
+        self._load_shells(rows, self.shell_table[r, 0], self.shell_table[r, 1])
+
+    def _distribute_items(self, rows: np.ndarray, per_player: np.ndarray):
+        # logic.distribute_items と同じく、生存者に (配布数 - 所持数) 個を重み付きで抽選する
+        held = self.items[rows].sum(axis=2)
+        alive = self.lives[rows] > 0
+        need = np.where(alive, np.maximum(per_player[:, None] - held, 0), 0)
+        for k in range(int(need.max(initial=0))):
+            row_idx, player_idx = np.nonzero(need > k)
+            draws = self.rng.choice(len(ITEM_NAMES), size=len(row_idx), p=self.item_p)
+            np.add.at(self.items, (rows[row_idx], player_idx, draws), 1)
+
+    def _load_shells(self, rows: np.ndarray, live: np.ndarray, blank: np.ndarray):
+        # 各行の先頭 live+blank 個だけをランダムキーの argsort でシャッフルする
+        total = (live + blank)[:, None]
+        positions = np.arange(self.capacity)
+        shells = np.where(positions < live[:, None], LIVE, np.where(positions < total, BLANK, EMPTY)).astype(np.int8)
+        keys = self.rng.random((len(rows), self.capacity))
+        keys[positions >= total] = np.inf
+        order = np.argsort(keys, axis=1)
+        self.chambers[rows] = np.take_along_axis(shells, order, axis=1)
+        self.cursor[rows] = 0
+        self.loaded[rows] = total[:, 0]
+        self.known[rows] = UNKNOWN
+
+    def _reload(self, rows: np.ndarray):
+        if self.stop_at_reload:
+            self.active[rows] = False
+            self.stopped_at_reload[rows] = True
+            return
+        self.reloads[rows] += 1
+        self._start_round(rows)
+
+    # --- Queries used by policies ---
+
+    def remaining(self, rows: np.ndarray) -> np.ndarray:
+        return self.loaded[rows] - self.cursor[rows]
+
+    def live_remaining(self, rows: np.ndarray) -> np.ndarray:
+        unfired = np.arange(self.capacity) >= self.cursor[rows][:, None]
+        return ((self.chambers[rows] == LIVE) & unfired).sum(axis=1)
+
+    def live_probability(self, rows: np.ndarray) -> np.ndarray:
+        remaining = self.remaining(rows)
+        return np.where(remaining > 0, self.live_remaining(rows) / np.maximum(remaining, 1), 0.0)
+
+    def opponent(self, rows: np.ndarray, players: np.ndarray) -> np.ndarray:
+        """ライフが最も少ない生存中の相手（同数なら席順が先の方）"""
+        lives = self.lives[rows].astype(float)
+        lives[lives <= 0] = np.inf
+        lives[np.arange(len(rows)), players] = np.inf
+        return np.argmin(lives, axis=1)
+
+    def opponent_skipped(self, rows: np.ndarray, players: np.ndarray) -> np.ndarray:
+        others = np.ones((len(rows), self.num_players), dtype=bool)
+        others[np.arange(len(rows)), players] = False
+        return ((self.skip[rows] > 0) & (self.lives[rows] > 0) & others).any(axis=1)
+
+    # --- Actions ---
+
+    def step(self, policy) -> int:
+        """進行中の全試合で手番のプレイヤーに1アクションを取らせる。進めた試合数を返す"""
+        rows = np.nonzero(self.active)[0]
+        if not len(rows):
+            return 0
+        actions = policy(self, rows)
+        players = self.turn[rows]
+        self.turns[rows] += 1
+
+        use = actions >= USE_ITEM
+        if use.any():
+            self._use_items(rows[use], players[use], actions[use] - USE_ITEM)
+        shoot = ~use
+        if shoot.any():
+            self._shoot(rows[shoot], players[shoot], actions[shoot] == SHOOT_SELF)
+        return len(rows)
+
+    def _use_items(self, rows: np.ndarray, players: np.ndarray, items: np.ndarray):
+        held = self.items[rows, players, items] > 0
+        rows, players, items = rows[held], players[held], items[held]
+        success = np.zeros(len(rows), dtype=bool)
+
+        cigarette = (items == CIGARETTE) & (self.lives[rows, players] < self.max_lives)
+        r, p = rows[cigarette], players[cigarette]
+        self.lives[r, p] = np.minimum(self.lives[r, p] + self.heal_amount, self.max_lives)
+        success |= cigarette
+
+        beer = (items == BEER) & (self.remaining(rows) > 0)
+        self.cursor[rows[beer]] += 1
+        self.known[rows[beer]] = UNKNOWN
+        success |= beer
+
+        saw = (items == SAW) & ~self.sawed[rows]
+        self.sawed[rows[saw]] = True
+        success |= saw
+
+        handcuffs = np.nonzero(items == HANDCUFFS)[0]
+        if len(handcuffs):
+            r, p = rows[handcuffs], players[handcuffs]
+            target = self.opponent(r, p)
+            valid = (self.skip[r, target] == 0) & (self.lives[r, target] > 0)
+            self.skip[r[valid], target[valid]] += 1
+            success[handcuffs[valid]] = True
+
+        glass = (items == MAGNIFYING_GLASS) & (self.remaining(rows) > 0)
+        r = rows[glass]
+        self.known[r] = self.chambers[r, self.cursor[r]]
+        success |= glass
+
+        self.items[rows[success], players[success], items[success]] -= 1
+        self.item_uses += np.bincount(items[success], minlength=len(ITEM_NAMES))
+
+    def _shoot(self, rows: np.ndarray, players: np.ndarray, at_self: np.ndarray):
+        # Game.shoot と同じく、空の薬室を撃とうとした場合はリロードだけ行う
+        empty = self.remaining(rows) <= 0
+        if empty.any():
+            self._reload(rows[empty])
+            rows, players, at_self = rows[~empty], players[~empty], at_self[~empty]
+
+        target = np.where(at_self, players, self.opponent(rows, players))
+        shell = self.chambers[rows, self.cursor[rows]]
+        self.cursor[rows] += 1
+        self.known[rows] = UNKNOWN
+        damage = np.where(self.sawed[rows], self.saw_multiplier, 1).astype(np.int16)
+        self.sawed[rows] = False
+
+        live = shell == LIVE
+        self.lives[rows[live], target[live]] -= damage[live]
+        turn_ends = live | ~at_self
+
+        over = self._is_over(rows)
+        self.active[rows[over]] = False
+        rows, turn_ends = rows[~over], turn_ends[~over]
+
+        empty = self.remaining(rows) <= 0
+        if empty.any():
+            self._reload(rows[empty])
+        rows, turn_ends = rows[self.active[rows]], turn_ends[self.active[rows]]
+        self._next_turn(rows[turn_ends])
+
+    def _is_over(self, rows: np.ndarray) -> np.ndarray:
+        alive = (self.lives[rows] > 0).sum(axis=1)
+        if self.first_death:
+            return alive < self.num_players
+        return alive <= 1
+
+    def _next_turn(self, rows: np.ndarray):
+        # Game.next_turn と同じく、手錠で拘束された・死亡したプレイヤーを飛ばす
+        turn = (self.turn[rows] + 1) % self.num_players
+        for _ in range(2 * self.num_players):
+            skipped = self.skip[rows, turn] > 0
+            blocked = skipped | (self.lives[rows, turn] <= 0)
+            if not blocked.any():
+                break
+            s = np.nonzero(skipped)[0]
+            self.skip[rows[s], turn[s]] -= 1
+            turn[blocked] = (turn[blocked] + 1) % self.num_players
+        self.turn[rows] = turn
+
+    # --- Driver ---
+
+    def run(self, policy=None, max_turns: int = MAX_TURNS_PER_GAME, stop_at_reload: bool = False) -> dict:
+        """全試合が終わるまで進めて集計結果を返す"""
+        policy = policy or greedy_policy
+        self.stop_at_reload = stop_at_reload
+        for _ in range(max_turns):
+            if not self.step(policy):
+                break
+        return self.summary()
+
+    def winners(self) -> np.ndarray:
+        """勝者の席番号。引き分け・未決着は -1"""
+        alive = self.lives > 0
+        winner = np.where(alive.sum(axis=1) == 1, np.argmax(alive, axis=1), -1)
+        return np.where(self.active | self.stopped_at_reload, -1, winner)
+
+    def summary(self) -> dict:
+        n = self.num_games
+        winners = self.winners()
+        dead = self.lives <= 0
+        finished = ~self.active & ~self.stopped_at_reload
+        return {
+            'games': n,
+            'unfinished': int(self.active.sum()),
+            'draws': int((finished & (winners < 0)).sum()),
+            'win_rate_by_seat': {seat: float((winners == seat).sum() / n) for seat in range(self.num_players)},
+            'elimination_rate_by_seat': {seat: float(dead[:, seat].sum() / n) for seat in range(self.num_players)},
+            'death_before_reload_rate': float((dead.any(axis=1) & (self.reloads == 0)).sum() / n),
+            'avg_turns': float(self.turns.mean()),
+            'avg_rounds': float(self.round.mean()),
+            'item_uses_per_game': {name: float(self.item_uses[i] / n) for i, name in enumerate(ITEM_NAMES)},
+        }
+
+# --- Vectorized policies (simulation.policies と同じ判断をする) ---
+
+def greedy_policy(sim: BatchSimulator, rows: np.ndarray) -> np.ndarray:
+    """GreedyPolicy のベクトル版"""
+    players = sim.turn[rows]
+    items = sim.items[rows, players]
+    attack = sim.live_probability(rows) >= 0.5
+    return _greedy_actions(sim, rows, players, items, attack)
+
+def probability_policy(sim: BatchSimulator, rows: np.ndarray) -> np.ndarray:
+    """ProbabilityAwarePolicy のベクトル版"""
+    players = sim.turn[rows]
+    items = sim.items[rows, players]
+    probability = sim.live_probability(rows)
+    known = np.where(probability == 1.0, LIVE, np.where(probability == 0.0, BLANK, sim.known[rows]))
+
+    attack = np.where(known == UNKNOWN, probability >= 0.5, known == LIVE)
+    actions = _greedy_actions(sim, rows, players, items, attack)
+
+    beer = (known == UNKNOWN) & (probability < 0.5) & (items[:, BEER] > 0) & (sim.remaining(rows) > 1)
+    actions[beer] = USE_ITEM + BEER
+    glass = (known == UNKNOWN) & (items[:, MAGNIFYING_GLASS] > 0)
+    actions[glass] = USE_ITEM + MAGNIFYING_GLASS
+    heal = (sim.lives[rows, players] < sim.max_lives) & (items[:, CIGARETTE] > 0)
+    actions[heal] = USE_ITEM + CIGARETTE
+    return actions
+
+def _greedy_actions(sim, rows, players, items, attack) -> np.ndarray:
+    # 優先度の低い順に上書きする: 射撃 < 鋸 < 手錠 < 煙草
+    actions = np.where(attack, SHOOT_OPPONENT, SHOOT_SELF)
+    saw = attack & (items[:, SAW] > 0) & ~sim.sawed[rows]
+    actions[saw] = USE_ITEM + SAW
+    handcuffs = attack & (items[:, HANDCUFFS] > 0) & ~sim.opponent_skipped(rows, players)
+    actions[handcuffs] = USE_ITEM + HANDCUFFS
+    heal = (sim.lives[rows, players] < sim.max_lives) & (items[:, CIGARETTE] > 0)
+    actions[heal] = USE_ITEM + CIGARETTE
+    return actions
+
+BATCH_POLICIES = {
+    'greedy': greedy_policy,
+    'probability': probability_policy,
+}
+
+# --- Cross-check against the scalar Game ---
+
+def cross_check(num_games: int, policy_name: str = 'greedy', num_players: int = 2, seed: int = 0) -> list[dict]:
+    """
+    同じ方針で scalar (simulation.engine) と batch を num_games 試合ずつ回し、主要な指標を比較する。
+    乱数系列は異なるため、比率は標準誤差の4倍以内、平均値は相対5%以内で一致とみなす。
+    """
+    from .engine import run_simulation
+
+    start = time.perf_counter()
+    scalar = run_simulation(num_games, [policy_name] * num_players, workers=1, seed=seed).to_dict()
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = BatchSimulator(num_games, num_players, seed=seed).run(BATCH_POLICIES[policy_name])
+    batch_elapsed = time.perf_counter() - start
+
+    rows = []
+    def compare_rate(metric, a, b):
+        stderr = math.sqrt(max(a * (1 - a), 1e-9) / num_games) * math.sqrt(2)
+        rows.append({'metric': metric, 'scalar': a, 'batch': b, 'ok': abs(a - b) <= 4 * stderr})
+    def compare_mean(metric, a, b):
+        rows.append({'metric': metric, 'scalar': a, 'batch': b, 'ok': abs(a - b) <= 0.05 * max(abs(a), 1e-9)})
+
+    for seat in range(num_players):
+        compare_rate(f'win_rate_seat_{seat + 1}', scalar['win_rate_by_seat'][seat], batch['win_rate_by_seat'][seat])
+        compare_rate(f'elimination_rate_seat_{seat + 1}', scalar['elimination_rate_by_seat'][seat], batch['elimination_rate_by_seat'][seat])
+    compare_mean('avg_turns', scalar['avg_turns'], batch['avg_turns'])
+    compare_mean('avg_rounds', scalar['avg_rounds'], batch['avg_rounds'])
+    for name in ITEM_NAMES:
+        compare_mean(f'{name}_uses', scalar['item_uses_per_game'].get(name, 0.0), batch['item_uses_per_game'][name])
+    rows.append({
+        'metric': 'games_per_second',
+        'scalar': num_games / scalar_elapsed,
+        'batch': num_games / batch_elapsed,
+        'ok': True
+    })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized batch Monte Carlo simulator")
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--policy', default='greedy', choices=sorted(BATCH_POLICIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--round', type=int, default=1, help="round number to start from")
+    parser.add_argument('--live', type=int, default=None)
+    parser.add_argument('--blank', type=int, default=None)
+    parser.add_argument('--stop-at-reload', action='store_true', help="stop each game when the first load is spent")
+    parser.add_argument('--cross-check', action='store_true', help="compare against the scalar Game")
+    args = parser.parse_args()
+
+    if args.cross_check:
+        for row in cross_check(args.games, args.policy, args.players, args.seed):
+            status = "OK " if row['ok'] else "NG "
+            print(f"{status} {row['metric']:<28} scalar={row['scalar']:>12.4f} batch={row['batch']:>12.4f}")
+        return
+
+    shell_counts = (args.live, args.blank) if args.live is not None and args.blank is not None else None
+    start = time.perf_counter()
+    sim = BatchSimulator(args.games, args.players, args.seed, args.round, shell_counts)
+    result = sim.run(BATCH_POLICIES[args.policy], stop_at_reload=args.stop_at_reload)
+    elapsed = time.perf_counter() - start
+
+    print(f"Games: {result['games']} in {elapsed:.2f}s ({result['games'] / elapsed:,.0f} games/s)")
+    for seat, rate in result['win_rate_by_seat'].items():
+        print(f"  Seat {seat + 1}: win rate {rate:.1%}, eliminated {result['elimination_rate_by_seat'][seat]:.1%}")
+    print(f"  Death before first reload: {result['death_before_reload_rate']:.2%}")
+    print(f"  Turns: avg {result['avg_turns']:.1f}  Rounds: avg {result['avg_rounds']:.2f}")
+    for name, per_game in result['item_uses_per_game'].items():
+        print(f"  {name}: {per_game:.2f} uses/game")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+config.json のバランス調整用ヘッドレス・シミュレーター。
+ハードウェア通信・ログ出力・標準出力を行わない headless な Game をボット同士で対戦させ、
+multiprocessing のプールで並列に大量の試合を回して統計を集計する。
+
+実行例:
+    python -m simulation.engine --games 100000 --policies probability greedy
+    python -m simulation.engine --config config.json --config variant.json --json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+
+from core.game import Game
+from core.game_config import config
+from utils.log import configure_logging
+from .policies import POLICIES
+
+# 終わらない設定（空砲のみなど）で無限ループしないための上限
+MAX_TURNS_PER_GAME = 500
+
+class SimulationStats:
+    """試合結果の集計。ワーカーごとに集計してから merge する"""
+    def __init__(self, num_players: int = 0):
+        self.games = 0
+        self.draws = 0
+        self.unfinished = 0
+        self.wins = Counter() # 席順 (0 = 先手) -> 勝利数
+        self.eliminations = Counter() # 席順 -> 死亡して終了した試合数（first_death では敗北数）
+        self.turns = 0
+        self.rounds = 0
+        self.length_histogram = Counter() # ターン数 -> 試合数
+        self.item_uses = Counter() # アイテム名 -> 使用成功数
+        self.num_players = num_players
+
+    def merge(self, other: 'SimulationStats'):
+        self.games += other.games
+        self.draws += other.draws
+        self.unfinished += other.unfinished
+        self.wins.update(other.wins)
+        self.eliminations.update(other.eliminations)
+        self.turns += other.turns
+        self.rounds += other.rounds
+        self.length_histogram.update(other.length_histogram)
+        self.item_uses.update(other.item_uses)
+        self.num_players = self.num_players or other.num_players
+
+    def length_percentile(self, q: float) -> int:
+        threshold = q * self.games
+        seen = 0
+        for length in sorted(self.length_histogram):
+            seen += self.length_histogram[length]
+            if seen >= threshold:
+                return length
+        return 0
+
+    def to_dict(self) -> dict:
+        games = max(self.games, 1)
+        return {
+            'games': self.games,
+            'draws': self.draws,
+            'unfinished': self.unfinished,
+            'win_rate_by_seat': {seat: self.wins[seat] / games for seat in range(self.num_players)},
+            'elimination_rate_by_seat': {seat: self.eliminations[seat] / games for seat in range(self.num_players)},
+            'first_player_advantage': self.wins[0] / games - 1 / max(self.num_players, 1),
+            'avg_turns': self.turns / games,
+            'median_turns': self.length_percentile(0.5),
+            'p95_turns': self.length_percentile(0.95),
+            'avg_rounds': self.rounds / games,
+            'item_uses_per_game': {name: count / games for name, count in sorted(self.item_uses.items())},
+        }
+
+def simulate_game(seed: int, policy_names: list[str], stats: SimulationStats):
+    """1試合をボット同士で最後まで進め、結果を stats に加える"""
+    rng = random.Random(seed)
+    player_ids = list(range(1, len(policy_names) + 1))
+    game = Game(player_ids, seed=seed, headless=True)
+    policies = {pid: POLICIES[name](rng) for pid, name in zip(player_ids, policy_names)}
+    game.start_new_round()
+
+    turns = 0
+    while not game.is_game_over():
+        if turns >= MAX_TURNS_PER_GAME:
+            stats.unfinished += 1
+            break
+        player = game.current_player
+        action = policies[player.id].choose_action(game, player)
+        items_before = player.item_count
+        game.handle_action(action)
+        if action['action'] == 'use' and player.item_count < items_before:
+            stats.item_uses[action['item_name']] += 1
+        turns += 1
+
+    stats.games += 1
+    stats.turns += turns
+    stats.rounds += game.round_number
+    stats.length_histogram[turns] += 1
+    for seat, player in enumerate(game.players):
+        if player.lives <= 0:
+            stats.eliminations[seat] += 1
+    winner = game.get_winner()
+    if winner:
+        stats.wins[game.players.index(winner)] += 1
+    elif turns < MAX_TURNS_PER_GAME:
+        stats.draws += 1
+
+def _init_worker(config_path: str):
+    config.reload(config_path)
+    configure_logging({'enabled': False})
+
+def _run_chunk(task: tuple) -> SimulationStats:
+    first_seed, count, policy_names = task
+    stats = SimulationStats(len(policy_names))
+    for seed in range(first_seed, first_seed + count):
+        simulate_game(seed, policy_names, stats)
+    return stats
+
+def run_simulation(num_games: int, policy_names: list[str], config_path: str = 'config.json',
+                   workers: int | None = None, seed: int = 0, chunk_size: int = 1000) -> SimulationStats:
+    """
+    num_games 試合をプロセスプールで並列に実行し、集計結果を返す。
+    シードは seed から連番で割り当てるため、同じ引数なら結果も同じになる。
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (seed + start, min(chunk_size, num_games - start), policy_names)
+        for start in range(0, num_games, chunk_size)
+    ]
+    total = SimulationStats(len(policy_names))
+    if workers == 1:
+        _init_worker(config_path)
+        for task in tasks:
+            total.merge(_run_chunk(task))
+        return total
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(config_path,)) as pool:
+        for stats in pool.imap_unordered(_run_chunk, tasks):
+            total.merge(stats)
+    return total
+
+def print_report(config_path: str, policy_names: list[str], result: dict, elapsed: float):
+    print(f"=== {config_path} ({' vs '.join(policy_names)}) ===")
+    print(f"Games: {result['games']} in {elapsed:.2f}s ({result['games'] / elapsed:,.0f} games/s)")
+    for seat, rate in result['win_rate_by_seat'].items():
+        eliminated = result['elimination_rate_by_seat'][seat]
+        print(f"  Seat {seat + 1} ({policy_names[seat]}): win rate {rate:.1%}, eliminated {eliminated:.1%}")
+    print(f"  Draws: {result['draws']}  Unfinished: {result['unfinished']}")
+    print(f"  First player advantage: {result['first_player_advantage']:+.1%}")
+    print(f"  Turns: avg {result['avg_turns']:.1f} / median {result['median_turns']} / p95 {result['p95_turns']}"
+          f"  Rounds: avg {result['avg_rounds']:.2f}")
+    for name, per_game in result['item_uses_per_game'].items():
+        print(f"  {name}: {per_game:.2f} uses/game")
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless balance simulation for config.json")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--policies', nargs='+', default=['probability', 'probability'], choices=sorted(POLICIES))
+    parser.add_argument('--config', action='append', dest='configs', help="config file (repeatable)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = {}
+    for config_path in args.configs or ['config.json']:
+        start = time.perf_counter()
+        stats = run_simulation(args.games, args.policies, config_path, args.workers, args.seed)
+        elapsed = time.perf_counter() - start
+        result = stats.to_dict()
+        result['games_per_second'] = stats.games / elapsed
+        results[config_path] = result
+        if not args.json:
+            print_report(config_path, args.policies, result, elapsed)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import random
+import typing
+
+if typing.TYPE_CHECKING:
+    from core.game import Game
+    from core.player import Player
+
+class BotPolicy:
+    """ボットの行動方針の基底クラス。手番のプレイヤーが取る action_data を返す"""
+    name = "base"
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def choose_action(self, game: 'Game', player: 'Player') -> dict:
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    @staticmethod
+    def opponents(game: 'Game', player: 'Player') -> list['Player']:
+        return [p for p in game.players if p.id != player.id and p.lives > 0]
+
+    @staticmethod
+    def live_probability(game: 'Game') -> float:
+        live, blank = game.shotgun.get_shell_counts()
+        total = live + blank
+        return live / total if total else 0.0
+
+    @staticmethod
+    def shoot(target: 'Player') -> dict:
+        return {'action': 'shoot', 'target_id': target.id}
+
+    @staticmethod
+    def use(item_name: str, target: 'Player' = None) -> dict:
+        return {'action': 'use', 'item_name': item_name, 'target_id': target.id if target else None}
+
+class RandomPolicy(BotPolicy):
+    """生存者への射撃と所持アイテムの使用から一様に選ぶ"""
+    name = "random"
+
+    def choose_action(self, game: 'Game', player: 'Player') -> dict:
+        opponents = self.opponents(game, player)
+        choices = [self.shoot(p) for p in opponents + [player]]
+        for item in player.items:
+            if item.name == "Handcuffs":
+                if opponents:
+                    choices.append(self.use(item.name, self.rng.choice(opponents)))
+            else:
+                choices.append(self.use(item.name))
+        return self.rng.choice(choices)
+
+class GreedyPolicy(BotPolicy):
+    """
+    実弾の確率だけを見て行動する。
+    確率が半分以上なら鋸・手錠を使ってライフの少ない相手を撃ち、そうでなければ自分を撃つ。
+    """
+    name = "greedy"
+
+    def choose_action(self, game: 'Game', player: 'Player') -> dict:
+        opponents = self.opponents(game, player)
+        target = min(opponents, key=lambda p: p.lives) if opponents else player
+
+        if player.lives < player.max_lives and player.find_item("Cigarette"):
+            return self.use("Cigarette")
+
+        if self.live_probability(game) >= 0.5:
+            return self.attack(game, player, target, opponents)
+        return self.shoot(player)
+
+    def attack(self, game: 'Game', player: 'Player', target: 'Player', opponents: list['Player']) -> dict:
+        if player.find_item("Handcuffs") and not any(p.skip_turns for p in opponents):
+            return self.use("Handcuffs", target)
+        if player.find_item("Saw") and not game.shotgun.is_sawed_off:
+            return self.use("Saw")
+        return self.shoot(target)
+
+class ProbabilityAwarePolicy(GreedyPolicy):
+    """
+    拡大鏡で次弾を確認し、確定した情報に基づいて行動する。
+    不確定なまま空砲寄りの場面では、ビールで弾を捨てて情報を増やす。
+    """
+    name = "probability"
+
+    def __init__(self, rng: random.Random):
+        super().__init__(rng)
+        self._peek = None # (装填した弾, 残弾数) 自分で拡大鏡を使った時点の記録
+
+    def known_shell(self, game: 'Game') -> str | None:
+        probability = self.live_probability(game)
+        if probability in (0.0, 1.0):
+            return 'live' if probability else 'blank'
+        # 自分が拡大鏡で見た弾がまだ装填されていれば、その結果を知っている
+        if self._peek is not None:
+            shells, remaining = self._peek
+            if shells is game.shotgun.shells and remaining == game.shotgun.remaining:
+                return game.shotgun.peek_next_shell()
+        return None
+
+    def choose_action(self, game: 'Game', player: 'Player') -> dict:
+        opponents = self.opponents(game, player)
+        target = min(opponents, key=lambda p: p.lives) if opponents else player
+
+        if player.lives < player.max_lives and player.find_item("Cigarette"):
+            return self.use("Cigarette")
+
+        known = self.known_shell(game)
+        if known is None and player.find_item("MagnifyingGlass"):
+            self._peek = (game.shotgun.shells, game.shotgun.remaining)
+            return self.use("MagnifyingGlass")
+
+        if known == 'live':
+            return self.attack(game, player, target, opponents)
+        if known == 'blank':
+            return self.shoot(player)
+
+        probability = self.live_probability(game)
+        if probability < 0.5 and player.find_item("Beer") and game.shotgun.remaining > 1:
+            return self.use("Beer")
+        if probability >= 0.5:
+            return self.attack(game, player, target, opponents)
+        return self.shoot(player)
+
+POLICIES = {
+    policy.name: policy
+    for policy in (RandomPolicy, GreedyPolicy, ProbabilityAwarePolicy)
+}
@@ -1,21 +1,109 @@
 let pollInterval;
+let streamActive = false;
+let localState = null;
+const renderedCards = {};
+let renderedLogKey = '';
 
 async function startPolling(gameId) {
-    updateGameState(gameId);
-    pollInterval = setInterval(() => updateGameState(gameId), 2000);
+    subscribeGameState(gameId, renderGame);
 }
 
-async function updateGameState(gameId) {
+// Receive state pushes over WebSocket, falling back to SSE and finally to polling.
+// With playerId only that player's view is received (no other player's hidden information).
+function subscribeGameState(gameId, onState, playerId = null) {
+    const viewer = playerId === null ? '' : `?player_id=${playerId}`;
+    const handle = (data) => {
+        streamActive = true;
+        localState = JSON.parse(data);
+        onState(localState);
+    };
+
+    const startSse = () => {
+        if (!window.EventSource) {
+            startStatePolling(gameId, onState, playerId);
+            return;
+        }
+        const source = new EventSource(`/api/game/${gameId}/stream${viewer}`);
+        source.onmessage = (e) => handle(e.data);
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                streamActive = false;
+                startStatePolling(gameId, onState, playerId);
+            }
+        };
+    };
+
+    if (!window.WebSocket) {
+        startSse();
+        return;
+    }
+    const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${location.host}/ws/game/${gameId}${viewer}`);
+    let opened = false;
+    socket.onopen = () => { opened = true; };
+    socket.onmessage = (e) => handle(e.data);
+    socket.onclose = () => {
+        streamActive = false;
+        // Reconnect if an established socket dropped, otherwise fall back to SSE
+        if (opened) {
+            setTimeout(() => subscribeGameState(gameId, onState, playerId), 1000);
+        } else {
+            startSse();
+        }
+    };
+}
+
+function startStatePolling(gameId, onState, playerId = null) {
+    if (pollInterval) return;
+    fetchGameState(gameId, onState, playerId);
+    pollInterval = setInterval(() => fetchGameState(gameId, onState, playerId), 2000);
+}
+
+// Fetch only what changed since the last known version (a player's view is always fetched whole)
+async function fetchGameState(gameId, onState, playerId = null) {
     try {
-        const res = await fetch(`/api/game/${gameId}/state`);
+        if (playerId !== null) localState = null;
+        const query = playerId !== null ? `?player_id=${playerId}` : localState ? `?since=${localState.version}` : '';
+        const res = await fetch(`/api/game/${gameId}/state${query}`);
+        if (res.status === 304) return;
         if (!res.ok) throw new Error('Failed to fetch state');
-        const state = await res.json();
-        renderGame(state);
+        const data = await res.json();
+        if (!localState) {
+            localState = data;
+        } else if (data.patch) {
+            localState = applyStatePatch(localState, data.patch);
+            localState.version = data.version;
+        } else {
+            localState = data.full;
+        }
+        onState(localState);
     } catch (err) {
         console.error(err);
     }
 }
 
+function applyStatePatch(state, patch) {
+    patch.forEach(op => {
+        const keys = op.path.split('/').slice(1);
+        const last = keys.pop();
+        let target = state;
+        keys.forEach(k => { target = target[k]; });
+        if (op.op === 'add' && last === '-') {
+            target.push(op.value);
+        } else {
+            target[last] = op.value;
+        }
+    });
+    if (state.logs.length > 10) state.logs = state.logs.slice(-10);
+    return state;
+}
+
+async function updateGameState(gameId) {
+    // State is pushed by the server while the stream is connected
+    if (streamActive) return;
+    await fetchGameState(gameId, renderGame);
+}
+
 function renderGame(state) {
     // Update Header
     const roundDisplay = document.getElementById('round-display');
@@ -41,13 +129,22 @@ function renderGame(state) {
     // Update Players
     const container = document.getElementById('players-container');
     if (container) {
-        container.innerHTML = '';
         state.players.forEach(p => {
             const isCurrent = p.id === state.current_player_id;
-            const card = document.createElement('div');
+            let card = document.getElementById(`player-card-${p.id}`);
+            if (!card) {
+                card = document.createElement('div');
+                card.id = `player-card-${p.id}`;
+                container.appendChild(card);
+            }
             card.className = `player-card ${isCurrent ? 'active' : ''}`;
             if (p.lives <= 0) card.classList.add('dead');
 
+            // Only touch the DOM for cards whose contents changed
+            const cardKey = JSON.stringify([p, isCurrent]);
+            if (renderedCards[p.id] === cardKey) return;
+            renderedCards[p.id] = cardKey;
+
             const itemsHtml = p.items.map(i => `<span class="item-tag">${i}</span>`).join('');
             const livesIcon = '⚡'.repeat(p.lives);
 
@@ -61,7 +158,6 @@ function renderGame(state) {
                     ${p.is_skipped ? '<div style="color:orange; margin-top:5px">[HANDCUFFED]</div>' : ''}
                 </div>
             `;
-            container.appendChild(card);
         });
     }
 
@@ -78,7 +174,9 @@ function renderGame(state) {
 
     // Update Logs
     const logContainer = document.getElementById('game-log');
-    if (logContainer) {
+    const logKey = JSON.stringify(state.logs);
+    if (logContainer && logKey !== renderedLogKey) {
+        renderedLogKey = logKey;
         logContainer.innerHTML = '';
         state.logs.forEach(log => {
             const entry = document.createElement('div');
@@ -204,3 +302,17 @@ async function undoGame() {
         console.error(err);
     }
 }
+
+async function redoGame() {
+    try {
+        const res = await fetch(`/api/game/${GAME_ID}/redo`, { method: 'POST' });
+        const result = await res.json();
+        if (result.success) {
+            updateGameState(GAME_ID);
+        } else {
+            alert(result.message);
+        }
+    } catch (err) {
+        console.error(err);
+    }
+}
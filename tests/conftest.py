@@ -0,0 +1,19 @@
+import pytest
+
+from core.game import Game
+from hardware.interface import hardware_interface
+from hardware.transport import LoopbackTransport
+from utils.log import configure_logging
+
+configure_logging({'enabled': False})
+
+@pytest.fixture
+def loopback(monkeypatch, tmp_path):
+    """テーブル端末への送信をメモリ上に受ける。物理ショットガンへのトリガーは送らず、ログは一時ディレクトリに書く"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Game, 'send_trigger', lambda self, shell: None)
+    transport = LoopbackTransport()
+    hardware_interface.set_transport(transport)
+    hardware_interface._sent_versions.clear()
+    yield transport
+    hardware_interface.set_transport(None)
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from simulation.batch import BATCH_POLICIES, cross_check
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('num_players', [2, 3])
+@pytest.mark.parametrize('policy', sorted(BATCH_POLICIES))
+def test_batch_matches_scalar_engine(monkeypatch, policy, num_players):
+    # scalar 側は config.json を読み込み直すのでリポジトリ直下で回す
+    monkeypatch.chdir(REPO_ROOT)
+    rows = {row['metric']: row for row in cross_check(2000, policy, num_players, seed=7)}
+    # 勝率・脱落率は標準誤差の4倍以内、平均ターン数・ラウンド数は相対5%以内（cross_check の基準）
+    checked = [f'{kind}_rate_seat_{seat + 1}' for seat in range(num_players) for kind in ('win', 'elimination')]
+    checked += ['avg_turns', 'avg_rounds']
+    mismatched = {metric: (rows[metric]['scalar'], rows[metric]['batch']) for metric in checked if not rows[metric]['ok']}
+    assert not mismatched
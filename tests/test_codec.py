@@ -0,0 +1,110 @@
+import pytest
+
+from core.game import Game
+from hardware.codec import CodecError, decode_frame, encode_frame, encode_message
+from hardware.interface import hardware_interface
+
+def roundtrip(*payloads: dict) -> list[dict]:
+    return decode_frame(encode_frame([encode_message(p) for p in payloads]))
+
+def state_payload(**state) -> dict:
+    base = {
+        'version': 3, 'round': 2, 'current_player_id': 7,
+        'shotgun': {'live_shells': 2, 'blank_shells': 3, 'is_sawed_off': True},
+        'players': [
+            {'id': 7, 'lives': 4, 'is_skipped': False, 'items': ['Saw', 'Beer']},
+            {'id': 8, 'lives': 1, 'is_skipped': True, 'items': []},
+        ],
+    }
+    return {'type': 'game_state', 'game_id': 'g1', 'state': {**base, **state}}
+
+def test_roundtrip_every_message_type():
+    shot = {'type': 'shot_fired', 'game_id': 'g1', 'player_id': 7, 'shell_type': 'live'}
+    blank = {**shot, 'shell_type': 'blank'}
+    item = {'type': 'item_result', 'game_id': 'g1', 'player_id': 8,
+            'item_name': 'MagnifyingGlass', 'success': True, 'message': '実弾です'}
+    state = state_payload()
+    assert roundtrip(shot, blank, item, state) == [shot, blank, item, state]
+
+def test_roundtrip_edge_values():
+    state = state_payload(version=0xFFFFFFFF, round=70000, players=[
+        {'id': 1, 'lives': 255, 'is_skipped': False, 'items': ['Cigarette', 'Handcuffs']},
+        {'id': 2, 'lives': -2, 'is_skipped': False, 'items': ['Adrenaline']},
+    ])
+    (decoded,) = roundtrip(state)
+    assert decoded['state']['version'] == 0xFFFFFFFF
+    assert decoded['state']['round'] == 0xFFFF # u16 に収まるよう丸める
+    assert [p['lives'] for p in decoded['state']['players']] == [255, 0]
+    assert decoded['state']['players'][1]['items'] == ['Unknown']
+
+def test_unknown_item_result():
+    item = {'type': 'item_result', 'game_id': 'g1', 'player_id': 1,
+            'item_name': 'Adrenaline', 'success': False, 'message': ''}
+    assert roundtrip(item) == [{**item, 'item_name': 'Unknown'}]
+
+@pytest.mark.parametrize('limit, wide', [(0xFF, False), (0xFFFF - 11, True)]) # 11 = ゲームID + 結果 + 長さ
+def test_long_strings_cut_on_character_boundary(limit, wide):
+    text = 'あ' * (limit // 3 + 10) # 3バイト文字なので上限のバイト数は文字の途中に来る
+    if wide:
+        payload = {'type': 'item_result', 'game_id': 'g1', 'player_id': 1,
+                   'item_name': 'Beer', 'success': True, 'message': text}
+        (decoded,) = roundtrip(payload)
+        result = decoded['message']
+    else:
+        (decoded,) = roundtrip({'type': 'shot_fired', 'game_id': text, 'player_id': 1, 'shell_type': 'live'})
+        result = decoded['game_id']
+    assert result == 'あ' * (limit // 3)
+
+def test_malformed_frames_raise_codec_error():
+    frame = encode_frame([encode_message(state_payload())])
+    with pytest.raises(CodecError):
+        decode_frame(b'XX' + frame[2:])
+    with pytest.raises(CodecError):
+        decode_frame(frame[:-3])
+    with pytest.raises(CodecError):
+        encode_message({'type': 'reload', 'game_id': 'g1'})
+
+def new_game() -> Game:
+    game = Game([1, 2], game_id='g1', seed=1)
+    game.start_new_round()
+    return game
+
+def test_mutation_is_sent_as_one_frame(loopback):
+    game = new_game()
+    loopback.frames.clear()
+    game.handle_action({'action': 'shoot', 'target_id': 2})
+    assert len(loopback.frames) == 1
+    kinds = [p['type'] for p in decode_frame(loopback.frames[0])]
+    assert kinds == ['shot_fired', 'game_state']
+    assert decode_frame(loopback.frames[0])[1]['state']['version'] == game.version
+
+def test_same_state_version_is_sent_once(loopback):
+    state = state_payload()['state']
+    hardware_interface.send_game_state('g1', state)
+    hardware_interface.send_game_state('g1', state)
+    hardware_interface.send_game_state('g2', state) # ゲームが違えば別に送る
+    assert [(p['game_id'], p['state']['version']) for p in loopback.received()] == [('g1', 3), ('g2', 3)]
+
+    # 追い出したゲームを読み込み直したら、同じバージョンからでも送り直す
+    hardware_interface.forget_game('g1')
+    hardware_interface.send_game_state('g1', state)
+    assert len(loopback.received()) == 3
+
+def test_failed_notification_still_closes_the_batch(loopback, monkeypatch):
+    game = new_game()
+    loopback.frames.clear()
+    core_state = Game._core_state
+    failing = [True]
+    def flaky_core_state(self):
+        if failing.pop():
+            raise RuntimeError('boom')
+        return core_state(self)
+    monkeypatch.setattr(Game, '_core_state', flaky_core_state)
+    # 通知が例外を出しても送信バッチは閉じ、次の操作は送られる
+    with pytest.raises(RuntimeError):
+        game.handle_action({'action': 'shoot', 'target_id': 2})
+    assert hardware_interface._local.depth == 0
+    failing.append(False)
+    game.handle_action({'action': 'shoot', 'target_id': 2})
+    assert loopback.frames
+    assert hardware_interface._local.depth == 0
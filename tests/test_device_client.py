@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from hardware.device_client import DeviceConnection
+from hardware.stub_device import StubDevice
+
+async def sent(connection: DeviceConnection):
+    """送信した要求が応答待ちになるまで待つ"""
+    while not connection._pending:
+        await asyncio.sleep(0)
+
+def run(scenario):
+    """スタブ・デバイスを立てて scenario(device, connection) を実行する"""
+    async def main():
+        device = await StubDevice(delay=0.01).start()
+        connection = DeviceConnection('stub', device.host, device.port, backoff_initial=0.01)
+        try:
+            await scenario(device, connection)
+        finally:
+            await connection.close()
+            await device.stop()
+    asyncio.run(main())
+
+def test_pipelined_requests_are_answered_in_order():
+    async def scenario(device, connection):
+        responses = await asyncio.gather(*(connection.request(f"cmd{i}", 1.0) for i in range(5)))
+        assert responses == [f"OK:cmd{i}" for i in range(5)]
+        assert device.connections == 1
+    run(scenario)
+
+def test_write_failure_drops_the_connection(monkeypatch):
+    async def scenario(device, connection):
+        await connection.request("hello", 1.0)
+        writer = connection._writer
+        def broken_write(data):
+            raise ConnectionResetError("reset by peer")
+        monkeypatch.setattr(writer, 'write', broken_write)
+        with pytest.raises(ConnectionError):
+            await connection.request("lost", 1.0)
+        assert not connection._pending
+        assert not connection.connected
+        assert writer.is_closing()
+        # 次の要求は新しい接続で送られる
+        assert await connection.request("again", 1.0) == "OK:again"
+        assert connection.metrics.reconnects == 1
+    run(scenario)
+
+def test_stale_connection_does_not_touch_the_new_one():
+    async def scenario(device, connection):
+        await connection.request("hello", 1.0)
+        old_writer, old_task = connection._writer, connection._read_task
+        old_writer.close() # 相手から切られた接続を再現する
+        assert await connection.request("again", 1.0) == "OK:again"
+        assert connection._writer is not old_writer
+        # 古い接続の読み込みタスクが後から終了しても、新しい接続と待機中の要求には触れない
+        slow = asyncio.ensure_future(connection.request("slow", 1.0))
+        await sent(connection)
+        old_task.cancel()
+        await asyncio.gather(old_task, return_exceptions=True)
+        connection._drop(old_writer, ConnectionError("stale"))
+        assert await slow == "OK:slow"
+        assert connection.connected
+    run(scenario)
+
+def test_close_fails_pending_requests_and_cancels_the_reader():
+    async def scenario(device, connection):
+        await connection.request("hello", 1.0)
+        task = connection._read_task
+        pending = asyncio.ensure_future(connection.request("slow", 1.0))
+        await sent(connection)
+        await connection.close()
+        with pytest.raises(ConnectionError):
+            await pending
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+    run(scenario)
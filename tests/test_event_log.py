@@ -0,0 +1,15 @@
+from core.event_log import EventLogWriter, GameLogReader
+
+def test_open_files_are_capped(tmp_path):
+    writer = EventLogWriter(str(tmp_path), flush_interval=0.01, max_open_files=2)
+    for round_number in range(2):
+        for game_id in ('a', 'b', 'c'):
+            writer.write(game_id, {'seq': round_number, 'game': game_id})
+        assert writer.flush()
+        assert len(writer._files) <= 2
+    # 閉じたファイルも開き直して追記される
+    for game_id in ('a', 'b', 'c'):
+        assert [e['seq'] for e in GameLogReader.for_game(game_id, str(tmp_path))] == [0, 1]
+    writer.close('c')
+    assert writer.flush()
+    assert 'c' not in writer._files
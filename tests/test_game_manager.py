@@ -0,0 +1,27 @@
+from core.game import Game
+from core.game_manager import GameManager
+from core.storage import SQLiteGameStore
+
+def test_shared_reads_catch_up_without_a_lease(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'games.db')
+    writer, reader = GameManager(), GameManager()
+    writer.set_store(SQLiteGameStore(path), shared=True, sync_interval=60)
+    reader.set_store(SQLiteGameStore(path), shared=True, sync_interval=60)
+    leases = []
+    acquire = reader.store.acquire_lease
+    monkeypatch.setattr(reader.store, 'acquire_lease', lambda *args: leases.append(args) or acquire(*args))
+    monkeypatch.setattr(Game, 'send_trigger', lambda self, shell: None)
+
+    game_id = writer.create_game([1, 2], None, 1)
+    writer.router.submit(game_id, 'start_new_round').result()
+    assert reader.router.submit(game_id, Game.get_state_json).result()
+    writer.router.submit(game_id, 'handle_action', {'action': 'shoot', 'target_id': 2}).result()
+
+    # 読み出しはリースを取らずに、他のワーカーの操作を取り込んでから読む
+    state = reader.router.submit(game_id, Game.get_state).result()
+    assert state['version'] == writer.router.submit(game_id, Game.get_state).result()['version']
+    assert not leases
+    # 変更はリースを取る
+    reader.router.submit(game_id, 'handle_action', {'action': 'shoot', 'target_id': 1}).result()
+    assert len(leases) == 1
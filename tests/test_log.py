@@ -0,0 +1,11 @@
+import logging
+
+from utils.log import configure_logging, get_logger
+
+def test_disabling_overrides_subsystem_levels(capsys):
+    configure_logging({'levels': {'game': 'DEBUG'}, 'file': None})
+    assert get_logger('game').isEnabledFor(logging.DEBUG)
+    configure_logging({'enabled': False})
+    assert not get_logger('game').isEnabledFor(logging.CRITICAL)
+    get_logger('game').error("dropped")
+    assert "dropped" not in capsys.readouterr().err
@@ -0,0 +1,25 @@
+import statistics
+from collections import deque
+
+class LatencyWindow:
+    """直近 size 件の所要時間（秒）を保持し、ミリ秒単位のパーセンタイルを返す"""
+    def __init__(self, size: int = 1024):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+        def percentile(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+        return {
+            'count': len(samples),
+            'mean': statistics.fmean(samples) * 1000,
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': samples[-1] * 1000,
+        }
@@ -0,0 +1,168 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# すべてのロガーはこの名前の下に置く（br.game, br.manager, br.hardware ...）
+ROOT = "br"
+
+DEFAULT_SETTINGS = {
+    'enabled': True,
+    'level': 'INFO',
+    'format': 'text', # 'text' または 'json'（1行1レコード）
+    'levels': {}, # サブシステムごとのレベル {"hardware": "WARNING"}
+    'rate_limit': {'per_second': 100, 'burst': 200}, # WARNING 未満の同じ種類の行の上限
+    'file': None, # 指定すると標準出力の代わりにファイルへ追記する
+    'queue_size': 10000,
+}
+
+# LogRecord の標準属性（これ以外は extra= で渡された構造化フィールド）
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行の JSON にする。extra= で渡したフィールドもそのまま含める"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'subsystem': record.name.removeprefix(ROOT + "."),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    同じ種類の行（ロガー名と書式文字列が同じもの）を、1秒あたり per_second 件に抑えるトークンバケット。
+    WARNING 以上は常に通す。抑えた件数は、次に通した行に suppressed として付ける。
+    """
+    def __init__(self, per_second: float, burst: int):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self._buckets: dict[tuple, list] = {} # key -> [tokens, last_time, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    呼び出し側のスレッドでは引数の埋め込みだけを行ってキューに積み、整形と出力は書き出しスレッドに任せる。
+    キューが溢れた時は待たずに捨てる（ゲーム進行をログ出力で止めない）。
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: QueueListener | None = None
+_handler: _NonBlockingQueueHandler | None = None
+_configured = False
+_subsystems: set[str] = set() # settings['levels'] でレベルを設定したサブシステム
+_configure_lock = threading.Lock()
+
+def configure_logging(settings: dict | None = None):
+    """
+    ログ出力を（再）設定する。config.json の logging セクションをそのまま渡す。
+    {"enabled": false} なら全ロガーを無効にし、呼び出しは書式化もされずに捨てられる（シミュレーション・ベンチマーク用）。
+    """
+    global _listener, _handler, _configured
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    with _configure_lock:
+        _configured = True
+        root = logging.getLogger(ROOT)
+        if _listener is not None:
+            _listener.stop()
+            root.removeHandler(_handler)
+            _listener = _handler = None
+        # 前回の設定のサブシステムごとのレベルを外す（残っていると無効にしても br.<名前> からは出力される）
+        for subsystem in _subsystems:
+            logging.getLogger(f"{ROOT}.{subsystem}").setLevel(logging.NOTSET)
+        _subsystems.clear()
+
+        if not settings['enabled']:
+            root.setLevel(logging.CRITICAL + 1)
+            root.propagate = False
+            return
+
+        if settings['file']:
+            output = logging.FileHandler(settings['file'], encoding='utf-8')
+        else:
+            output = logging.StreamHandler(sys.stdout)
+        if settings['format'] == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s", "%H:%M:%S"))
+
+        log_queue = queue.Queue(maxsize=settings['queue_size'])
+        _handler = _NonBlockingQueueHandler(log_queue)
+        rate_limit = settings['rate_limit']
+        if rate_limit:
+            _handler.addFilter(RateLimitFilter(rate_limit['per_second'], rate_limit['burst']))
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+
+        root.addHandler(_handler)
+        root.setLevel(settings['level'])
+        root.propagate = False
+        for subsystem, level in settings['levels'].items():
+            logging.getLogger(f"{ROOT}.{subsystem}").setLevel(level)
+            _subsystems.add(subsystem)
+
+def flush_logging():
+    """キューに残っているログを書き出す（書き出しスレッドは再起動する）"""
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """サブシステム用のロガー。未設定なら既定の設定（INFO 以上を標準出力へ）で初期化する"""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+def _shutdown():
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_shutdown)
@@ -0,0 +1,201 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+
+# ヒストグラムの区切り（秒）。1アクションの処理（数十µs）から遅いデバイス応答（秒単位）までを覆う
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# 処理中のリクエストのトレース（スパンのリスト）。トレースしていなければ None
+_current_trace: contextvars.ContextVar[list | None] = contextvars.ContextVar('br_trace', default=None)
+
+class Histogram:
+    """Prometheus 形式の累積ヒストグラム1系列"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+class _NoopSpan:
+    """計測が無効な時の span()。何もしない"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    __slots__ = ('registry', 'phase', 'start')
+
+    def __init__(self, registry: 'Metrics', phase: str):
+        self.registry = registry
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record_phase(self.phase, self.start)
+        return False
+
+class _TimedMethod:
+    """
+    timed() が返す一時的なデスクリプタ。クラス定義時に登録され、クラスには
+    計測が無効なら元のメソッドそのものを、有効なら計測用のラッパーを置く。
+    """
+    def __init__(self, registry: 'Metrics', func, phase: str):
+        self.registry = registry
+        self.func = func
+        self.phase = phase
+
+    def __set_name__(self, owner, name):
+        self.registry._register_method(owner, name, self.func, self.phase)
+
+class Metrics:
+    """
+    処理時間の計測と Prometheus 形式での書き出し。
+    無効な間（既定）は timed() を付けたメソッドが元のメソッドのまま置かれるので、コストはかからない。
+    トレース中のリクエスト（start_trace() 以降）では、各フェーズの所要時間をスパンとしても記録する。
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_all = False # True なら全リクエストをトレースする（既定はヘッダで要求された時だけ）
+        self._series: dict[str, dict[tuple, Histogram]] = {}
+        self._help: dict[str, str] = {}
+        self._gauges: dict[str, object] = {}
+        self._methods: list[tuple] = [] # (クラス, 属性名, 元のメソッド, 計測用ラッパー)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, trace: bool = False):
+        self.enabled = enabled
+        self.trace_all = trace
+        for owner, name, func, wrapper in self._methods:
+            setattr(owner, name, wrapper if enabled else func)
+
+    # --- 記録 ---
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        """labels は (('phase', 'shoot'),) のような (名前, 値) のタプル"""
+        series = self._series.get(name)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(labels, Histogram())
+        histogram.observe(seconds)
+
+    def record_phase(self, phase: str, start: float):
+        elapsed = time.perf_counter() - start
+        self.observe('br_game_phase_seconds', (('phase', phase),), elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append((phase, elapsed))
+
+    def timed(self, phase: str):
+        """メソッドの所要時間をフェーズとして記録するデコレータ（クラス内のメソッド専用）"""
+        def decorator(func):
+            return _TimedMethod(self, func, phase)
+        return decorator
+
+    def _register_method(self, owner, name: str, func, phase: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record_phase(phase, start)
+        self._methods.append((owner, name, func, wrapper))
+        setattr(owner, name, wrapper if self.enabled else func)
+
+    def span(self, phase: str):
+        """with metrics.span('state_serialize'): ... で処理の一部を計測する"""
+        return _Span(self, phase) if self.enabled else _NOOP_SPAN
+
+    def gauge(self, name: str, help_text: str, collect):
+        """書き出し時に collect() -> [(labels, value), ...] を呼んで現在値を得るゲージを登録する"""
+        self._help[name] = help_text
+        self._gauges[name] = collect
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    # --- トレース ---
+
+    def start_trace(self) -> tuple[contextvars.Token, list]:
+        spans = []
+        return _current_trace.set(spans), spans
+
+    def end_trace(self, token: contextvars.Token):
+        _current_trace.reset(token)
+
+    @staticmethod
+    def server_timing(spans: list, total: float) -> str:
+        """Server-Timing ヘッダの値。同じフェーズは合計し、回数を desc に入れる"""
+        totals: dict[str, list] = {}
+        for phase, elapsed in spans:
+            entry = totals.setdefault(phase, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
+        parts = [f'{phase};dur={elapsed * 1000:.3f};desc="x{count}"' for phase, (elapsed, count) in totals.items()]
+        parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+    # --- 書き出し ---
+
+    def render(self) -> str:
+        """Prometheus のテキスト形式 (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            series = {name: list(values.items()) for name, values in self._series.items()}
+        for name, values in sorted(series.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(values, key=lambda item: item[0]):
+                with histogram._lock:
+                    counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+                cumulative = 0
+                for bound, bucket_count in zip((*histogram.buckets, '+Inf'), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_labels((*labels, ('le', bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        for name, collect in sorted(self._gauges.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+# シングルトンインスタンス
+metrics = Metrics()
+metrics.describe('br_game_phase_seconds', "Time spent in each game engine phase")
+metrics.describe('br_http_request_seconds', "Web API request latency by route")
+metrics.describe('br_device_command_seconds', "Device command round-trip time by outcome")
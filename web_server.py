@@ -1,22 +1,68 @@
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException, Form
+from fastapi import FastAPI, Request, HTTPException, Form, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Optional, List
 import json
 import os
+import orjson
+import asyncio
+import time
+from contextlib import asynccontextmanager
 
 # Import game logic
 from core.game_manager import game_manager
-from core.game import Game
-from core.game import Game
+from core.game import Game, read_only
 from core.items import ITEMS
-from core.game_config import config
+from core.game_config import config, ConfigError
+from core.profiles import profiles
+from core.state_hub import state_hub
+from core.event_log import event_log_writer, GameLogReader
+from core.replay import replay
+from core.solver import solve
+from core.storage import open_store
+from core.action_router import ActionQueueFull, GameNotFound
+from core.sharding import current_shard
+from hardware.dispatcher import hardware_dispatcher
+from hardware.interface import hardware_interface
+from utils.log import configure_logging
+from utils.metrics import metrics
 
-app = FastAPI(title="Buckshot Roulette Dashboard")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Inbound device events (RFID readers, triggers) go through the same per-game queues as the web API
+    if config.network_config.get('event_server'):
+        hardware_interface.register_game_manager(game_manager)
+        # Behind shard_router.py every shard listens on its own port (base port + shard index)
+        # Workers sharing one store also share the port (any worker can handle any game)
+        hardware_interface.start_listening(port=config.network_config['event_server'].get('port', 9000) + SHARD_INDEX,
+                                           reuse_port=game_manager.shared)
+    # Rule changes in config.json apply to games created afterwards; running games keep the rules they started with
+    if config.reload_config.get('enabled'):
+        config.watch(config.reload_config.get('interval', 1.0))
+    yield
+    config.stop_watching()
+    hardware_interface.stop_listening()
+
+# --- Responses ---
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: orjson instead of the stdlib encoder"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+class RawJSONResponse(Response):
+    """A body that is already JSON (a game's cached state bytes), sent as-is"""
+    media_type = "application/json"
+
+def state_response(message: str, state: bytes) -> RawJSONResponse:
+    """{"success": true, "message": ..., "state": ...} around cached state bytes, without re-encoding the state"""
+    return RawJSONResponse(b'{"success":true,"message":' + orjson.dumps(message) + b',"state":' + state + b'}')
+
+app = FastAPI(title="Buckshot Roulette Dashboard", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +72,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Instrumentation ---
+# Diagnostics go through a queue-backed logger (config.json "logging"); the request path never writes to stdout.
+configure_logging(config.logging_config)
+
+# Prometheus metrics at /metrics. Send "X-Trace: 1" (or set metrics.trace) to get per-phase
+# timings of a request back in its Server-Timing header.
+metrics.configure(**config.metrics_config)
+
+if metrics.enabled:
+    @app.middleware("http")
+    async def instrument_requests(request: Request, call_next):
+        token = None
+        if metrics.trace_all or "x-trace" in request.headers:
+            token, spans = metrics.start_trace()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            if token is not None:
+                metrics.end_trace(token)
+        elapsed = time.perf_counter() - start
+        # Label by route template (/api/game/{game_id}/action), not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        metrics.observe("br_http_request_seconds",
+                        (("method", request.method), ("route", getattr(route, "path", "unmatched")),
+                         ("status", str(response.status_code))), elapsed)
+        if token is not None:
+            response.headers["Server-Timing"] = metrics.server_timing(spans, elapsed)
+        return response
+
+    metrics.gauge("br_games_in_memory", "Games currently held in memory",
+                  lambda: [((), len(game_manager.games))])
+    metrics.gauge("br_action_queue_depth", "Pending actions across all game queues",
+                  lambda: [((), sum(q["queue_depth"] for q in game_manager.router.metrics().values()))])
+    metrics.gauge("br_device_queue_depth", "Pending commands per device",
+                  lambda: [((("device", name),), q["queue_depth"]) for name, q in hardware_dispatcher.metrics().items()])
+
+# Shard assignment when running behind shard_router.py (one process per shard)
+SHARD_INDEX, SHARD_COUNT = current_shard()
+game_manager.set_shard(SHARD_INDEX, SHARD_COUNT)
+
+# Persistent game storage (games survive restarts and are loaded lazily)
+storage_settings = dict(config.storage_config)
+if SHARD_COUNT > 1 and storage_settings.get('path'):
+    # Each shard keeps its own database file
+    root, ext = os.path.splitext(storage_settings['path'])
+    storage_settings['path'] = f"{root}.shard{SHARD_INDEX}{ext}"
+# With "shared": true several uvicorn workers (--workers N) can serve the same games from one database
+game_manager.set_store(
+    open_store(storage_settings),
+    storage_settings.get('max_cached_games', 1000),
+    shared=storage_settings.get('shared', False),
+    lease_ttl=storage_settings.get('lease_ttl', 5.0),
+    sync_interval=storage_settings.get('sync_interval', 0.5)
+)
+# WebSocket/SSE pushes: every game the manager holds (including ones restored later) notifies the hub
+game_manager.add_listener(state_hub.publish)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -43,6 +147,8 @@ class CustomSettings(BaseModel):
 class CreateGameRequest(BaseModel):
     player_ids: List[int]
     custom_settings: Optional[CustomSettings] = None
+    profile: Optional[str] = None # Named rule profile (see /api/profiles); custom_settings apply on top of it
+    seed: Optional[int] = None # Fix the RNG seed to reproduce a match
 
 class ActionRequest(BaseModel):
     action: str # 'shoot', 'use'
@@ -53,6 +159,29 @@ class MessageRequest(BaseModel):
     message: str
     duration: Optional[int] = None
 
+# --- Game Actor ---
+
+async def in_game(game_id: str, fn, *args):
+    """
+    Run fn(game, *args) on the game's own action queue and await the result.
+    Every read and write of a game goes through here, so actions on one game run strictly in order
+    off the event loop, and a busy table never blocks requests for the others.
+    Mark reads with @read_only so workers sharing a store serve them without taking the game's lease.
+    """
+    try:
+        return await asyncio.wrap_future(game_manager.router.submit(game_id, fn, *args))
+    except GameNotFound:
+        raise HTTPException(status_code=404, detail="Game not found")
+    except ActionQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except TimeoutError as e:
+        # Another worker has held the game's lease for too long
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def find_game(game_id: str) -> Game:
+    """Look up (and if needed restore) a game on its queue, so storage reads stay off the event loop"""
+    return await in_game(game_id, read_only(lambda game: game))
+
 # --- Routes ---
 
 @app.get("/", response_class=HTMLResponse)
@@ -63,54 +192,36 @@ async def read_root(request: Request):
 @app.get("/game/{game_id}", response_class=HTMLResponse)
 async def game_control_panel(request: Request, game_id: str):
     """Game Control Panel UI"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    await find_game(game_id)
     return templates.TemplateResponse("game_control.html", {"request": request, "game_id": game_id})
 
 @app.get("/game/{game_id}/player/{player_id}", response_class=HTMLResponse)
 async def player_view_ui(request: Request, game_id: str, player_id: int):
     """Player View UI"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    await find_game(game_id)
     return templates.TemplateResponse("player_view.html", {"request": request, "game_id": game_id, "player_id": player_id})
 
 # --- API Endpoints ---
 
 @app.get("/api/games")
-async def get_games():
-    """List all active games"""
-    games = []
-    for gid, game in game_manager.games.items():
-        # Calculate shell counts
-        live_shells = game.shotgun.chamber.count("live")
-        blank_shells = game.shotgun.chamber.count("blank")
-        
-        # Get player stats
-        player_stats = []
-        for p in game.players:
-            player_stats.append({
-                "id": p.id,
-                "lives": p.lives,
-            })
-            try:
-                player_stats[-1]["max_lives"] = p.max_lives
-            except AttributeError:
-                print(f"DEBUG: Player object {p} missing max_lives. Dir: {dir(p)}")
-                player_stats[-1]["max_lives"] = 999 # Fallback
-
-        games.append({
-            "id": gid,
-            "round": game.round_number,
-            "players": len(game.players),
-            "is_over": game.is_game_over(),
-            "is_terminated": game.is_terminated,
-            "shell_counts": {"live": live_shells, "blank": blank_shells},
-            "current_turn": game.current_player_index + 1 if game.players else 0,
-            "player_stats": player_stats
-        })
-    return {"games": games}
+async def get_games(request: Request, status: Optional[str] = None, sort: str = "updated", order: str = "desc",
+                    cursor: Optional[str] = None, limit: int = 50):
+    """List games from the summary index (filter by status, sort, cursor pagination, ETag)"""
+    if status not in (None, "active", "over", "terminated"):
+        raise HTTPException(status_code=400, detail="status must be 'active', 'over' or 'terminated'")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    limit = max(1, min(limit, 200))
+
+    # Both read the SQLite index, so keep them off the event loop
+    etag = await asyncio.to_thread(lambda: game_manager.listing_etag)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        page = await asyncio.to_thread(game_manager.list_games, status, sort, order == "desc", cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(page, headers={"ETag": etag})
 
 @app.post("/api/game/create")
 async def create_game(request: CreateGameRequest):
@@ -120,129 +231,251 @@ async def create_game(request: CreateGameRequest):
         # Remove None values to let logic.py handle defaults
         if settings_dict:
             settings_dict = {k: v for k, v in settings_dict.items() if v is not None}
-            
-        game_id = game_manager.create_game(request.player_ids, settings_dict)
-        
+        # The name is kept for reference; the resolved rules are pinned and stored with the game (Game.ruleset),
+        # so replacing the profile later does not change running, restored or replayed games
+        if request.profile:
+            settings_dict = {**(settings_dict or {}), 'profile': request.profile}
+
+        game_id = await asyncio.to_thread(game_manager.create_game, request.player_ids, settings_dict, request.seed)
+
         # Start the first round immediately for convenience
-        game = game_manager.get_game(game_id)
-        if game:
-            game.start_new_round()
+        await in_game(game_id, Game.start_new_round)
         return {"game_id": game_id, "message": "Game created successfully"}
+    except HTTPException:
+        raise
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/profiles")
+async def list_profiles():
+    """Named rule profiles: {name: overrides of the config.json rule sections}"""
+    try:
+        return {"profiles": await asyncio.to_thread(profiles.list)}
+    except ConfigError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/api/profiles/{name}")
+async def save_profile(name: str, rules: dict):
+    """Register or replace a rule profile (games already running keep their rules)"""
+    try:
+        await asyncio.to_thread(profiles.save, name, rules)
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": name, "message": "Profile saved"}
+
 @app.get("/api/game/{game_id}/state")
-async def get_game_state(game_id: str):
-    """Get current game state JSON"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    return game.get_state()
+async def get_game_state(game_id: str, since: Optional[int] = None, player_id: Optional[int] = None):
+    """Get current game state JSON (or one player's view of it), or only the changes since a known version"""
+    if since is None:
+        try:
+            return RawJSONResponse(await in_game(game_id, Game.get_state_json, player_id))
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    if player_id is not None:
+        raise HTTPException(status_code=400, detail="since is only supported for the full state")
+
+    delta, version = await in_game(game_id, read_only(lambda game: (game.get_state_since(since), game.version)))
+    if delta is None:
+        return Response(status_code=304, headers={"X-State-Version": str(version)})
+    return delta
 
 @app.post("/api/game/{game_id}/action")
 async def execute_action(game_id: str, action: ActionRequest):
     """Execute a player action (Shoot or Use Item)"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    if game.is_game_over():
-         return {"success": False, "message": "Game is over"}
-
     action_data = {
         "action": action.action,
         "target_id": action.target_id,
         "item_name": action.item_name
     }
-    
-    try:
+
+    def run(game: Game) -> dict | Response:
+        if game.is_game_over():
+            return {"success": False, "message": "Game is over"}
         game.handle_action(action_data)
-        return {"success": True, "message": "Action executed", "state": game.get_state()}
+        return state_response("Action executed", game.get_state_json())
+
+    # デバイスからの操作と競合しないよう、ゲームごとの待ち行列で実行する
+    try:
+        return await in_game(game_id, run)
+    except HTTPException:
+        raise
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 @app.post("/api/game/{game_id}/terminate")
 async def terminate_game(game_id: str):
     """Force terminate the game"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    game.force_end()
+    await in_game(game_id, Game.force_end)
     return {"success": True, "message": "Game terminated"}
 
 @app.post("/api/game/{game_id}/message")
 async def send_message(game_id: str, req: MessageRequest):
     """Send admin message to players"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    game.broadcast_message(req.message, req.duration)
+    await in_game(game_id, Game.broadcast_message, req.message, req.duration)
     return {"success": True, "message": "Message sent"}
 
 @app.post("/api/game/{game_id}/interaction/start")
 async def start_interaction(game_id: str, action: ActionRequest):
     """Start an interaction (e.g. Handcuffs selection)"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Verify it's the player's turn
-    if game.current_player.id != action.target_id and action.target_id is not None: 
-         # Note: ActionRequest.target_id is reused here as source_id for simplicity or we should check current_player
-         pass
+    def run(game: Game) -> Response:
+        # Verify it's the player's turn
+        if game.current_player.id != action.target_id and action.target_id is not None:
+            # Note: ActionRequest.target_id is reused here as source_id for simplicity or we should check current_player
+            pass
 
-    # For now, trust the request or check game.current_player
-    game.set_pending_interaction('select_target', game.current_player.id, action.item_name)
-    return {"success": True, "message": "Interaction started", "state": game.get_state()}
+        # For now, trust the request or check game.current_player
+        game.set_pending_interaction('select_target', game.current_player.id, action.item_name)
+        return state_response("Interaction started", game.get_state_json())
+
+    return await in_game(game_id, run)
 
 @app.post("/api/game/{game_id}/interaction/cancel")
 async def cancel_interaction(game_id: str):
     """Cancel current interaction"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    game.clear_pending_interaction()
-    return {"success": True, "message": "Interaction cancelled", "state": game.get_state()}
+    def run(game: Game) -> Response:
+        game.clear_pending_interaction()
+        return state_response("Interaction cancelled", game.get_state_json())
+
+    return await in_game(game_id, run)
 
 @app.post("/api/game/{game_id}/undo")
 async def undo_game(game_id: str):
     """Undo the last action"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    if game.undo():
-        return {"success": True, "message": "Undo successful", "state": game.get_state()}
-    else:
+    def run(game: Game) -> dict | Response:
+        if game.undo():
+            return state_response("Undo successful", game.get_state_json())
         return {"success": False, "message": "Nothing to undo"}
 
+    return await in_game(game_id, run)
+
+@app.post("/api/game/{game_id}/redo")
+async def redo_game(game_id: str):
+    """Redo the last undone action"""
+    def run(game: Game) -> dict | Response:
+        if game.redo():
+            return state_response("Redo successful", game.get_state_json())
+        return {"success": False, "message": "Nothing to redo"}
+
+    return await in_game(game_id, run)
+
+async def subscribe_state(game_id: str, player_id: Optional[int]) -> asyncio.Queue:
+    """Subscribe to the full state, or to one player's redacted view (what player tablets must use)"""
+    try:
+        return await state_hub.subscribe(game_id, player_id,
+                                         lambda: in_game(game_id, Game.get_state_json, player_id))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.websocket("/ws/game/{game_id}")
+async def game_state_socket(websocket: WebSocket, game_id: str, player_id: Optional[int] = None):
+    """Push game state (or, with player_id, that player's view of it) to the client whenever it changes"""
+    try:
+        queue = await subscribe_state(game_id, player_id)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code)
+        return
+    await websocket.accept()
+
+    async def pump():
+        while True:
+            await websocket.send_text(await queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        state_hub.unsubscribe(game_id, player_id, queue)
+
+@app.get("/api/game/{game_id}/stream")
+async def game_state_stream(request: Request, game_id: str, player_id: Optional[int] = None):
+    """Server-Sent Events fallback for clients without WebSocket"""
+    queue = await subscribe_state(game_id, player_id)
+
+    async def event_source():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {payload}\n\n"
+        finally:
+            state_hub.unsubscribe(game_id, player_id, queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/game/{game_id}/logs")
-async def get_game_logs(game_id: str):
-    """Get full game logs"""
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    return {"logs": game.logs}
+async def get_game_logs(game_id: str, since: int = 0, limit: Optional[int] = None):
+    """Get game logs from the JSON Lines log file"""
+    await find_game(game_id)
+    await asyncio.to_thread(event_log_writer.flush)
+    reader = GameLogReader.for_game(game_id)
+    return {"logs": await asyncio.to_thread(reader.page, since, limit)}
+
+@app.get("/api/game/{game_id}/actions")
+async def get_game_actions(game_id: str):
+    """Get the seed, settings and ordered action list that reproduce this game"""
+    return await in_game(game_id, Game.get_action_log)
+
+@app.get("/api/game/{game_id}/replay")
+async def replay_game(game_id: str, index: Optional[int] = None):
+    """Rebuild the game state as it was after the given number of actions"""
+    game_log = await in_game(game_id, Game.get_action_log)
+    replayed = await asyncio.to_thread(replay, game_log, index)
+    return {"action_index": len(replayed.actions), "total_actions": len(game_log["actions"]), "state": replayed.get_state()}
+
+@app.get("/api/actions/metrics")
+async def get_action_metrics():
+    """Action queue depth, counts and processing latency of games with queued or running actions"""
+    event_server = getattr(hardware_interface, "event_server", None)
+    return {
+        "games": game_manager.router.metrics(),
+        "device_events": event_server.counts if event_server else None
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus exposition of phase, request and device timings"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/hardware/metrics")
+async def get_hardware_metrics():
+    """Per-device command queue depth, delivery counts and latency"""
+    return {"devices": hardware_dispatcher.metrics()}
+
+@app.get("/api/game/{game_id}/hint")
+async def get_hint(game_id: str, player_id: int, known_shell: Optional[str] = None):
+    """Get the win probability and the optimal action for a player (2-player games only)"""
+    if known_shell not in (None, "live", "blank"):
+        raise HTTPException(status_code=400, detail="known_shell must be 'live' or 'blank'")
+    state, ruleset = await in_game(game_id, read_only(lambda game: (game.get_state(), game.ruleset)))
+    try:
+        # 初回の探索は重くなり得るので、ゲームの待ち行列もイベントループも塞がない
+        return await asyncio.to_thread(solve, state, player_id, known_shell, ruleset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/game/{game_id}/reset")
 async def reset_game(game_id: str):
-    """Reset the game (Not fully implemented in Game class, so we might just restart round or create new)"""
-    # For now, let's just start a new round as a "soft reset" or re-create logic
-    # Since Game class doesn't have a full reset, we will just start a new round 1
-    game = game_manager.get_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    game.round_number = 0
-    game.round_number = 0
-    for p in game.players:
-        p.lives = config.rules.get('initial_lives', 3)
-        p.items = []
-        p.skip_turns = 0
-    
-    game.start_new_round()
-    return {"success": True, "message": "Game reset", "state": game.get_state()}
+    """Reset the game back to round 1 (can be undone)"""
+    def run(game: Game) -> Response:
+        game.reset()
+        return state_response("Game reset", game.get_state_json())
+
+    return await in_game(game_id, run)
 
 if __name__ == "__main__":
     # Ensure directories exist